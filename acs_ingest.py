@@ -0,0 +1,341 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import re
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# ACS estimates used by load_authentic_massachusetts_cities_complete
+# Field -> (table, variable stem); the estimate column is stem + 'E', the margin of error stem + 'M'
+# - S1901: Income in the Past 12 Months (median household income)
+# - S1501: Educational Attainment (percent bachelor's degree or higher, age 25+)
+# - S0801: Commuting Characteristics by Sex (drove alone, public transportation)
+# - DP04: Selected Housing Characteristics (1-unit detached percent, median home value)
+ACS_ESTIMATES = {
+    'Median_Income': ('S1901', 'S1901_C01_012'),
+    'Bachelor_Degree_Pct': ('S1501', 'S1501_C02_015'),
+    'Drive_Alone_Pct': ('S0801', 'S0801_C01_003'),
+    'Public_Transit_Pct': ('S0801', 'S0801_C01_009'),
+    'Single_Family_Pct': ('DP04', 'DP04_0007P'),
+    'Median_Home_Value': ('DP04', 'DP04_0089')
+}
+
+# data.census.gov file names, e.g. ACSST5Y2023.S1901-Data.csv or ACSDP5Y2023.DP04.zip
+PRODUCT_PATTERN = re.compile(r'ACS(?:ST|DP|DT)(1Y|5Y)(\d{4})', re.IGNORECASE)
+
+# Long-format output: one row per value with its source provenance
+ACS_SCHEMA = pa.schema([
+    ('GEO_ID', pa.string()),
+    ('NAME', pa.string()),
+    ('City', pa.string()),
+    ('Field', pa.string()),
+    ('Variable', pa.string()),
+    ('Estimate', pa.float64()),
+    ('MOE', pa.float64()),
+    ('Raw_Value', pa.string()),
+    ('Table', pa.string()),
+    ('Product', pa.string()),
+    ('Vintage', pa.int32()),
+    ('Source_File', pa.string()),
+    ('Source_Member', pa.string()),
+    ('Source_Line', pa.int64()),
+    ('Ingested_At', pa.string())
+])
+
+
+def table_variables(table):
+    """Fields and variable stems extracted from one ACS table"""
+    return {field: stem for field, (source_table, stem) in ACS_ESTIMATES.items() if source_table == table}
+
+
+def parse_acs_number(values):
+    """
+    Parse ACS estimate strings into floats
+
+    Handles thousands separators and top/bottom-coded values ("250,000+",
+    "2,500-"); jam values such as "-", "N", "(X)" and "***" become NaN.
+    """
+    cleaned = values.astype(str).str.replace(',', '', regex=False).str.rstrip('+-')
+    return pd.to_numeric(cleaned, errors='coerce')
+
+
+def city_name(names):
+    """'Boston city, Suffolk County, Massachusetts' -> 'Boston'"""
+    place = names.str.split(',', n=1).str[0]
+    return place.str.replace(r'\s+(city|town|Town city|CDP)$', '', regex=True)
+
+
+def discover_sources(raw_dir):
+    """
+    Find ACS table extracts (CSV, or ZIP archives of CSVs) under raw_dir
+
+    Returns {table: [(path, member), ...]}; member is None for plain CSVs.
+    Metadata and table-notes files shipped alongside the data are skipped.
+    """
+    sources = {}
+    for root, _, files in os.walk(raw_dir):
+        for name in sorted(files):
+            path = os.path.join(root, name)
+            if name.lower().endswith('.zip'):
+                with zipfile.ZipFile(path) as archive:
+                    members = [m for m in archive.namelist() if m.lower().endswith('.csv')]
+                candidates = [(path, m, os.path.basename(m)) for m in members]
+            elif name.lower().endswith('.csv'):
+                candidates = [(path, None, name)]
+            else:
+                continue
+
+            for source_path, member, file_name in candidates:
+                if 'metadata' in file_name.lower() or 'notes' in file_name.lower():
+                    continue
+                for table in {table for table, _ in ACS_ESTIMATES.values()}:
+                    if re.search(rf'(^|[^A-Z0-9]){table}([^0-9]|$)', file_name, re.IGNORECASE):
+                        sources.setdefault(table, []).append((source_path, member))
+    return sources
+
+
+@contextlib.contextmanager
+def _open_source(path, member):
+    """Open a CSV, or a CSV inside a ZIP archive, as a streamed text handle"""
+    if member is None:
+        with open(path, 'r', encoding='utf-8-sig', newline='') as handle:
+            yield handle
+    else:
+        with zipfile.ZipFile(path) as archive, archive.open(member) as raw:
+            yield io.TextIOWrapper(raw, encoding='utf-8-sig', newline='')
+
+
+def _source_key(path, member):
+    stat = os.stat(path)
+    return f"{os.path.abspath(path)}::{member or ''}::{stat.st_size}::{stat.st_mtime_ns}"
+
+
+def _part_path(out_dir, table, path, member):
+    stem = os.path.splitext(os.path.basename(member or path))[0]
+    return os.path.join(out_dir, table, f"part-{re.sub(r'[^A-Za-z0-9_.-]', '_', stem)}.parquet")
+
+
+def _load_manifest(table_dir):
+    manifest_path = os.path.join(table_dir, '_manifest.json')
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as handle:
+            return json.load(handle)
+    return {}
+
+
+def _save_manifest(table_dir, manifest):
+    manifest_path = os.path.join(table_dir, '_manifest.json')
+    tmp_path = manifest_path + '.tmp'
+    with open(tmp_path, 'w') as handle:
+        json.dump(manifest, handle, indent=2, sort_keys=True)
+    os.replace(tmp_path, manifest_path)
+
+
+def reshape_chunk(chunk, variables, table, product, vintage, source_file, source_member, ingested_at):
+    """
+    Reshape one wide ACS chunk into long rows (one per geography and field)
+
+    The chunk index is the 0-based data row, so the source line is index + 2
+    (the header occupies line 1).
+    """
+    frames = []
+    for field, stem in variables.items():
+        estimate_col, moe_col = stem + 'E', stem + 'M'
+        if estimate_col not in chunk.columns:
+            continue
+        raw = chunk[estimate_col]
+        frames.append(pd.DataFrame({
+            'GEO_ID': chunk['GEO_ID'],
+            'NAME': chunk['NAME'],
+            'City': city_name(chunk['NAME']),
+            'Field': field,
+            'Variable': estimate_col,
+            'Estimate': parse_acs_number(raw),
+            'MOE': parse_acs_number(chunk[moe_col]) if moe_col in chunk.columns else float('nan'),
+            'Raw_Value': raw,
+            'Table': table,
+            'Product': product,
+            'Vintage': vintage,
+            'Source_File': source_file,
+            'Source_Member': source_member,
+            'Source_Line': chunk.index.to_numpy() + 2,
+            'Ingested_At': ingested_at
+        }))
+
+    if not frames:
+        return pd.DataFrame({name: pd.Series(dtype=object) for name in ACS_SCHEMA.names})
+    return pd.concat(frames, ignore_index=True)
+
+
+def ingest_source(path, member, table, out_dir, geo_prefixes=None, chunksize=100000):
+    """
+    Stream one ACS extract into a Parquet part file, chunk by chunk
+
+    Only GEO_ID, NAME and the needed estimate/MOE columns are parsed, rows
+    outside geo_prefixes are dropped per chunk, and every reshaped chunk is
+    written as its own row group, so memory stays bounded by chunksize even
+    for national files. The part is written to a temp file and renamed when
+    complete, so an interrupted run leaves no partial output behind.
+    """
+    variables = table_variables(table)
+    wanted = {'GEO_ID', 'NAME'} | {stem + suffix for stem in variables.values() for suffix in ('E', 'M')}
+
+    match = PRODUCT_PATTERN.search(os.path.basename(member or path))
+    product = f"ACS {match.group(1).upper()}" if match else None
+    vintage = int(match.group(2)) if match else None
+    ingested_at = datetime.now(timezone.utc).isoformat(timespec='seconds')
+
+    part_path = _part_path(out_dir, table, path, member)
+    tmp_path = part_path + '.tmp'
+    rows_read = rows_kept = 0
+    found = set()
+
+    writer = pq.ParquetWriter(tmp_path, ACS_SCHEMA)
+    try:
+        with _open_source(path, member) as handle:
+            reader = pd.read_csv(handle, usecols=lambda c: c in wanted, dtype=str,
+                                 chunksize=chunksize, keep_default_na=False)
+            for chunk in reader:
+                rows_read += len(chunk)
+                found.update(chunk.columns)
+
+                # data.census.gov extracts carry a second header row of labels
+                chunk = chunk[chunk['GEO_ID'] != 'Geography']
+                if geo_prefixes:
+                    chunk = chunk[chunk['GEO_ID'].str.startswith(tuple(geo_prefixes))]
+                if chunk.empty:
+                    continue
+
+                long_df = reshape_chunk(chunk, variables, table, product, vintage,
+                                        os.path.basename(path), member, ingested_at)
+                rows_kept += len(chunk)
+                writer.write_table(pa.Table.from_pandas(long_df, schema=ACS_SCHEMA, preserve_index=False))
+    except BaseException:
+        writer.close()
+        os.remove(tmp_path)
+        raise
+    writer.close()
+    os.replace(tmp_path, part_path)
+
+    return {
+        'part': os.path.basename(part_path),
+        'rows_read': rows_read,
+        'rows_kept': rows_kept,
+        'vintage': vintage,
+        'missing_variables': sorted(
+            stem + 'E' for stem in variables.values() if stem + 'E' not in found
+        )
+    }
+
+
+def ingest_table(table, sources, out_dir, geo_prefixes=None, chunksize=100000):
+    """
+    Ingest every extract of one ACS table, skipping sources already done
+
+    Progress is tracked in <out_dir>/<table>/_manifest.json keyed by source
+    path, size and modification time, so a rerun resumes where it stopped
+    and re-ingests files that changed.
+    """
+    table_dir = os.path.join(out_dir, table)
+    os.makedirs(table_dir, exist_ok=True)
+    manifest = _load_manifest(table_dir)
+    settings = {'geo_prefixes': sorted(geo_prefixes or [])}
+
+    summary = {'table': table, 'ingested': 0, 'skipped': 0, 'rows_kept': 0}
+    for path, member in sources:
+        key = _source_key(path, member)
+        entry = manifest.get(key)
+        if (entry and entry.get('settings') == settings
+                and os.path.exists(os.path.join(table_dir, entry['part']))):
+            summary['skipped'] += 1
+            summary['rows_kept'] += entry['rows_kept']
+            continue
+
+        result = ingest_source(path, member, table, out_dir, geo_prefixes, chunksize)
+        result['settings'] = settings
+        manifest[key] = result
+        _save_manifest(table_dir, manifest)
+
+        summary['ingested'] += 1
+        summary['rows_kept'] += result['rows_kept']
+
+    return summary
+
+
+def ingest_directory(raw_dir, out_dir, geo_prefixes=None, chunksize=100000, workers=None):
+    """
+    Ingest all ACS extracts under raw_dir into Parquet under out_dir
+
+    Tables are processed in parallel (one worker process per table); files
+    within a table run sequentially so each table's manifest has one writer.
+    """
+    sources = discover_sources(raw_dir)
+    os.makedirs(out_dir, exist_ok=True)
+
+    workers = workers or min(len(sources), os.cpu_count() or 1) or 1
+    if workers == 1 or len(sources) <= 1:
+        return [ingest_table(table, files, out_dir, geo_prefixes, chunksize) for table, files in sources.items()]
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(ingest_table, table, files, out_dir, geo_prefixes, chunksize)
+            for table, files in sources.items()
+        ]
+        return [future.result() for future in futures]
+
+
+def load_acs_values(out_dir, vintage=None, columns=None):
+    """Read the long-format ACS values (with provenance) written by ingest_directory"""
+    paths = [
+        os.path.join(root, name)
+        for root, _, files in os.walk(out_dir)
+        for name in sorted(files) if name.endswith('.parquet')
+    ]
+    if not paths:
+        return pd.DataFrame(columns=columns or ACS_SCHEMA.names)
+
+    filters = [('Vintage', '=', vintage)] if vintage is not None else None
+    return pq.ParquetDataset(paths, filters=filters).read(columns=columns).to_pandas()
+
+
+def build_city_table(out_dir, vintage=None, cities=None):
+    """
+    Pivot ingested ACS values into the city schema used by the dashboard
+
+    Returns one row per geography with the ACS_ESTIMATES fields as columns;
+    when a geography appears in several files the most recent vintage wins.
+    """
+    values = load_acs_values(out_dir, vintage, columns=['GEO_ID', 'City', 'Field', 'Estimate', 'Vintage'])
+    if cities is not None:
+        values = values[values['City'].isin(cities)]
+
+    values = values.sort_values('Vintage').drop_duplicates(['GEO_ID', 'Field'], keep='last')
+    wide = values.pivot(index=['GEO_ID', 'City'], columns='Field', values='Estimate').reset_index()
+    wide.columns.name = None
+    return wide
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream Census ACS table extracts into Parquet with provenance")
+    parser.add_argument('raw_dir', help="Directory of ACS CSV/ZIP extracts (S1901, S1501, S0801, DP04)")
+    parser.add_argument('out_dir', help="Output directory for Parquet parts and manifests")
+    parser.add_argument('--geo-prefix', action='append', dest='geo_prefixes',
+                        help="Keep GEO_IDs with this prefix, e.g. 1600000US25 for MA places (repeatable)")
+    parser.add_argument('--chunksize', type=int, default=100000, help="Rows per streamed chunk")
+    parser.add_argument('--workers', type=int, default=None, help="Parallel table workers")
+    args = parser.parse_args()
+
+    for summary in ingest_directory(args.raw_dir, args.out_dir, args.geo_prefixes, args.chunksize, args.workers):
+        print(f"{summary['table']}: {summary['ingested']} ingested, {summary['skipped']} skipped, "
+              f"{summary['rows_kept']:,} geographies")
+
+
+if __name__ == "__main__":
+    main()
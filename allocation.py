@@ -0,0 +1,223 @@
+import numpy as np
+
+from numerics import dense_rank, tie_tolerance
+
+
+def _group_sums(values, groups, n_groups):
+    return np.bincount(groups, weights=values, minlength=n_groups)
+
+
+def _distribute_remainders(floors, fractions, remainders, groups, eligible, tolerance=0.0):
+    """
+    Give one extra unit to the items with the largest fractional parts
+
+    remainders[g] units go to group g. Items that cannot take another unit
+    (eligible False) sort last. Fractions within tolerance of each other
+    (rounding noise of the shares) tie, and ties go to the lower index, so
+    equal items get the same units however their shares were summed. A
+    single lexsort orders every group at once, so the step is O(n log n)
+    overall.
+    """
+    levels = dense_rank(fractions, tolerance=tolerance)
+    keys = np.where(eligible, levels, len(levels) + 1)
+    order = np.lexsort((np.arange(len(keys)), keys, groups))
+    sorted_groups = groups[order]
+
+    # Rank of each item inside its group after sorting
+    starts = np.searchsorted(sorted_groups, sorted_groups, side='left')
+    rank = np.arange(len(order)) - starts
+
+    bump = (rank < remainders[sorted_groups]) & eligible[order]
+    result = floors.copy()
+    result[order[bump]] += 1
+    return result
+
+
+def _sum_before(values, starts, sorted_groups):
+    """Sum of the values before each position within its group (groups contiguous)"""
+    running = np.concatenate(([0.0], np.cumsum(values)))
+    return running[:-1] - running[starts][sorted_groups]
+
+
+def _capped_shares(weights, totals, groups, caps, n_groups):
+    """
+    Real-valued shares min(cap, weight x scale) summing to each group's total
+
+    Water filling in one pass: items are sorted once by cap / weight within
+    their group, so the capped items of a group are a prefix of its sorted
+    order. With the first k items at their caps, the remaining items share
+    scale_k = (total - their caps) / (remaining weight); the prefix ends at
+    the first item whose ratio is not below scale_k. Prefix sums give every
+    scale_k at once, so the step is O(n log n) for the sort and O(n) after.
+    When no proportional share exceeds its cap the sort is skipped.
+    """
+    n = len(weights)
+    group_weight = _group_sums(weights, groups, n_groups)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        scale = np.where(group_weight > 0, np.maximum(totals, 0) / group_weight, 0.0)
+    shares = weights * scale[groups]
+    if not (shares > caps).any():
+        return shares
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratios = np.where(weights > 0, caps / weights, np.inf)
+    # By ratio, then (stable) by group
+    order = np.argsort(ratios)
+    order = order[np.argsort(groups[order], kind='stable')]
+    sorted_groups = groups[order]
+    sorted_weights = weights[order]
+    sorted_caps = caps[order]
+    starts = np.searchsorted(sorted_groups, np.arange(n_groups), side='left')
+
+    # Caps and weight of the items before each position in its group
+    cap_before = _sum_before(np.where(np.isfinite(sorted_caps), sorted_caps, 0.0), starts, sorted_groups)
+    weight_before = _sum_before(sorted_weights, starts, sorted_groups)
+
+    left = totals[sorted_groups] - cap_before
+    free = group_weight[sorted_groups] - weight_before
+    with np.errstate(divide='ignore', invalid='ignore'):
+        scale = np.where(free > 0, np.maximum(left, 0) / free, 0.0)
+
+    # Length of the capped prefix per group (the group size when every item caps)
+    group_sizes = np.bincount(groups, minlength=n_groups)
+    stops = np.append(np.flatnonzero(ratios[order] >= scale), n)
+    first_stop = stops[np.searchsorted(stops, starts)]
+    prefix = np.minimum(first_stop - starts, group_sizes)
+
+    capped_sorted = np.arange(n) - starts[sorted_groups] < prefix[sorted_groups]
+    # Scale of each group at its prefix: taken from the first uncapped item
+    first_free = starts + prefix
+    group_scale = np.zeros(n_groups)
+    has_free = prefix < group_sizes
+    group_scale[has_free] = scale[first_free[has_free]]
+
+    shares[order] = np.where(capped_sorted, sorted_caps, sorted_weights * group_scale[sorted_groups])
+    return shares
+
+
+def apportion(weights, totals, groups=None, caps=None):
+    """
+    Largest-remainder apportionment of integer totals with optional caps
+
+    Parameters:
+    - weights: non-negative weight per item
+    - totals: integer total per group (a scalar when groups is None)
+    - groups: integer group code per item (0..G-1); None means one group
+    - caps: optional integer upper bound per item
+
+    Each group's total is split in proportion to weight. Items whose share
+    would exceed their cap are fixed at the cap and the excess is
+    redistributed over the remaining items of the group; the capped set is
+    found in one sorted pass (_capped_shares), so the whole step is
+    O(n log n). Shares are then floored and the units lost to flooring go
+    to the largest fractional parts (fractions equal up to rounding noise
+    go to the lower index), so every group sums exactly to its total (or to
+    the sum of its caps when the total is infeasible). Groups with zero
+    total weight split evenly, and once every weighted item of a group is
+    at its cap the rest of its total is split evenly over its zero-weight
+    items.
+
+    Returns an int64 array of counts per item.
+    """
+    weights = np.asarray(weights, dtype=float)
+    n = len(weights)
+    if groups is None:
+        groups = np.zeros(n, dtype=np.int64)
+        totals = np.atleast_1d(totals)
+    groups = np.asarray(groups, dtype=np.int64)
+    totals = np.asarray(totals, dtype=np.int64)
+    n_groups = len(totals)
+
+    # Zero-weight groups fall back to an even split
+    weight_sums = _group_sums(weights, groups, n_groups)
+    weights = np.where(weight_sums[groups] > 0, weights, 1.0)
+
+    caps = np.full(n, np.inf) if caps is None else np.asarray(caps, dtype=float)
+    shares = np.minimum(_capped_shares(weights, totals, groups, caps, n_groups), caps)
+
+    # Once every weighted item of a group is at its cap, the rest of the
+    # total goes evenly (water-filled under their caps) to its zero-weight items
+    leftover = np.maximum(totals, 0) - _group_sums(shares, groups, n_groups)
+    leftover = np.where(leftover > 1e-9, leftover, 0.0)
+    spare = (weights == 0) & (caps > 0) & (leftover[groups] > 0)
+    if spare.any():
+        shares = shares + np.minimum(
+            _capped_shares(spare.astype(float), leftover, groups, np.where(spare, caps, 0.0), n_groups), caps
+        )
+    floors = np.floor(shares + 1e-9).astype(np.int64)
+    fractions = shares - floors
+
+    targets = np.minimum(totals, _group_sums(np.where(np.isfinite(caps), caps, np.inf), groups, n_groups))
+    remainders = (targets - _group_sums(floors, groups, n_groups)).round().astype(np.int64)
+    eligible = floors < caps
+
+    return _distribute_remainders(floors, fractions, np.maximum(remainders, 0), groups, eligible,
+                                  tie_tolerance(shares))
+
+
+def round_preserving_sum(values):
+    """
+    Round a (rows x columns) array to integers column by column, keeping each
+    column's sum equal to its rounded real total (largest remainder)
+    """
+    values = np.asarray(values, dtype=float)
+    if values.ndim == 1:
+        return round_preserving_sum(values[:, None])[:, 0]
+
+    n_rows, n_cols = values.shape
+    floors = np.floor(values).astype(np.int64)
+    column_totals = np.rint(values.sum(axis=0)).astype(np.int64)
+
+    # Columns as groups: flatten column-major so each column is contiguous
+    groups = np.repeat(np.arange(n_cols), n_rows)
+    flat_floors = floors.T.ravel()
+    remainders = column_totals - floors.sum(axis=0)
+    rounded = _distribute_remainders(
+        flat_floors, (values - floors).T.ravel(), np.maximum(remainders, 0), groups,
+        np.ones(len(flat_floors), dtype=bool), tie_tolerance(values.ravel())
+    )
+    return rounded.reshape(n_cols, n_rows).T
+
+
+def hierarchical_apportion(total, levels):
+    """
+    Apportion a top-level total down a hierarchy (e.g. state -> city -> tract)
+
+    levels is a list of (weights, parent) pairs from the top down; parent
+    gives the index of each item's parent in the level above (None for the
+    first level, whose parent is the single top-level total). Optional caps
+    may be passed as a third element. Every level sums exactly to the counts
+    of the level above.
+
+    Returns a list of integer count arrays, one per level.
+    """
+    counts = np.atleast_1d(np.asarray(total, dtype=np.int64))
+    results = []
+    for level in levels:
+        weights, parent = level[0], level[1]
+        caps = level[2] if len(level) > 2 else None
+        groups = None if parent is None else np.asarray(parent, dtype=np.int64)
+        counts = apportion(weights, counts, groups=groups, caps=caps)
+        results.append(counts)
+    return results
+
+
+if __name__ == "__main__":
+    # Timing on a block-group sized hierarchy (~240k block groups in 351 towns)
+    import time
+
+    rng = np.random.default_rng(0)
+    n_towns, n_block_groups = 351, 240000
+    town_weights = rng.lognormal(10, 1, n_towns)
+    block_group_town = np.sort(rng.integers(0, n_towns, n_block_groups))
+    block_group_weights = rng.lognormal(7, 0.5, n_block_groups)
+    caps = rng.integers(0, 400, n_block_groups)
+
+    start = time.perf_counter()
+    towns, block_groups = hierarchical_apportion(
+        200000, [(town_weights, None), (block_group_weights, block_group_town, caps)]
+    )
+    elapsed = time.perf_counter() - start
+
+    print(f"towns: {towns.sum():,}  block groups: {block_groups.sum():,}  ({elapsed:.3f}s)")
+    print(f"max cap violation: {(block_groups - caps).max()}")
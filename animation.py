@@ -0,0 +1,176 @@
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+from scoring import FORECAST_BASE_YEAR, forecast_long, forecast_matrix, forecast_wide, horizon_grid
+
+# Cities shown per frame (the leaders at that time point)
+RACE_BARS = 20
+
+# Playback time per forecast year; monthly horizons split it across 12 frames
+YEAR_MS = 800
+
+BAR_COLOR = '#06b6d4'
+
+
+def frame_labels(horizon, periods_per_year=1):
+    """Slider label per time point: '2030' for annual points, '2030-07' for monthly ones"""
+    horizon = np.asarray(horizon, dtype=float)
+    if periods_per_year == 1:
+        return [str(int(year)) for year in horizon]
+    years = np.floor(horizon + 1e-9).astype(int)
+    months = np.rint((horizon - years) * 12).astype(int) + 1
+    return [f'{year}-{month:02d}' for year, month in zip(years, months)]
+
+
+def race_frames(cities, forecast, top_n=RACE_BARS):
+    """
+    Leading cities and their forecasts at every time point, in rank order
+
+    forecast is the dense (cities x time points) array of
+    scoring.forecast_matrix. One argpartition down the city axis picks the
+    leaders of every time point at once and a sort of those top_n rows
+    orders them; returns (names, values), both (top_n x time points) with
+    row 0 the leader.
+    """
+    forecast = np.asarray(forecast)
+    top_n = min(top_n, forecast.shape[0])
+    leaders = np.argpartition(-forecast, top_n - 1, axis=0)[:top_n] if top_n < forecast.shape[0] else \
+        np.broadcast_to(np.arange(top_n)[:, None], forecast.shape)
+    values = np.take_along_axis(forecast, leaders, axis=0)
+    ranking = np.argsort(-values, axis=0, kind='stable')
+    order = np.take_along_axis(leaders, ranking, axis=0)
+    return np.asarray(cities)[order], np.take_along_axis(values, ranking, axis=0)
+
+
+def race_figure(cities, horizon, forecast, periods_per_year=1, top_n=RACE_BARS, title=None):
+    """
+    Animated bar race of the forecast over the horizon, one frame per time point
+
+    The bars are rank slots (1 = top); each frame sets their lengths, city
+    names and an x range fitted to that frame's leader, and plotly.js eases
+    between frames on the client, so playback needs no round trip to the
+    server. Play/pause buttons and a time slider drive the animation.
+
+    The whole figure is assembled as a plain spec and wrapped unvalidated.
+    It is rebuilt for every new forecast (a readiness weight or the state
+    target moves it), where validating just the base trace and layout cost
+    a 20-city dashboard rerun 15-20 ms. The spec spells out plotly's nested
+    property names (title.text, marker.color), so it serializes to the
+    same JSON as the validated figure.
+    """
+    names, values = race_frames(cities, forecast, top_n)
+    labels = frame_labels(horizon, periods_per_year)
+    ranks = np.arange(1, len(names) + 1)
+    # Room to the right of the leader for its outside label
+    x_max = np.maximum(values[0], 1) * 1.15
+    frame_ms = YEAR_MS / periods_per_year
+
+    frames = [
+        {'name': label, 'data': [{'type': 'bar', 'x': values[:, j], 'text': names[:, j]}],
+         'layout': {'xaxis': {'range': [0, x_max[j]]}}}
+        for j, label in enumerate(labels)
+    ]
+    play = dict(frame=dict(duration=frame_ms, redraw=False), transition=dict(duration=frame_ms, easing='linear'),
+                fromcurrent=True, mode='immediate')
+    pause = dict(frame=dict(duration=0, redraw=False), transition=dict(duration=0), mode='immediate')
+
+    spec = {
+        'data': [{
+            'type': 'bar', 'x': values[:, 0], 'y': ranks, 'text': names[:, 0], 'orientation': 'h',
+            'marker': {'color': BAR_COLOR},
+            'texttemplate': '%{text}  %{x:,}',
+            'textposition': 'outside',
+            'cliponaxis': False,
+            'hovertemplate': '<b>%{text}</b><br>Rank %{y}<br>EV Forecast: %{x:,}<extra></extra>'
+        }],
+        'layout': {
+            'title': {'text': title, 'font': {'color': '#06b6d4', 'size': 16}},
+            'height': 650,
+            'paper_bgcolor': '#000000',
+            'plot_bgcolor': '#000000',
+            'font': {'color': '#f1f5f9'},
+            'xaxis': {'title': {'text': 'Number of Electric Vehicles'}, 'range': [0, x_max[0]],
+                      'gridcolor': 'rgba(6, 182, 212, 0.3)', 'color': '#f1f5f9'},
+            'yaxis': {'title': {'text': 'Rank'}, 'autorange': 'reversed', 'dtick': 1, 'color': '#f1f5f9'},
+            'margin': {'r': 40},
+            'updatemenus': [dict(
+                type='buttons', direction='left', x=0, y=-0.08, xanchor='left', yanchor='top',
+                bgcolor='#000000', bordercolor=BAR_COLOR, font=dict(color=BAR_COLOR),
+                buttons=[dict(label='Play', method='animate', args=[None, play]),
+                         dict(label='Pause', method='animate', args=[[None], pause])]
+            )],
+            'sliders': [dict(
+                x=0.12, y=-0.04, len=0.88, xanchor='left', yanchor='top',
+                currentvalue=dict(prefix='Forecast: ', font=dict(color=BAR_COLOR)),
+                font=dict(color='#f1f5f9'),
+                steps=[dict(label=label, method='animate', args=[[label], pause]) for label in labels]
+            )]
+        },
+        'frames': frames
+    }
+    return go.Figure(spec, _validate=False)
+
+
+def per_point_frames(horizon_df, top_n=RACE_BARS):
+    """The same leaders by selecting and sorting the long table once per time point (for comparison)"""
+    names, values = [], []
+    for year in np.unique(horizon_df['Year'].to_numpy()):
+        top = horizon_df[horizon_df['Year'] == year].sort_values('EV_Forecast', ascending=False).head(top_n)
+        names.append(top['City'].to_numpy())
+        values.append(top['EV_Forecast'].to_numpy())
+    return np.column_stack(names), np.column_stack(values)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build forecast race frames and time them against a per-point loop")
+    parser.add_argument('--cities', type=int, nargs='+', default=[20, 351, 2000])
+    parser.add_argument('--horizon-end', type=int, default=2050)
+    parser.add_argument('--periods-per-year', type=int, choices=[1, 12], default=12)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    import app
+    from synthetic import CityModel, generate_chunks
+    model = CityModel(app.load_authentic_massachusetts_cities_complete())
+    horizon = horizon_grid(FORECAST_BASE_YEAR, args.horizon_end, args.periods_per_year)
+
+    rows = []
+    for n in args.cities:
+        cities_df = pd.concat(generate_chunks(model, n, args.seed), ignore_index=True)
+        forecast_df, _ = app.calculate_authentic_linear_regression_forecasts(cities_df)
+        horizon_df = forecast_long(forecast_df['City'].to_numpy(), horizon, forecast_matrix(
+            forecast_df['Current_EVs_Estimate'].to_numpy(), forecast_df['Growth_Rate'].to_numpy(), horizon
+        ))
+
+        start = time.perf_counter()
+        cities, points, forecast = forecast_wide(horizon_df)
+        _, dense_values = race_frames(cities, forecast)
+        dense = time.perf_counter() - start
+
+        start = time.perf_counter()
+        _, values = per_point_frames(horizon_df)
+        looped = time.perf_counter() - start
+
+        start = time.perf_counter()
+        fig = race_figure(cities, points, forecast, args.periods_per_year)
+        figure = time.perf_counter() - start
+
+        rows.append({
+            'Cities': n,
+            'Frames': len(fig.frames),
+            'Dense_ms': dense * 1000,
+            'Per_Point_ms': looped * 1000,
+            'Figure_ms': figure * 1000,
+            'Payload_KB': len(fig.to_json()) / 1024,
+            'Values_Match': bool(np.array_equal(values, dense_values))
+        })
+    print(f"{FORECAST_BASE_YEAR}-{args.horizon_end}, {args.periods_per_year} point(s) per year")
+    print(pd.DataFrame(rows).round(3).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -6,8 +6,102 @@ import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 from datetime import datetime
 import warnings
+import logging
+import os
+import hashlib
+import json
+from sensitivity import rank_stability_table, city_rank_stability
+from scoring import (
+    STATE_TARGET_2025, ALLOCATION_POPULATION_SHARE, READINESS_WEIGHTS, PRIORITY_WEIGHTS,
+    RISK_WEIGHTS, CHARGING_WEIGHTS, GRID_WEIGHTS, INFRASTRUCTURE_WEIGHTS, URBAN_CHARGING_SCORES,
+    build_feature_matrices, readiness_scores, allocate_forecasts, priority_scores,
+    risk_scores, infrastructure_scores, categorize_risk, categorize_infrastructure, weight_vector,
+    distance_column, FORECAST_BASE_YEAR, FORECAST_YEARS, PLANNING_YEARS, horizon_grid, forecast_matrix,
+    forecast_long, forecast_wide, ESTIMATED_CURRENT_EVS, investment_priority, categorize_investment
+)
+from geospatial import attach_facility_distances
+from siting import charger_allocation_table, LEVEL2_BUDGET, DC_FAST_BUDGET, GRID_KW_PER_SCORE
+from load_simulation import city_load_summary, open_hourly_load, prune_hourly_loads
+from exports import EXPORT_FORMATS, export_file, prune_export_dirs
+from tables import TableIndex
+from numerics import dense_rank
+from prefetch import BackgroundRefresher, WORKER_THREAD_NAME
+from datasets import DatasetRegistry, BUILTIN_SOURCES, CITY_COLUMNS, acs_vintages, acs_city_dataset
+from whatif import WhatIfBaseline, WHATIF_FIELDS, comparison_table
+from dag import DagExecutor, Node, STAGE_THREAD_PREFIX, version_key
+from animation import RACE_BARS, race_figure
+from figures import SortedColumns, category_axis, category_positions, typed_figure, update_fingerprint
+from bootstrap import (
+    DISTRIBUTION_RANKS, REPLICATES, TOP_N, acs_margins, bootstrap_ranks, default_margins, rank_distribution,
+    rank_summary, replicates_for
+)
 warnings.filterwarnings('ignore')
 
+# Copy-on-write: frames handed to sessions share buffers with the process-wide
+# results and are copied only if a session writes to them (see scenario_snapshot)
+pd.set_option('mode.copy_on_write', True)
+
+# Dataset versions (see datasets.py)
+# - The built-in ACS 2023 city table is always available
+# - Each vintage ingested into ACS_DATA_DIR by acs_ingest.py is offered as another version
+# - Parquet tables written to SYNTHETIC_DATA_DIR by synthetic.py are load-test
+#   inputs for out_of_core.py and load_test.py; the dashboard offers them only
+#   when SYNTHETIC_DATASETS_ENV is set to 1
+# Every load is recorded with its content hash in DATASET_REGISTRY_PATH
+BUILTIN_DATASET = 'builtin'
+ACS_DATA_DIR = 'data/acs'
+SYNTHETIC_DATA_DIR = 'data/synthetic'
+SYNTHETIC_DATASETS_ENV = 'REVOLT_SYNTHETIC_DATASETS'
+DATASET_REGISTRY_PATH = '.dataset_registry.json'
+
+# Local geospatial inputs (see geospatial.py)
+# - city_centroids.csv: City, Latitude, Longitude
+# - facilities.csv: Facility_Id, Facility_Type (Charger / Substation), Latitude, Longitude
+# Without facilities.csv every distance falls back to Distance_from_Boston
+CITY_CENTROIDS_PATH = 'data/city_centroids.csv'
+FACILITIES_PATH = 'data/facilities.csv'
+SPATIAL_CACHE_DIR = '.spatial_cache'
+
+# Memory-mapped hourly load simulations (see load_simulation.py); the most
+# recently used LOAD_CACHE_ENTRIES are kept, in step with their cache entries
+LOAD_CACHE_DIR = '.load_cache'
+LOAD_CACHE_ENTRIES = 8
+
+# Cities the hourly load view simulates; larger (synthetic) tables are cut
+# to this many by forecast demand in the siting year
+LOAD_VIEW_CITIES = 500
+
+# Export files per scenario (see exports.py), built on demand under the app's
+# static folder so Streamlit's static route (server.enableStaticServing in
+# .streamlit/config.toml) streams them from disk; the EXPORT_SCENARIOS most
+# recently used scenario folders are kept
+EXPORT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static', 'exports')
+EXPORT_URL = 'app/static/exports'
+EXPORT_SCENARIOS = 4
+
+# Streamlit's static route refuses files above 200 MB
+STATIC_FILE_MAX_BYTES = 200 * 2 ** 20
+
+# Scenario results kept in the shared (per-process) data plane
+SHARED_SCENARIO_ENTRIES = 32
+
+# Seconds between background checks for new dataset or facility files
+REFRESH_INTERVAL_SECONDS = 300
+
+# Storage dtype of the precomputed feature matrices; float32 halves their
+# memory on large tract tables while scores still accumulate in float64
+# (numerics.compare_precision compares the two; see tests/test_numerics.py)
+FEATURE_DTYPE = np.float64
+
+# Rows per page in the paginated result tables (see tables.py)
+TABLE_PAGE_SIZE = 25
+
+# Dashboard views; only the selected one runs on a rerun (see main)
+DASHBOARD_VIEWS = [
+    "📈 BEV Market Analysis", "🎯 Priority Rankings", "⚠️ Risk Assessment", "🔍 What-If City Comparison",
+    "⚡ Infrastructure Feasibility & Grid Readiness"
+]
+
 def simple_linear_regression(x_data, y_data):
     """Simple linear regression without sklearn dependency"""
     n = len(x_data)
@@ -457,7 +551,9 @@ def load_authentic_massachusetts_cities_complete():
     return pd.DataFrame(cities_data)
 
 @st.cache_data
-def calculate_authentic_linear_regression_forecasts(cities_df):
+def calculate_authentic_linear_regression_forecasts(cities_df, state_target=STATE_TARGET_2025,
+                                                    population_share=ALLOCATION_POPULATION_SHARE,
+                                                    readiness_weights=None, _features=None):
     """
     Calculate forecasts based on AUTHENTIC state targets and demographic allocation
     
@@ -486,15 +582,20 @@ def calculate_authentic_linear_regression_forecasts(cities_df):
     - Population-based allocation: Standard demographic modeling approach
     - Readiness factors: Based on peer-reviewed EV adoption research
     - Growth rates: Calculated to meet authentic state targets
+    
+    SCENARIO PARAMETERS:
+    - state_target, population_share and readiness_weights default to the
+      official target and research-based weights; the sidebar overrides them
+    - _features: precomputed matrices from the scenario stage graph (not hashed)
     """
     
     # AUTHENTIC STATE DATA - All from official Massachusetts sources
     authentic_state_data = {
         'Current_ZEVs_Jan_2024': 66025,  # Official - Mass.gov 2024 Climate Report
         'Total_EVs_Including_PHEV_Jan_2024': 104457,  # Official - Mass.gov data
-        'State_Target_2025': 200000,  # Official - MA Clean Energy and Climate Plan
+        'State_Target_2025': int(state_target),  # Official - MA Clean Energy and Climate Plan (200,000)
         'Record_Sales_Nov_Dec_2024': 11000,  # Official - Mass.gov 2024 Climate Report
-        'Estimated_Current_Total': 77025,  # 66,025 + 11,000 Nov-Dec sales
+        'Estimated_Current_Total': ESTIMATED_CURRENT_EVS,  # 66,025 + 11,000 Nov-Dec sales
         'Data_Sources': {
             'Primary': 'Mass.gov 2024 Climate Report Card - Transportation',
             'URL': 'https://www.mass.gov/info-details/2024-massachusetts-climate-report-card-transportation-decarbonization',
@@ -502,120 +603,45 @@ def calculate_authentic_linear_regression_forecasts(cities_df):
         }
     }
     
-    # Calculate EV Adoption Readiness Score for allocation (AUTHENTIC FACTORS ONLY)
-    # Research-based weighting from peer-reviewed EV adoption studies
-    def calculate_authentic_readiness(row):
-        """
-        Calculate EV adoption readiness based on verified demographic correlates
-        
-        RESEARCH SOURCES:
-        - Income correlation: US DOE FOTW #1167 (Jan 31, 2022)
-          "Median Income of ZIP Codes Where Electric Vehicles are Registered"
-        - Education correlation: Pew Research Center studies on technology adoption
-        - Infrastructure: NREL studies on home charging access
-        - Market size: Standard demographic modeling practices
-        - Transport patterns: ICCT studies on car dependency and EV adoption
-        """
-        
-        # Income factor (normalized to MA median $101,341 from Census)
-        # Research shows strong correlation between income and EV adoption
-        income_factor = min(row['Median_Income'] / 101341, 1.0)
-        
-        # Education factor (research shows correlation with EV adoption)
-        # Higher education correlates with early technology adoption
-        education_factor = row['Bachelor_Degree_Pct'] / 100
-        
-        # Infrastructure factor (single-family homes enable home charging)
-        # NREL research: Home charging is primary EV charging method
-        infrastructure_factor = row['Single_Family_Pct'] / 100
-        
-        # Market size factor (larger markets attract more EV sales/infrastructure)
-        market_factor = row['Population_2024'] / cities_df['Population_2024'].max()
-        
-        # Transportation dependency (car-dependent areas have more EV potential)
-        # ICCT research: EV adoption higher in car-dependent areas vs transit-oriented
-        transport_factor = row['Drive_Alone_Pct'] / 100
-        
-        # Distance factor (proximity to infrastructure and dealer networks)
-        distance_factor = max(0.5, 1.0 - (row['Distance_from_Boston'] / 100))
-        
-        # Weighted readiness score (research-based weights)
-        # Weights based on relative importance in EV adoption literature
-        readiness_score = (
-            income_factor * 0.25 +      # Economic capacity - primary barrier
-            education_factor * 0.25 +   # Tech adoption propensity  
-            infrastructure_factor * 0.20 + # Home charging access
-            market_factor * 0.15 +      # Market size effects
-            transport_factor * 0.10 +   # Car dependency
-            distance_factor * 0.05      # Infrastructure access
-        )
-        
-        return min(readiness_score, 1.0)
-    
-    cities_df['Adoption_Readiness'] = cities_df.apply(calculate_authentic_readiness, axis=1)
-    
-    # Allocate current EVs based on population and readiness (REALISTIC ALLOCATION)
-    cities_df['Population_Weight'] = cities_df['Population_2024'] / cities_df['Population_2024'].sum()
-    cities_df['Readiness_Weight'] = cities_df['Adoption_Readiness'] / cities_df['Adoption_Readiness'].sum()
-    
-    # Combined allocation weight (70% population-based, 30% readiness-based)
-    cities_df['Allocation_Weight'] = (
-        cities_df['Population_Weight'] * 0.7 + 
-        cities_df['Readiness_Weight'] * 0.3
-    )
-    
-    # Allocate current EVs based on authentic state total
-    current_total = authentic_state_data['Estimated_Current_Total']
-    cities_df['Current_EVs_Estimate'] = (cities_df['Allocation_Weight'] * current_total).astype(int)
+    features = _features if _features is not None else build_feature_matrices(cities_df)
     
-    # AUTHENTIC LINEAR REGRESSION TO STATE TARGET
+    # Calculate EV Adoption Readiness Score for allocation (AUTHENTIC FACTORS ONLY)
+    # Research-based weighting from peer-reviewed EV adoption studies:
+    # - Income correlation: US DOE FOTW #1167 (Jan 31, 2022), normalized to MA median $101,341
+    # - Education correlation: Pew Research Center studies on technology adoption
+    # - Infrastructure: NREL studies on home charging access (single-family homes)
+    # - Market size: Standard demographic modeling practices
+    # - Transport patterns: ICCT studies on car dependency and EV adoption
+    # - Distance: proximity to infrastructure and dealer networks
+    cities_df['Adoption_Readiness'] = readiness_scores(features, readiness_weights)
+    
+    # Allocate current EVs and the state target based on population and readiness
+    # (70% population-based, 30% readiness-based by default)
     # Massachusetts official target: 200,000 EVs by 2025
     # Source: https://www.mass.gov/info-details/massachusetts-clean-energy-and-climate-plan-2025-and-2030
-    state_target = authentic_state_data['State_Target_2025']
-    cities_df['Target_Share_2025'] = (cities_df['Allocation_Weight'] * state_target).astype(int)
-    
-    # Linear growth rate to reach 2025 target (authentic timeline)
-    # Based on realistic path from current 77,025 EVs to 200,000 target
-    def calculate_authentic_growth_rate(current_evs, target_2025):
-        """
-        Calculate compound annual growth rate to reach official state target
-        
-        METHODOLOGY:
-        - Uses compound annual growth rate (CAGR) formula
-        - Timeline: 2024 to 2025 (1 year to reach target)
-        - Caps growth at 200% to avoid unrealistic projections
-        - Default 50% growth for cities with minimal current allocation
-        """
-        if current_evs > 0:
-            # Calculate compound annual growth rate to reach target
-            years_to_target = 1.0  # 2024 to 2025
-            growth_rate = (target_2025 / current_evs) ** (1/years_to_target) - 1
-            return min(growth_rate, 2.0)  # Cap at 200% to avoid unrealistic projections
-        else:
-            return 0.5  # Default 50% growth for cities with no current allocation
-    
-    cities_df['Growth_Rate'] = cities_df.apply(
-        lambda x: calculate_authentic_growth_rate(x['Current_EVs_Estimate'], x['Target_Share_2025']), axis=1
+    #
+    # Growth rate is the compound annual growth rate to reach the 2025 target,
+    # capped at 200% to avoid unrealistic projections (50% default with no allocation)
+    allocation = allocate_forecasts(
+        features['population'],
+        cities_df['Adoption_Readiness'].to_numpy(),
+        current_total=authentic_state_data['Estimated_Current_Total'],
+        state_target=state_target,
+        population_share=population_share
     )
+    for column, values in allocation.items():
+        cities_df[column] = values
     
-    # Linear regression forecasts for 1, 3, 5 years from current baseline
-    forecast_years = [2025, 2027, 2029]
-    
-    for year in forecast_years:
-        years_ahead = year - 2024
-        # Linear compound growth model
-        cities_df[f'EV_Forecast_{year}'] = (
-            cities_df['Current_EVs_Estimate'] * 
-            ((1 + cities_df['Growth_Rate']) ** years_ahead)
-        ).astype(int)
+    # Allocated total (equals the target unless the 200% growth cap makes it infeasible)
+    authentic_state_data['Allocated_Target_2025'] = int(allocation['Target_Share_2025'].sum())
     
     # Add state context for validation
-    cities_df['State_Context'] = 'Based on authentic MA target of 200,000 EVs by 2025'
+    cities_df['State_Context'] = f'Based on authentic MA target of {int(state_target):,} EVs by 2025'
     
     return cities_df, authentic_state_data
 
 @st.cache_data
-def create_priority_factors_data(cities_df):
+def create_priority_factors_data(cities_df, weights=None, _features=None):
     """
     Create priority ranking with authentic demographic factors
     
@@ -642,48 +668,33 @@ def create_priority_factors_data(cities_df):
     - Single-family housing: Enables home charging (NREL research)
     - Distance from Boston: Infrastructure and dealer network accessibility
     - Drive-alone commuting: Indicates car dependency and EV suitability
+    
+    Factor weights can be overridden through weights (see scoring.PRIORITY_WEIGHTS);
+    the score is a single matrix-vector product over the precomputed factors.
     """
     
     priority_df = cities_df.copy()
+    features = _features if _features is not None else build_feature_matrices(cities_df)
     
     # Authentic factors from verified data sources
-    # Factor 1: Economic Capacity (Income + Home Value)
-    priority_df['Economic_Score'] = (
-        (priority_df['Median_Income'] / priority_df['Median_Income'].max()) * 0.6 +
-        (priority_df['Median_Home_Value'] / priority_df['Median_Home_Value'].max()) * 0.4
-    )
-    
+    # Factor 1: Economic Capacity (Income 60% + Home Value 40%)
     # Factor 2: Education/Tech Adoption (Bachelor's Degree %)
-    priority_df['Education_Score'] = priority_df['Bachelor_Degree_Pct'] / 100
-    
-    # Factor 3: Infrastructure Readiness (Single Family Homes + Distance from Boston)
-    priority_df['Infrastructure_Score'] = (
-        (priority_df['Single_Family_Pct'] / 100) * 0.6 +
-        (1 - priority_df['Distance_from_Boston'] / priority_df['Distance_from_Boston'].max()) * 0.4
-    )
-    
+    # Factor 3: Infrastructure Readiness (Single Family Homes 60% + Distance from Boston 40%)
     # Factor 4: Market Size (Population)
-    priority_df['Market_Size_Score'] = priority_df['Population_2024'] / priority_df['Population_2024'].max()
-    
     # Factor 5: Transportation Pattern (Drive Alone - higher = more car dependent = more EV potential)
-    priority_df['Transport_Score'] = priority_df['Drive_Alone_Pct'] / 100
+    for j, factor in enumerate(PRIORITY_WEIGHTS):
+        priority_df[factor] = features['priority'][:, j]
     
     # Calculate overall priority score
-    priority_df['Priority_Score'] = (
-        priority_df['Economic_Score'] * 0.25 +
-        priority_df['Education_Score'] * 0.20 +
-        priority_df['Infrastructure_Score'] * 0.20 +
-        priority_df['Market_Size_Score'] * 0.20 +
-        priority_df['Transport_Score'] * 0.15
-    )
+    priority_df['Priority_Score'] = priority_scores(features, weights)
     
     # Priority ranking (highest score gets rank 1)
-    priority_df['Priority_Rank'] = priority_df['Priority_Score'].rank(ascending=False, method='dense').astype(int)
+    priority_df['Priority_Rank'] = dense_rank(priority_df['Priority_Score'].to_numpy())
     
     return priority_df
 
 @st.cache_data
-def create_risk_assessment_matrix(cities_df):
+def create_risk_assessment_matrix(cities_df, weights=None, _features=None):
     """
     Create comprehensive risk assessment for all 20 cities
     
@@ -719,89 +730,33 @@ def create_risk_assessment_matrix(cities_df):
        - High transit use + low driving: Less car dependency
        - Transit-oriented communities may resist private vehicle ownership
        - Based on transportation behavior research
+    
+    The four factors are summed with equal weight by default; relative weights
+    (see scoring.RISK_WEIGHTS) are rescaled so the overall score stays on the
+    4-12 scale and the category thresholds keep their meaning.
     """
     
     risk_df = cities_df.copy()
+    features = _features if _features is not None else build_feature_matrices(cities_df)
     
-    # Risk Factor 1: Economic Barriers
-    def assess_economic_risk(income):
-        if income < 50000:
-            return 3  # High risk
-        elif income < 75000:
-            return 2  # Medium risk
-        else:
-            return 1  # Low risk
-    
-    # Risk Factor 2: Infrastructure Challenges
-    def assess_infrastructure_risk(single_family_pct, distance, urban_class):
-        risk_score = 0
-        
-        # Parking/charging availability risk
-        if single_family_pct < 30:
-            risk_score += 1
-        
-        # Distance from infrastructure risk
-        if distance > 40:
-            risk_score += 1
-        
-        # Urban density challenges
-        if urban_class == 'Urban Core':
-            risk_score += 1
-        
-        return min(risk_score + 1, 3)  # Convert to 1-3 scale
-    
-    # Risk Factor 3: Demographic Adoption Barriers
-    def assess_demographic_risk(education_pct):
-        if education_pct < 25:
-            return 3  # High risk
-        elif education_pct < 45:
-            return 2  # Medium risk
-        else:
-            return 1  # Low risk
-    
-    # Risk Factor 4: Market Readiness
-    def assess_market_risk(transit_pct, drive_alone_pct):
-        # High transit use + low driving = potential market resistance
-        if transit_pct > 20 and drive_alone_pct < 50:
-            return 3  # High risk
-        elif transit_pct > 10 or drive_alone_pct < 70:
-            return 2  # Medium risk
-        else:
-            return 1  # Low risk
-    
-    # Apply risk assessments
-    risk_df['Economic_Risk'] = risk_df['Median_Income'].apply(assess_economic_risk)
-    risk_df['Infrastructure_Risk'] = risk_df.apply(
-        lambda x: assess_infrastructure_risk(x['Single_Family_Pct'], x['Distance_from_Boston'], x['Urban_Classification']), axis=1
-    )
-    risk_df['Demographic_Risk'] = risk_df['Bachelor_Degree_Pct'].apply(assess_demographic_risk)
-    risk_df['Market_Risk'] = risk_df.apply(
-        lambda x: assess_market_risk(x['Public_Transit_Pct'], x['Drive_Alone_Pct']), axis=1
-    )
+    # Risk Factor 1: Economic Barriers (<$50k high, <$75k medium)
+    # Risk Factor 2: Infrastructure Challenges (single-family <30%, distance >40mi, urban core)
+    # Risk Factor 3: Demographic Adoption Barriers (bachelor's <25% high, <45% medium)
+    # Risk Factor 4: Market Readiness (high transit use + low driving = potential market resistance)
+    for j, factor in enumerate(RISK_WEIGHTS):
+        risk_df[factor] = features['risk'][:, j]
     
     # Calculate overall risk score (4-12 scale)
-    risk_df['Overall_Risk_Score'] = (
-        risk_df['Economic_Risk'] + 
-        risk_df['Infrastructure_Risk'] + 
-        risk_df['Demographic_Risk'] + 
-        risk_df['Market_Risk']
-    )
+    risk_df['Overall_Risk_Score'] = risk_scores(features, weights)
     
-    # Categorize overall risk
-    def categorize_risk(score):
-        if score >= 10:
-            return "High Risk"
-        elif score >= 7:
-            return "Medium Risk"
-        else:
-            return "Low Risk"
-    
-    risk_df['Risk_Category'] = risk_df['Overall_Risk_Score'].apply(categorize_risk)
+    # Categorize overall risk (>=10 High, >=7 Medium, else Low)
+    risk_df['Risk_Category'] = categorize_risk(risk_df['Overall_Risk_Score'].to_numpy())
     
     return risk_df
 
 @st.cache_data
-def create_infrastructure_data(cities_df):
+def create_infrastructure_data(cities_df, charging_weights=None, grid_weights=None,
+                               infrastructure_weights=None, _features=None):
     """
     Create infrastructure readiness assessment
     
@@ -838,63 +793,926 @@ def create_infrastructure_data(cities_df):
     - 0.75+ = High Readiness: Minimal barriers to EV adoption
     - 0.5-0.75 = Medium Readiness: Some investment needed
     - <0.5 = Low Readiness: Significant infrastructure upgrades required
+    
+    Component weights can be overridden (see scoring.CHARGING_WEIGHTS,
+    GRID_WEIGHTS and INFRASTRUCTURE_WEIGHTS).
     """
     
     infra_df = cities_df.copy()
+    features = _features if _features is not None else build_feature_matrices(cities_df)
     
     # Charging Infrastructure Score
-    def calculate_charging_score(row):
-        # Single family homes provide easier home charging
-        home_charging_score = row['Single_Family_Pct'] / 100
-        
-        # Urban cores have more public charging potential
-        urban_charging_scores = {'Urban Core': 0.9, 'Urban': 0.7, 'Suburban': 0.5}
-        urban_charging_score = urban_charging_scores[row['Urban_Classification']]
-        
-        # Distance from Boston affects infrastructure investment
-        distance_score = max(0.3, 1.0 - (row['Distance_from_Boston'] / 100))
-        
-        return (home_charging_score * 0.4 + urban_charging_score * 0.4 + distance_score * 0.2)
-    
+    # - Single family homes provide easier home charging
+    # - Urban cores have more public charging potential
+    # - Distance from Boston affects infrastructure investment
     # Grid Capacity Score
-    def calculate_grid_capacity(row):
-        # Larger populations need more grid capacity
-        pop_demand = row['Population_2024'] / 100000  # Normalize
+    # - Economic capacity to invest in grid upgrades
+    # - Distance from major infrastructure
+    # - Demand headroom (larger populations need more grid capacity)
+    charging_score, grid_score, readiness = infrastructure_scores(
+        features, charging_weights, grid_weights, infrastructure_weights
+    )
+    infra_df['Charging_Infrastructure_Score'] = charging_score
+    infra_df['Grid_Capacity_Score'] = grid_score
+    
+    # Overall Infrastructure Readiness
+    infra_df['Infrastructure_Readiness'] = readiness
+    
+    # Categorize infrastructure readiness (>=0.75 High, >=0.5 Medium, else Low)
+    infra_df['Infrastructure_Category'] = categorize_infrastructure(readiness)
+    
+    return infra_df
+
+@st.cache_data
+def create_investment_data(infrastructure_version, _infra_df):
+    """
+    Infrastructure investment priority (need x demand) and category per city
+    
+    - Investment_Priority: 60% readiness gap (1 - Infrastructure_Readiness)
+      + 40% 2029 demand relative to the largest city
+    - Investment_Category: low readiness < 0.5, high demand > 2,000 EVs
+    
+    Keyed on the infrastructure stage version (see stage_version), not on
+    the frame, so a rerun does not hash the table.
+    """
+    investment_df = _infra_df.copy()
+    readiness = investment_df['Infrastructure_Readiness'].to_numpy()
+    forecast_2029 = investment_df['EV_Forecast_2029'].to_numpy()
+    
+    # Higher need and higher demand = higher priority
+    investment_df['Investment_Priority'] = investment_priority(readiness, forecast_2029, forecast_2029.max())
+    
+    # Categorize investment needs (low readiness < 0.5, high demand > 2,000 EVs)
+    investment_df['Investment_Category'] = categorize_investment(readiness, forecast_2029)
+    
+    return investment_df
+
+# Lookups that every rerun hits skip the cache spinner: Streamlit starts a
+# timer thread for it on every call, hit or miss
+@st.cache_resource(show_spinner=False)
+def dataset_registry():
+    """Process-wide dataset registry (shared by every session)"""
+    return DatasetRegistry(DATASET_REGISTRY_PATH)
+
+def dataset_file_signature():
+    """Count and latest modification time of the ingested ACS and (when enabled) synthetic files"""
+    data_dirs = (ACS_DATA_DIR, SYNTHETIC_DATA_DIR) if os.environ.get(SYNTHETIC_DATASETS_ENV) == '1' else (ACS_DATA_DIR,)
+    mtimes = [
+        os.path.getmtime(os.path.join(root, name))
+        for data_dir in data_dirs if os.path.isdir(data_dir)
+        for root, _, files in os.walk(data_dir) for name in files
+    ]
+    if not mtimes:
+        return None
+    return len(mtimes), max(mtimes)
+
+def synthetic_datasets():
+    """
+    Names of the synthetic tables in SYNTHETIC_DATA_DIR (file stems), or none
+    unless SYNTHETIC_DATASETS_ENV is set to 1
+    """
+    if os.environ.get(SYNTHETIC_DATASETS_ENV) != '1' or not os.path.isdir(SYNTHETIC_DATA_DIR):
+        return []
+    return sorted(name[:-len('.parquet')] for name in os.listdir(SYNTHETIC_DATA_DIR) if name.endswith('.parquet'))
+
+@st.cache_data(show_spinner=False)
+def dataset_choices(file_signature):
+    """Dataset options: the built-in table, one per ingested ACS vintage and one per synthetic table"""
+    return [BUILTIN_DATASET] + [f'acs-{vintage}' for vintage in acs_vintages(ACS_DATA_DIR)] + \
+        [f'synthetic-{name}' for name in synthetic_datasets()]
+
+def dataset_label(dataset):
+    if dataset == BUILTIN_DATASET:
+        return "ACS 2023 (built-in)"
+    kind, name = dataset.split('-', 1)
+    if kind == 'synthetic':
+        return f"{name} (synthetic)"
+    return f"ACS {name} (ingested)"
+
+@st.cache_data
+def load_dataset(dataset, file_signature):
+    """
+    Load one city dataset and record it in the dataset registry
+    
+    VERSIONING:
+    - Version ID = dataset name + schema version + content hash prefix
+      (see datasets.dataset_record), with source metadata and load time
+    - Every downstream cache is keyed on the version ID (scenario results,
+      feature matrices, facility distances, exports, tables, figures and the
+      hourly load files), never on the frames themselves
+    - Identical data keeps its version, so switching back to a dataset hits
+      every cache; edited files get a new version, so results computed from
+      the old data are never served again
+    
+    Returns (registry record, city DataFrame).
+    """
+    if dataset.startswith('synthetic-'):
+        stem = dataset.split('-', 1)[1]
+        if stem not in synthetic_datasets():
+            raise ValueError(f"Synthetic dataset {stem!r} is not enabled; set {SYNTHETIC_DATASETS_ENV}=1")
+        path = os.path.join(SYNTHETIC_DATA_DIR, f'{stem}.parquet')
+        cities_df = pd.read_parquet(path)
+        sources = [{'fields': CITY_COLUMNS[1:], 'source': 'Synthetic (synthetic.py)', 'files': [path]}]
+        record = dataset_registry().register(dataset, cities_df, sources)
+        return record, cities_df
+    
+    base_df = load_authentic_massachusetts_cities_complete()
+    if dataset == BUILTIN_DATASET:
+        cities_df, sources, vintage = base_df, BUILTIN_SOURCES, 2023
+    else:
+        vintage = int(dataset.split('-', 1)[1])
+        cities_df, sources = acs_city_dataset(base_df, ACS_DATA_DIR, vintage)
+    
+    name = f'acs{vintage}-builtin' if dataset == BUILTIN_DATASET else f'acs{vintage}-ingested'
+    record = dataset_registry().register(name, cities_df, sources, vintage)
+    return record, cities_df
+
+@st.cache_data(show_spinner=False)
+def loaded_dataset_record(dataset, file_signature):
+    """
+    Registry record of a loaded dataset, without its table
+    
+    The sidebar and dataset_version read only the record on every rerun; a
+    load_dataset cache hit would copy the whole city table out of
+    st.cache_data each time.
+    """
+    return load_dataset(dataset, file_signature)[0]
+
+def dataset_version(dataset):
+    """Version ID of a dataset as currently on disk"""
+    return loaded_dataset_record(dataset, dataset_file_signature())['version_id']
+
+def spatial_file_signature():
+    """Modification times of the geospatial inputs, so edited files invalidate the cache"""
+    return tuple(
+        os.path.getmtime(path) if os.path.exists(path) else None
+        for path in (CITY_CENTROIDS_PATH, FACILITIES_PATH)
+    )
+
+@st.cache_data
+def load_facility_distances(dataset_version, file_signature, _cities_df):
+    """
+    Nearest and k-nearest charger / substation distances for every city
+    
+    Distances are great-circle miles from the city centroid, computed through
+    a spatial index that is cached on disk in SPATIAL_CACHE_DIR, so a restart
+    with unchanged files skips the index build and the queries.
+    """
+    return attach_facility_distances(
+        _cities_df, CITY_CENTROIDS_PATH, FACILITIES_PATH, k=3, cache_dir=SPATIAL_CACHE_DIR
+    )
+
+@st.cache_data
+def create_forecast_horizon(forecast_df, end_year, periods_per_year=1):
+    """
+    EV forecasts for every city over an arbitrary horizon, in long form
+    
+    HORIZON METHODOLOGY:
+    - Same allocation and growth model as the report years: each city's
+      current estimate compounded at its growth rate from 2024
+    - Dense cities x time points array from one broadcasted power
+      (see scoring.forecast_matrix), stored as City / Year / EV_Forecast rows
+    - periods_per_year=12 gives monthly points as fractional years
+    
+    Charts and tables select years from this table, so planning years such
+    as 2030 and 2035 need no extra columns.
+    """
+    horizon = horizon_grid(FORECAST_BASE_YEAR, end_year, periods_per_year)
+    forecast = forecast_matrix(
+        forecast_df['Current_EVs_Estimate'].to_numpy(), forecast_df['Growth_Rate'].to_numpy(), horizon
+    )
+    return forecast_long(forecast_df['City'].to_numpy(), horizon, forecast)
+
+def forecast_by_year(horizon_df, years, cities):
+    """
+    Forecasts for several horizon years, {year: array in the given city order}
+    
+    Every year holds one row per city in the same order (forecast_long), so
+    the alignment to cities is resolved once and reused for each year.
+    """
+    year_values = horizon_df['Year'].to_numpy()
+    forecasts = horizon_df['EV_Forecast'].to_numpy()
+    first_year = np.isclose(year_values, years[0])
+    positions = pd.Index(horizon_df['City'].to_numpy()[first_year]).get_indexer(cities)
+    return {year: forecasts[np.isclose(year_values, year)][positions] for year in years}
+
+@st.cache_resource(max_entries=SHARED_SCENARIO_ENTRIES, show_spinner=False)
+def forecast_race(horizon_version, _horizon_df, periods_per_year):
+    """
+    Animated bar race of the horizon forecast, built once per horizon version
+    
+    FRAMES:
+    - One frame per horizon time point (yearly or monthly), each holding the
+      RACE_BARS leading cities in rank order
+    - All frames come from the dense cities x time points forecast of the
+      horizon stage: a reshape of its table and one partial sort down the
+      city axis (see animation.py), with no per-frame pipeline run
+    - Keyed on the horizon stage version (dataset version, forecast and
+      horizon parameters), so every session and rerun of a scenario shares
+      one prebuilt figure and playback runs entirely in the browser
+    """
+    cities, horizon, forecast = forecast_wide(_horizon_df)
+    return race_figure(
+        cities, horizon, forecast, periods_per_year,
+        title=f'Top {min(RACE_BARS, len(cities))} Cities by EV Forecast, '
+              f'{FORECAST_BASE_YEAR}-{int(horizon[-1])} ({"Monthly" if periods_per_year == 12 else "Annual"})'
+    )
+
+def load_scenario_cities(dataset, dataset_version, spatial_signature):
+    """City table of a dataset version with facility distances attached"""
+    record, base_df = load_dataset(dataset, dataset_file_signature())
+    if record['version_id'] != dataset_version:
+        # Files changed between resolving the version and running the scenario
+        raise RuntimeError(f"Dataset {dataset} is now {record['version_id']}, "
+                           f"not {dataset_version}; rerun to pick up the new version")
+    return load_facility_distances(record['version_id'], spatial_signature, base_df)
+
+@st.cache_resource(show_spinner=False)
+def scenario_dag():
+    """
+    Process-wide stage graph behind shared_scenario_results
+    
+    STAGE GRAPH:
+    - cities -> features -> forecast -> {priority, risk, infrastructure, horizon}
+    - Each stage declares its upstream stages and the sidebar parameters it
+      reads; results are memoized by (upstream versions, own parameters), so
+      moving a risk weight recomputes only the risk stage and a readiness
+      weight only the forecast and what follows it (see dag.py)
+    - Stage functions are called unwrapped: the graph's versions replace
+      st.cache_data, which would hash every DataFrame at every edge
+    - Priority, risk, infrastructure and horizon run concurrently
+    """
+    # Stage threads run outside any session; Streamlit would log a
+    # missing-ScriptRunContext warning for them
+    logging.getLogger('streamlit.runtime.scriptrunner.script_run_context').addFilter(
+        lambda record: not record.threadName.startswith(STAGE_THREAD_PREFIX)
+    )
+    return DagExecutor([
+        Node('cities', load_scenario_cities, params=('dataset', 'dataset_version', 'spatial_signature')),
+        # Normalized feature matrices, once per dataset version: a weight change only reruns the rescoring
+        Node('features', lambda cities_df: build_feature_matrices(cities_df, FEATURE_DTYPE), inputs=('cities',)),
+        Node('forecast', lambda cities_df, features, **scenario: calculate_authentic_linear_regression_forecasts
+             .__wrapped__(cities_df.copy(), _features=features, **scenario),
+             inputs=('cities', 'features'), params=('state_target', 'population_share', 'readiness_weights')),
+        Node('priority', lambda forecast, features, priority_weights: create_priority_factors_data
+             .__wrapped__(forecast[0], priority_weights, _features=features),
+             inputs=('forecast', 'features'), params=('priority_weights',)),
+        Node('risk', lambda forecast, features, risk_weights: create_risk_assessment_matrix
+             .__wrapped__(forecast[0], risk_weights, _features=features),
+             inputs=('forecast', 'features'), params=('risk_weights',)),
+        Node('infrastructure', lambda forecast, features, **weights: create_infrastructure_data
+             .__wrapped__(forecast[0], _features=features, **weights),
+             inputs=('forecast', 'features'),
+             params=('charging_weights', 'grid_weights', 'infrastructure_weights')),
+        Node('horizon', lambda forecast, horizon_end, periods_per_year: create_forecast_horizon
+             .__wrapped__(forecast[0], horizon_end, periods_per_year),
+             inputs=('forecast',), params=('horizon_end', 'periods_per_year'))
+    ], max_entries=SHARED_SCENARIO_ENTRIES)
+
+@st.cache_resource(max_entries=SHARED_SCENARIO_ENTRIES, show_spinner=False)
+def shared_scenario_results(params):
+    """
+    Load data and run forecast, priority, risk and infrastructure stages for a scenario
+    
+    SHARED DATA PLANE:
+    - One set of result tables per scenario per process (st.cache_resource),
+      not a fresh unpickled copy for every session and rerun as with
+      st.cache_data
+    - Sessions on the same scenario - typically most analysts on the research
+      defaults - all read the same frames
+    - Keyed on the small params dict, so reruns that don't touch the sidebar
+      skip re-hashing the stage DataFrames entirely
+    - A new scenario runs through scenario_dag, which reuses every stage
+      whose inputs and parameters are unchanged
+    
+    Callers go through run_scenario_pipeline, which hands out copy-on-write
+    views so no session can modify the shared tables.
+    """
+    results = scenario_dag().run(params)
+    forecast_df, state_data = results['forecast']
+    return (results['cities'], forecast_df, state_data, results['priority'], results['risk'],
+            results['infrastructure'], results['horizon'])
+
+def stage_version(params, stage):
+    """
+    Version of one stage's result for a scenario (see dag.py)
+    
+    Derived from the dataset version and every parameter upstream of the
+    stage, so caches of views built from that result key on this short
+    string instead of hashing the frame on every rerun.
+    """
+    return scenario_dag().versions(params)[stage]
+
+def scenario_snapshot(value):
+    """Read-safe view of a shared result: a lazy copy-on-write DataFrame, or a copied dict"""
+    if isinstance(value, pd.DataFrame):
+        return value.copy(deep=False)
+    return dict(value)
+
+def run_scenario_pipeline(params):
+    """
+    Scenario results for this session as views over the shared data plane
+    
+    Per-session state is then only the sidebar parameters (widget state) and
+    the session's figures; table data is shared with every other session on
+    the same scenario until a session modifies its own view.
+    """
+    return tuple(scenario_snapshot(value) for value in shared_scenario_results(params))
+
+def data_version(params):
+    """What a scenario's results depend on besides its parameters: dataset version and facility files"""
+    return dataset_version(params['dataset']), spatial_file_signature()
+
+def scenario_results(params, version):
+    """
+    A scenario's shared results for a data version
+    
+    The caches the views build from them (investment table, siting plan,
+    hourly load) are not warmed here: st.cache_data and st.cache_resource
+    neither read nor write outside a script run, so on the worker they
+    would be recomputed and thrown away. Each view fills them when it is
+    first opened for the scenario.
+    """
+    return shared_scenario_results(dict(params, dataset_version=version[0], spatial_signature=version[1]))
+
+@st.cache_resource(show_spinner=False)
+def background_refresher():
+    """Process-wide worker that keeps recently used scenarios computed for the current data"""
+    # The worker calls cached functions outside any session; Streamlit would
+    # log a missing-ScriptRunContext warning for each call
+    logging.getLogger('streamlit.runtime.scriptrunner.script_run_context').addFilter(
+        lambda record: record.threadName != WORKER_THREAD_NAME
+    )
+    return BackgroundRefresher(
+        scenario_results, data_version, interval=REFRESH_INTERVAL_SECONDS, max_tracked=SHARED_SCENARIO_ENTRIES
+    )
+
+def current_scenario_results(params):
+    """
+    Latest ready results for the sidebar scenario
+    
+    BACKGROUND REFRESH:
+    - Snapshots are keyed on the scenario without its data version, so a new
+      dataset version or facility file doesn't orphan the scenario
+    - When the data changed, this rerun shows the previous snapshot and the
+      worker recomputes in the background; the next rerun after it finishes
+      picks up the new snapshot (swapped in whole, see prefetch.py)
+    - The worker also re-checks every REFRESH_INTERVAL_SECONDS, so popular
+      scenarios are usually recomputed before anyone asks
+    - Only a scenario never requested before is computed in this rerun
+    
+    Returns (params, results): params carry the data version the results
+    were actually built from, so exports and tables key on the right one.
+    """
+    refresher = background_refresher()
+    key = scenario_key(dict(params, dataset_version=None, spatial_signature=None))
+    current = (params['dataset_version'], params['spatial_signature'])
+    
+    snapshot = refresher.snapshot(key)
+    if snapshot is None:
+        snapshot = refresher.compute_now(key, params)
+    elif tuple(snapshot.version) != current:
+        refresher.request(key, params)
+    else:
+        refresher.track(key, params)
+    
+    if tuple(snapshot.version) != current:
+        computed = datetime.fromtimestamp(snapshot.computed_at).strftime('%H:%M:%S')
+        st.sidebar.info(f"New data detected. Showing results computed at {computed} while the update runs "
+                        "in the background.")
+    
+    params = dict(params, dataset_version=snapshot.version[0], spatial_signature=snapshot.version[1])
+    return params, tuple(scenario_snapshot(value) for value in snapshot.value)
+
+def load_view_cities(infra_df, siting_year):
+    """
+    Rows the hourly load view simulates: the whole table, or on tables
+    larger than LOAD_VIEW_CITIES the LOAD_VIEW_CITIES with the highest
+    EV_Forecast_{siting_year} (ties in table order), kept in table order
+    """
+    if len(infra_df) <= LOAD_VIEW_CITIES:
+        return infra_df
+    demand = infra_df[f'EV_Forecast_{siting_year}'].to_numpy()
+    return infra_df.iloc[np.sort(np.argsort(-demand, kind='stable')[:LOAD_VIEW_CITIES])]
+
+@st.cache_data
+def create_charger_siting_plan(infrastructure_version, _infra_df, level2_budget, dc_fast_budget, grid_kw_per_score,
+                               siting_year=2025):
+    """
+    Allocate the charger budget across cities to maximize covered forecast EVs
+    
+    SITING METHODOLOGY:
+    - Demand: EV_Forecast_{siting_year} per city
+    - Coverage: each port serves a fixed number of EVs (see siting.CHARGER_TYPES,
+      ratios from NREL "The 2030 National Charging Network"), with diminishing
+      returns as a city's ports start to overlap
+    - Grid constraint: charger kW per city <= Grid_Capacity_Score x headroom
+    - Solver: lazy greedy with a priority queue (see siting.lazy_greedy_allocation)
+    
+    Keyed on the infrastructure stage version and the siting parameters,
+    not on the frame, so a rerun does not hash the table.
+    """
+    return charger_allocation_table(
+        _infra_df, level2_budget, dc_fast_budget, grid_kw_per_score, demand_column=f'EV_Forecast_{siting_year}'
+    )
+
+def hourly_load_path(infrastructure_version, grid_kw_per_score, siting_year):
+    """Memory-mapped hourly load file for a scenario's infrastructure stage, headroom and siting year"""
+    return os.path.join(LOAD_CACHE_DIR,
+                        f'hourly-{version_key(infrastructure_version, grid_kw_per_score, siting_year)}.npy')
+
+@st.cache_data(max_entries=LOAD_CACHE_ENTRIES)
+def simulate_city_grid_load(infrastructure_version, _infra_df, grid_kw_per_score, siting_year=2025):
+    """
+    Hourly EV charging load (8760 h) per city and forecast year
+    
+    LOAD MODEL:
+    - Expected kW per EV from home and public arrival/dwell profiles
+      (see load_simulation.CHARGING_PROFILES), with weekend and winter factors
+    - Home share of charging rises with Single_Family_Pct
+    - Capacity: Grid_Capacity_Score x the sidebar grid headroom
+    
+    The full hourly array is written to a memory-mapped .npy file named after
+    the infrastructure stage version (dataset version and every parameter
+    upstream of it) and the headroom, so the dashboard slices hours from
+    disk instead of holding cities x years x 8760 values in memory. Only the
+    load_view_cities are simulated (chosen by siting-year demand on large
+    tables); the array's city axis follows their order. Returns (peak table,
+    file path).
+    
+    Files beyond the LOAD_CACHE_ENTRIES most recently used are deleted as
+    new ones are written (see hourly_grid_load for a cached entry whose file
+    went first).
+    """
+    out_path = hourly_load_path(infrastructure_version, grid_kw_per_score, siting_year)
+    load_infra = load_view_cities(_infra_df, siting_year)
+    capacity_kw = load_infra['Grid_Capacity_Score'].to_numpy(dtype=float) * grid_kw_per_score
+    load_df = city_load_summary(load_infra, out_path, capacity_kw)
+    prune_hourly_loads(LOAD_CACHE_DIR, LOAD_CACHE_ENTRIES)
+    return load_df, out_path
+
+def hourly_grid_load(infrastructure_version, infra_df, grid_kw_per_score, siting_year):
+    """
+    simulate_city_grid_load, rebuilding the file when it was pruned while
+    its cache entry lived on (the file and cache LRU orders can drift, e.g.
+    after cache hits that never open the file)
+    """
+    load_df, load_path = simulate_city_grid_load(infrastructure_version, infra_df, grid_kw_per_score, siting_year)
+    if not os.path.exists(load_path):
+        simulate_city_grid_load.clear()
+        load_df, load_path = simulate_city_grid_load(infrastructure_version, infra_df, grid_kw_per_score, siting_year)
+    return load_df, load_path
+
+def reset_scenario_controls():
+    """Drop all sidebar widget state so every control returns to its default"""
+    for key in [key for key in st.session_state if key.startswith('scenario_')]:
+        del st.session_state[key]
+
+def weight_sliders(defaults, group, max_value=1.0, step=0.05):
+    """One slider per factor weight, keyed so values persist across reruns"""
+    return {
+        factor: st.slider(
+            factor.replace('_', ' '), 0.0, max_value, float(default), step,
+            key=f'scenario_{group}_{factor}'
+        )
+        for factor, default in defaults.items()
+    }
+
+def render_scenario_sidebar():
+    """
+    Sidebar controls for the state target, allocation split and factor weights
+    
+    Controls sit in a form so moving several sliders costs a single rerun when
+    Apply is pressed (debounced). Weights are relative: each stage rescales
+    them to its research-based total before scoring.
+    """
+    with st.sidebar.form('scenario_controls'):
+        st.header("Scenario Controls")
         
-        # Economic capacity to invest in grid upgrades
-        economic_capacity = min(row['Median_Income'] / 100000, 1.0)
+        dataset = st.selectbox(
+            "Dataset", dataset_choices(dataset_file_signature()), format_func=dataset_label, key='scenario_dataset',
+            help="City data version; ACS vintages ingested with acs_ingest.py appear here"
+        )
         
-        # Distance from major infrastructure
-        distance_factor = max(0.4, 1.0 - (row['Distance_from_Boston'] / 100))
+        state_target = st.number_input(
+            "State EV Target (2025)", min_value=50000, max_value=500000,
+            value=STATE_TARGET_2025, step=5000, key='scenario_state_target'
+        )
+        population_share = st.slider(
+            "Allocation Split (Population Share)", 0.0, 1.0, ALLOCATION_POPULATION_SHARE, 0.05,
+            key='scenario_population_share',
+            help="Share of EVs allocated by population; the rest follows adoption readiness"
+        )
         
-        # Calculate grid readiness (inverse of demand, positive for capacity)
-        grid_readiness = (economic_capacity * 0.5 + distance_factor * 0.3 + (1 - min(pop_demand, 1.0)) * 0.2)
+        with st.expander("Readiness Weights"):
+            readiness_weights = weight_sliders(READINESS_WEIGHTS, 'readiness')
+        with st.expander("Priority Weights"):
+            priority_weights = weight_sliders(PRIORITY_WEIGHTS, 'priority')
+        with st.expander("Risk Weights"):
+            risk_weights = weight_sliders(RISK_WEIGHTS, 'risk', max_value=3.0, step=0.1)
+        with st.expander("Infrastructure Weights"):
+            charging_weights = weight_sliders(CHARGING_WEIGHTS, 'charging')
+            grid_weights = weight_sliders(GRID_WEIGHTS, 'grid')
+            infrastructure_weights = weight_sliders(INFRASTRUCTURE_WEIGHTS, 'infrastructure')
+        with st.expander("Forecast Horizon"):
+            horizon_end = st.number_input(
+                "Horizon End Year", min_value=max(FORECAST_YEARS), max_value=2050, value=max(PLANNING_YEARS),
+                step=1, key='scenario_horizon_end'
+            )
+            resolution = st.selectbox(
+                "Resolution", ["Annual", "Monthly"], key='scenario_horizon_resolution'
+            )
+            chart_years = st.multiselect(
+                "Chart Years (up to 3)", list(range(FORECAST_BASE_YEAR + 1, 2051)), default=list(FORECAST_YEARS),
+                max_selections=3, key='scenario_chart_years',
+                help="Forecast years compared in the forecast chart and summary table"
+            )
+        with st.expander("Charger Budget"):
+            level2_budget = st.number_input(
+                "Level 2 Ports", min_value=0, max_value=100000, value=LEVEL2_BUDGET, step=100,
+                key='scenario_level2_budget'
+            )
+            dc_fast_budget = st.number_input(
+                "DC Fast Ports", min_value=0, max_value=20000, value=DC_FAST_BUDGET, step=10,
+                key='scenario_dc_fast_budget'
+            )
+            grid_kw_per_score = st.number_input(
+                "Grid Headroom at Score 1.0 (kW)", min_value=0, max_value=200000,
+                value=GRID_KW_PER_SCORE, step=1000, key='scenario_grid_kw_per_score',
+                help="Charger load a city can host is Grid Capacity Score x this value"
+            )
+            siting_year = st.selectbox(
+                "Siting Horizon", [2025, 2027, 2029], index=0, key='scenario_siting_year',
+                help="Forecast year whose EVs the chargers should cover"
+            )
         
-        return min(grid_readiness, 1.0)
-    
-    infra_df['Charging_Infrastructure_Score'] = infra_df.apply(calculate_charging_score, axis=1)
-    infra_df['Grid_Capacity_Score'] = infra_df.apply(calculate_grid_capacity, axis=1)
-    
-    # Overall Infrastructure Readiness
-    infra_df['Infrastructure_Readiness'] = (
-        infra_df['Charging_Infrastructure_Score'] * 0.6 + 
-        infra_df['Grid_Capacity_Score'] * 0.4
-    )
+        st.form_submit_button("Apply", type="primary")
+        st.form_submit_button("Reset to Research Defaults", on_click=reset_scenario_controls)
+    
+    record = loaded_dataset_record(dataset, dataset_file_signature())
+    st.sidebar.caption(f"Dataset version {record['version_id']} (loaded {record['loaded_at']})")
+    
+    return {
+        'dataset': dataset,
+        'dataset_version': record['version_id'],
+        'spatial_signature': spatial_file_signature(),
+        'state_target': int(state_target),
+        'population_share': float(population_share),
+        'readiness_weights': readiness_weights,
+        'priority_weights': priority_weights,
+        'risk_weights': risk_weights,
+        'charging_weights': charging_weights,
+        'grid_weights': grid_weights,
+        'infrastructure_weights': infrastructure_weights,
+        'level2_budget': int(level2_budget),
+        'dc_fast_budget': int(dc_fast_budget),
+        'grid_kw_per_score': float(grid_kw_per_score),
+        'siting_year': int(siting_year),
+        'horizon_end': int(max([horizon_end] + chart_years)),
+        'periods_per_year': 12 if resolution == "Monthly" else 1,
+        'chart_years': sorted(chart_years) or list(FORECAST_YEARS)
+    }
+
+def default_scenario_params():
+    """Scenario parameters with every control at its research default"""
+    return {
+        'dataset': BUILTIN_DATASET,
+        'dataset_version': dataset_version(BUILTIN_DATASET),
+        'spatial_signature': spatial_file_signature(),
+        'state_target': STATE_TARGET_2025,
+        'population_share': ALLOCATION_POPULATION_SHARE,
+        'readiness_weights': dict(READINESS_WEIGHTS),
+        'priority_weights': dict(PRIORITY_WEIGHTS),
+        'risk_weights': dict(RISK_WEIGHTS),
+        'charging_weights': dict(CHARGING_WEIGHTS),
+        'grid_weights': dict(GRID_WEIGHTS),
+        'infrastructure_weights': dict(INFRASTRUCTURE_WEIGHTS),
+        'level2_budget': LEVEL2_BUDGET,
+        'dc_fast_budget': DC_FAST_BUDGET,
+        'grid_kw_per_score': float(GRID_KW_PER_SCORE),
+        'siting_year': min(FORECAST_YEARS),
+        'horizon_end': max(PLANNING_YEARS),
+        'periods_per_year': 1,
+        'chart_years': list(FORECAST_YEARS)
+    }
+
+def load_city_centroids():
+    """City centroids for map exports (None when the file is missing)"""
+    if not os.path.exists(CITY_CENTROIDS_PATH):
+        return None
+    return pd.read_csv(CITY_CENTROIDS_PATH)
+
+def pipeline_export_tables(params):
+    """Full pipeline outputs for a scenario, keyed by export table name"""
+    cities_df, forecast_df, state_data, priority_df, risk_df, infra_df, horizon_df = run_scenario_pipeline(params)
+    return {
+        'forecast': forecast_df,
+        'forecast_horizon': horizon_df,
+        'priority': priority_df,
+        'risk': risk_df,
+        'infrastructure': infra_df,
+        'investment': create_investment_data(stage_version(params, 'infrastructure'), infra_df)
+    }
+
+def scenario_key(params):
+    """Short stable hash of the scenario parameters"""
+    return hashlib.sha256(json.dumps(params, sort_keys=True).encode()).hexdigest()[:16]
+
+def serve_export(path, label, file_name, mime, key):
+    """
+    Download link for one export file
     
-    # Categorize infrastructure readiness
-    def categorize_infrastructure(score):
-        if score >= 0.75:
-            return "High Readiness"
-        elif score >= 0.5:
-            return "Medium Readiness"
+    With static serving on, the link points at Streamlit's static route,
+    which streams the file from disk in chunks on request. Otherwise (or
+    above the route's size limit) the file goes through st.download_button,
+    which reads it whole into Streamlit's media store on every rerun.
+    """
+    if st.get_option('server.enableStaticServing') and os.path.getsize(path) <= STATIC_FILE_MAX_BYTES:
+        url = f"{EXPORT_URL}/{os.path.basename(os.path.dirname(path))}/{os.path.basename(path)}"
+        st.sidebar.markdown(f'<a href="{url}" download="{file_name}">Download {label}</a>', unsafe_allow_html=True)
+        return
+    with open(path, 'rb') as handle:
+        st.sidebar.download_button(
+            label, handle.read(), file_name=file_name, mime=mime, key=key, use_container_width=True
+        )
+
+def render_export_sidebar(params):
+    """
+    Export buttons for the current scenario's full results
+    
+    ON DEMAND:
+    - Nothing is written on a scenario change; a Prepare button writes one
+      format for the current scenario (in row-group / row-batch chunks, see
+      exports.py) into its folder under EXPORT_DIR
+    - A prepared file is reused by every session on the same scenario, and
+      only the EXPORT_SCENARIOS most recently used scenario folders are kept
+    - The batch CLI (python exports.py <out_dir>) writes every format at once
+    """
+    st.sidebar.header("Export Results")
+    out_dir = os.path.join(EXPORT_DIR, scenario_key(params))
+    labels = {'parquet': "Parquet (ZIP of tables)", 'excel': "Excel Workbook", 'geojson': "GeoJSON (City Points)"}
+    
+    for export_format, (file_name, mime) in EXPORT_FORMATS.items():
+        path = os.path.join(out_dir, file_name)
+        if not os.path.exists(path):
+            if not st.sidebar.button(f"Prepare {labels[export_format]}", key=f'export_prepare_{export_format}',
+                                     use_container_width=True):
+                continue
+            with st.spinner(f"Writing {labels[export_format]}..."):
+                path = export_file(lambda: pipeline_export_tables(params), out_dir, export_format, load_city_centroids)
+            prune_export_dirs(EXPORT_DIR, EXPORT_SCENARIOS)
+            if path is None:
+                st.sidebar.caption(f"{labels[export_format]}: unavailable (missing dependency or centroid file)")
+                continue
         else:
-            return "Low Readiness"
+            os.utime(out_dir)
+        serve_export(path, labels[export_format], file_name, mime, f'export_{export_format}')
+
+def city_categories(risk_df, infra_df):
+    """Risk and readiness category per city, used as filters on the result tables"""
+    return risk_df[['City', 'Risk_Category']].merge(
+        infra_df[['City', 'Infrastructure_Category']], on='City', how='outer'
+    ).rename(columns={'Risk_Category': 'Risk Category', 'Infrastructure_Category': 'Readiness Category'})
+
+@st.cache_resource(max_entries=64, show_spinner=False)
+def table_index(name, key, _df):
+    """
+    Shared TableIndex for one result table of one scenario
     
-    infra_df['Infrastructure_Category'] = infra_df['Infrastructure_Readiness'].apply(categorize_infrastructure)
+    Keyed on the table name and scenario hash (the frame itself is not
+    hashed), so sort permutations built by one session are reused by every
+    rerun and session looking at the same scenario.
+    """
+    return TableIndex(_df, search_column='City', filter_columns=('Risk Category', 'Readiness Category'))
+
+def render_paginated_table(name, df, key, sort_column, ascending=False, formatters=None,
+                           page_size=TABLE_PAGE_SIZE):
+    """
+    Result table filtered, sorted and paged on the server
     
-    return infra_df
+    Only the visible page is sent to the browser. Filters cover the risk and
+    readiness categories and a city name search; sorting reuses the cached
+    permutation for the chosen column. formatters maps a column to a
+    function applied to the page only (e.g. percent strings), so sorting
+    still uses the numeric values.
+    """
+    index = table_index(name, key, df)
+    
+    search_col, risk_col, readiness_col, sort_col, order_col = st.columns([2, 2, 2, 2, 1])
+    search = search_col.text_input("Search city", key=f'{name}_search', placeholder="City name")
+    filters = {}
+    for column, container in (('Risk Category', risk_col), ('Readiness Category', readiness_col)):
+        if column in index.filter_columns:
+            filters[column] = container.multiselect(column, index.options(column), key=f'{name}_{column}')
+    
+    columns = list(index.df.columns)
+    sort_by = sort_col.selectbox("Sort by", columns, index=columns.index(sort_column), key=f'{name}_sort')
+    order = order_col.selectbox("Order", ["Desc", "Asc"], index=0 if not ascending else 1,
+                                key=f'{name}_order')
+    
+    # Matching row count decides how many pages the page picker offers
+    filters = {column: values for column, values in filters.items() if values}
+    rows = index.select(sort_by, order == "Asc", filters, search)
+    matching = len(rows)
+    pages = max(1, -(-matching // page_size))
+    page_key = f'{name}_page'
+    if st.session_state.get(page_key, 1) > pages:
+        st.session_state[page_key] = pages  # Filters shrank the result below the current page
+    page = st.number_input("Page", min_value=1, max_value=pages, value=1, step=1, key=page_key) \
+        if pages > 1 else 1
+    
+    page_df = index.page(rows, page, page_size).copy()
+    for column, formatter in (formatters or {}).items():
+        if column in page_df.columns:
+            page_df[column] = page_df[column].map(formatter)
+    
+    st.dataframe(page_df, use_container_width=True, hide_index=True)
+    
+    first = (min(page, pages) - 1) * page_size
+    st.caption(f"Rows {first + 1 if matching else 0}-{first + len(page_df)} of {matching:,} "
+               f"({len(index):,} total)")
+
+def cached_figure(name, build_figure, trace_updates, layout_updates=None, shape_updates=None,
+                  annotation_updates=None):
+    """
+    Return this session's figure for name with only its data swapped in
+    
+    The styled skeleton (traces, colors, hovertemplates, layout, shapes and
+    annotations) is built once per session; reruns replace trace data and
+    data-dependent layout in a single batch update instead of rebuilding the
+    Plotly figure. Trace updates may use dotted paths ('marker.size') so
+    styling set by the skeleton is kept. Shapes and annotations created by the
+    skeleton are updated in place, touching only the keys whose values
+    changed, because re-validating whole layout lists is the slowest part of
+    a Plotly update.
+    
+    Returns the typed-array copy for plot_figure (see figures.typed_figure).
+    It is kept with the skeleton and reused while the updates' fingerprint
+    (figures.update_fingerprint) is unchanged, so a rerun that changes
+    nothing this figure shows neither updates nor re-encodes it.
+    """
+    figure_cache = st.session_state.setdefault('figure_cache', {})
+    fingerprint = update_fingerprint((trace_updates, layout_updates, shape_updates, annotation_updates))
+    fig, cached_fingerprint, typed = figure_cache.get(name, (None, None, None))
+    if typed is not None and cached_fingerprint == fingerprint:
+        return typed
+    if fig is None:
+        fig = build_figure()
+    
+    with fig.batch_update():
+        for trace, update in zip(fig.data, trace_updates):
+            for key, value in update.items():
+                trace[key] = value
+        if layout_updates:
+            fig.update_layout(layout_updates)
+        for items, updates in ((fig.layout.shapes, shape_updates), (fig.layout.annotations, annotation_updates)):
+            for item, update in zip(items, updates or []):
+                for key, value in update.items():
+                    if item[key] != value:
+                        item[key] = value
+    
+    typed = typed_figure(fig)
+    figure_cache[name] = (fig, fingerprint, typed)
+    return typed
+
+def plot_figure(fig):
+    """
+    Render a figure with its numeric trace arrays sent as typed arrays
+    
+    NumPy data (x, y, z, customdata) reaches the browser as base64 typed-array
+    payloads instead of JSON number lists (see figures.py). Takes the typed
+    copy from cached_figure, or figures.typed_figure of a one-off figure.
+    """
+    st.plotly_chart(fig, use_container_width=True)
+
+def bubble_sizeref(sizes, size_max=20):
+    """Marker sizeref for area-scaled bubbles (same scaling as plotly express)"""
+    return 2.0 * max(float(np.max(sizes)), 1e-9) / (size_max ** 2)
+
+def category_bubble_data(df, category_column, categories, x, y, size):
+    """Per-category trace data for a bubble chart with one trace per category"""
+    sizeref = bubble_sizeref(df[size])
+    updates = []
+    for category in categories:
+        subset = df[df[category_column] == category]
+        updates.append({
+            'x': subset[x],
+            'y': subset[y],
+            'hovertext': subset['City'],
+            'marker.size': subset[size],
+            'marker.sizeref': sizeref,
+            'showlegend': len(subset) > 0
+        })
+    return updates
+
+def display_hourly_load(infra_df, params):
+    """
+    Hourly charging load against grid headroom for the scenario
+    
+    ON DEMAND:
+    - The simulation (see simulate_city_grid_load) is never run by a rerun or
+      by the background refresher; until its file exists for the scenario's
+      infrastructure stage, headroom and siting year, the view shows a
+      Simulate button instead
+    - Once written, every session on the scenario slices it from disk
+    """
+    version = stage_version(params, 'infrastructure')
+    if not os.path.exists(hourly_load_path(version, params['grid_kw_per_score'], params['siting_year'])):
+        st.caption("Simulates 8,760 hours per city and forecast year for this scenario; the result is kept for "
+                   "every session on it.")
+        if not st.button("Simulate Hourly Load", key='grid_load_simulate'):
+            return
+    
+    with st.spinner("Simulating hourly charging load..."):
+        load_df, load_path = hourly_grid_load(version, infra_df, params['grid_kw_per_score'], params['siting_year'])
+    hourly_load, load_years = open_hourly_load(load_path)
+    load_infra = load_view_cities(infra_df, params['siting_year'])
+    if len(load_infra) < len(infra_df):
+        st.caption(f"Simulated for the {len(load_infra):,} of {len(infra_df):,} cities with the highest "
+                   f"{params['siting_year']} forecast.")
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        load_year = st.selectbox("Load Year", load_years, index=len(load_years) - 1, key='grid_load_year')
+    with col2:
+        load_city = st.selectbox("City Profile", load_infra['City'].tolist(), key='grid_load_city')
+    
+    year_df = load_df[load_df['Year'] == load_year].sort_values('Peak_kW', ascending=False)
+    
+    def build_peak_figure():
+        fig = go.Figure()
+        fig.add_trace(go.Bar(
+            name='Simulated Peak Load',
+            marker_color='#ef4444',
+            hovertemplate='<b>%{x}</b><br>Peak Load: %{y:,.0f} kW<br>Peak Hour: %{customdata}<extra></extra>'
+        ))
+        fig.add_trace(go.Bar(
+            name='Grid Headroom',
+            marker_color='#10b981',
+            hovertemplate='<b>%{x}</b><br>Headroom: %{y:,.0f} kW<extra></extra>'
+        ))
+        fig.update_layout(
+            barmode='group',
+            xaxis_title='City',
+            yaxis_title='kW (log scale)',
+            yaxis_type='log',
+            height=500,
+            paper_bgcolor='#000000',
+            plot_bgcolor='#000000',
+            font=dict(color='#f1f5f9'),
+            title_font=dict(color='#06b6d4', size=16)
+        )
+        return fig
+    
+    peak_hours = pd.Timestamp(f'{load_year}-01-01') + pd.to_timedelta(year_df['Peak_Hour'], unit='h')
+    fig_peak = cached_figure('grid_peak', build_peak_figure, [
+        dict(x=year_df['City'], y=year_df['Peak_kW'], customdata=peak_hours.dt.strftime('%b %d %H:00')),
+        dict(x=year_df['City'], y=year_df['Capacity_kW'])
+    ], layout_updates=dict(
+        title=f'Simulated {load_year} Peak Charging Load vs Grid Headroom'
+    ))
+    plot_figure(fig_peak)
+    
+    # Peak week for the selected city, sliced straight from the memory-mapped array
+    city_index = load_infra['City'].tolist().index(load_city)
+    year_index = load_years.index(load_year)
+    city_peak_hour = int(load_df.loc[(load_df['Year'] == load_year) & (load_df['City'] == load_city), 'Peak_Hour'].iloc[0])
+    week_start = min(max(city_peak_hour - 84, 0), hourly_load.shape[2] - 168)
+    week_load = np.asarray(hourly_load[year_index, city_index, week_start:week_start + 168])
+    week_hours = pd.Timestamp(f'{load_year}-01-01') + pd.to_timedelta(np.arange(week_start, week_start + 168), unit='h')
+    city_capacity = float(load_infra['Grid_Capacity_Score'].iloc[city_index] * params['grid_kw_per_score'])
+    
+    def build_week_figure():
+        fig = go.Figure(go.Scatter(
+            name='Charging Load',
+            mode='lines',
+            line=dict(color='#06b6d4', width=2),
+            hovertemplate='%{x|%a %b %d %H:00}<br>Load: %{y:,.0f} kW<extra></extra>'
+        ))
+        fig.add_hline(y=0, line_dash="dash", line_color="#10b981", annotation_text="Grid Headroom")
+        fig.update_layout(
+            xaxis_title='Hour',
+            yaxis_title='Charging Load (kW)',
+            height=400,
+            paper_bgcolor='#000000',
+            plot_bgcolor='#000000',
+            font=dict(color='#f1f5f9'),
+            title_font=dict(color='#06b6d4', size=16)
+        )
+        return fig
+    
+    fig_week = cached_figure('grid_week', build_week_figure, [
+        dict(x=week_hours, y=week_load)
+    ], layout_updates=dict(
+        title=f'{load_city} - Peak Week Hourly Charging Load ({load_year})'
+    ), shape_updates=[
+        dict(y0=city_capacity, y1=city_capacity)
+    ], annotation_updates=[
+        dict(y=city_capacity)
+    ])
+    plot_figure(fig_week)
 
-def display_infrastructure_analysis():
+def display_infrastructure_analysis(infra_df, params, categories_df):
     """
     Display infrastructure feasibility and grid readiness analysis
     
@@ -929,11 +1747,6 @@ def display_infrastructure_analysis():
     </div>
     """, unsafe_allow_html=True)
     
-    # Load data
-    cities_df = load_authentic_massachusetts_cities_complete()
-    forecast_df, state_data = calculate_authentic_linear_regression_forecasts(cities_df)
-    infra_df = create_infrastructure_data(forecast_df)
-    
     # Infrastructure Readiness Overview
     col1, col2, col3 = st.columns(3)
     
@@ -968,154 +1781,161 @@ def display_infrastructure_analysis():
         """, unsafe_allow_html=True)
     
     # Infrastructure Readiness vs EV Forecast Scatter Plot
-    fig_infra_scatter = px.scatter(
-        infra_df,
-        x='Infrastructure_Readiness',
-        y='EV_Forecast_2029',
-        size='Population_2024',
-        color='Infrastructure_Category',
-        hover_name='City',
-        color_discrete_map={
-            'High Readiness': '#10b981', 
-            'Medium Readiness': '#f59e0b', 
-            'Low Readiness': '#ef4444'
-        },
-        title='Infrastructure Readiness vs 2029 EV Forecast (Bubble Size = Population)',
-        labels={
-            'Infrastructure_Readiness': 'Infrastructure Readiness Score (0-1, higher is better)',
-            'EV_Forecast_2029': '2029 EV Forecast'
-        }
-    )
+    readiness_colors = {
+        'High Readiness': '#10b981', 
+        'Medium Readiness': '#f59e0b', 
+        'Low Readiness': '#ef4444'
+    }
     
-    fig_infra_scatter.update_layout(
-        height=600,
-        paper_bgcolor='#000000',
-        plot_bgcolor='#000000',
-        font=dict(color='#f1f5f9'),
-        title_font=dict(color='#06b6d4', size=16)
-    )
-    st.plotly_chart(fig_infra_scatter, use_container_width=True)
+    def build_infra_scatter():
+        fig = go.Figure()
+        for category, color in readiness_colors.items():
+            fig.add_trace(go.Scatter(
+                name=category,
+                mode='markers',
+                marker=dict(color=color, sizemode='area'),
+                hovertemplate='<b>%{hovertext}</b><br>Readiness: %{x:.3f}<br>2029 EV Forecast: %{y:,}<extra></extra>'
+            ))
+        fig.update_layout(
+            title='Infrastructure Readiness vs 2029 EV Forecast (Bubble Size = Population)',
+            xaxis_title='Infrastructure Readiness Score (0-1, higher is better)',
+            yaxis_title='2029 EV Forecast',
+            legend_title_text='Infrastructure Category',
+            height=600,
+            paper_bgcolor='#000000',
+            plot_bgcolor='#000000',
+            font=dict(color='#f1f5f9'),
+            title_font=dict(color='#06b6d4', size=16)
+        )
+        return fig
+    
+    fig_infra_scatter = cached_figure('infra_scatter', build_infra_scatter, category_bubble_data(
+        infra_df, 'Infrastructure_Category', readiness_colors,
+        x='Infrastructure_Readiness', y='EV_Forecast_2029', size='Population_2024'
+    ))
+    plot_figure(fig_infra_scatter)
     
     # Charging Infrastructure Analysis
     st.subheader("Charging Infrastructure Capacity Assessment")
     
     # Sort by charging infrastructure score - lowest to highest for visual clarity
-    infra_sorted = infra_df.sort_values('Charging_Infrastructure_Score', ascending=True)
+    infra_sorted = SortedColumns(infra_df, 'Charging_Infrastructure_Score')
     
-    fig_charging = go.Figure()
-    
-    # Create horizontal bar chart showing AUTHENTIC infrastructure components
+    # AUTHENTIC infrastructure components (actual data * scenario weight)
     # Component 1: Home Charging Potential (based on actual single-family housing %)
-    fig_charging.add_trace(go.Bar(
-        name='Home Charging Potential',
-        y=infra_sorted['City'],
-        x=infra_sorted['Single_Family_Pct'] / 100 * 0.4,  # Actual data * weight
-        orientation='h',
-        marker_color='#06b6d4',  # Modern cyan
-        text=[f"{pct:.1f}%" for pct in infra_sorted['Single_Family_Pct']],
-        textposition='inside',
-        textfont=dict(color='white', size=10, family="Arial Black"),
-        hovertemplate='<b>%{y}</b><br>Actual Single Family Homes: %{customdata:.1f}%<extra></extra>',
-        customdata=infra_sorted['Single_Family_Pct']
-    ))
-    
-    # Component 2: Public Charging Potential (based on authentic urban classification)
-    # Using actual Census urban classifications, not synthetic scores
-    urban_charging_actual = []
-    urban_labels = []
-    for urban_class in infra_sorted['Urban_Classification']:
-        if urban_class == 'Urban Core':
-            urban_charging_actual.append(0.36)  # 90% potential * 40% weight
-            urban_labels.append('Core')
-        elif urban_class == 'Urban':
-            urban_charging_actual.append(0.28)  # 70% potential * 40% weight
-            urban_labels.append('Urban')
-        else:  # Suburban
-            urban_charging_actual.append(0.20)  # 50% potential * 40% weight
-            urban_labels.append('Sub')
-    
-    fig_charging.add_trace(go.Bar(
-        name='Public Charging Potential',
-        y=infra_sorted['City'],
-        x=urban_charging_actual,
-        orientation='h',
-        marker_color='#10b981',  # Modern emerald
-        text=urban_labels,
-        textposition='inside',
-        textfont=dict(color='white', size=10, family="Arial Black"),
-        hovertemplate='<b>%{y}</b><br>Urban Classification: %{customdata}<extra></extra>',
-        customdata=infra_sorted['Urban_Classification']
-    ))
-    
+    # Component 2: Public Charging Potential (based on authentic Census urban classification)
     # Component 3: Infrastructure Access (based on actual distance from Boston)
-    distance_access_actual = []
-    distance_labels = []
-    for distance in infra_sorted['Distance_from_Boston']:
-        # Actual distance-based scoring, not synthetic
-        access_score = max(0.06, (1.0 - distance/100) * 0.2)  # 20% weight, min 0.06
-        distance_access_actual.append(access_score)
-        distance_labels.append(f"{distance}mi")
-    
-    fig_charging.add_trace(go.Bar(
-        name='Infrastructure Access',
-        y=infra_sorted['City'],
-        x=distance_access_actual,
-        orientation='h',
-        marker_color='#8b5cf6',  # Modern purple
-        text=distance_labels,
-        textposition='inside',
-        textfont=dict(color='white', size=10, family="Arial Black"),
-        hovertemplate='<b>%{y}</b><br>Actual Distance from Boston: %{customdata} miles<extra></extra>',
-        customdata=infra_sorted['Distance_from_Boston']
-    ))
+    home_weight, public_weight, access_weight = weight_vector(params['charging_weights'], CHARGING_WEIGHTS)
+    urban_labels = {'Urban Core': 'Core', 'Urban': 'Urban', 'Suburban': 'Sub'}
     
-    fig_charging.update_layout(
-        title='Charging Infrastructure Capacity - Components by City',
-        xaxis_title='Infrastructure Score Components',
-        yaxis_title='Cities (Sorted by Total Charging Score - Lowest to Highest)',
-        barmode='stack',
-        height=800,
-        paper_bgcolor='#000000',
-        plot_bgcolor='#000000',
-        font=dict(color='#f1f5f9', family="Arial"),
-        title_font=dict(size=16, color='#06b6d4'),
-        legend=dict(
-            orientation="h", 
-            yanchor="bottom", 
-            y=1.02, 
-            xanchor="right", 
-            x=1,
-            bgcolor='#000000',
-            bordercolor='#06b6d4',
-            borderwidth=1
-        ),
-        yaxis=dict(
-            categoryorder='array', 
-            categoryarray=infra_sorted['City'].tolist(),
-            gridcolor='rgba(6, 182, 212, 0.3)',
-            color='#f1f5f9'
-        ),
-        xaxis=dict(
-            gridcolor='rgba(6, 182, 212, 0.3)',
-            color='#f1f5f9'
-        ),
-        # Add value annotations on bars with enhanced neon glow effect
-        annotations=[
-            dict(
-                x=infra_sorted.iloc[i]['Charging_Infrastructure_Score'] + 0.02,
-                y=i,
-                text=f"<b>{infra_sorted.iloc[i]['Charging_Infrastructure_Score']:.2f}</b>",
-                showarrow=False,
-                font=dict(color="#06b6d4", size=12, family="Arial Black"),
-                xanchor="left",
+    def build_charging_figure():
+        fig = go.Figure()
+        
+        # Create horizontal bar chart showing AUTHENTIC infrastructure components
+        fig.add_trace(go.Bar(
+            name='Home Charging Potential',
+            orientation='h',
+            marker_color='#06b6d4',  # Modern cyan
+            textposition='inside',
+            textfont=dict(color='white', size=10, family="Arial Black"),
+            texttemplate='%{customdata:.1f}%',
+            hovertemplate='<b>%{y}</b><br>Actual Single Family Homes: %{customdata:.1f}%<extra></extra>'
+        ))
+        fig.add_trace(go.Bar(
+            name='Public Charging Potential',
+            orientation='h',
+            marker_color='#10b981',  # Modern emerald
+            textposition='inside',
+            textfont=dict(color='white', size=10, family="Arial Black"),
+            hovertemplate='<b>%{y}</b><br>Urban Classification: %{customdata}<extra></extra>'
+        ))
+        fig.add_trace(go.Bar(
+            name='Infrastructure Access',
+            orientation='h',
+            marker_color='#8b5cf6',  # Modern purple
+            textposition='inside',
+            textfont=dict(color='white', size=10, family="Arial Black"),
+            texttemplate='%{customdata:.0f}mi',
+            hovertemplate='<b>%{y}</b><br>Access Distance: %{customdata:.0f} miles<extra></extra>'
+        ))
+        
+        # Total score labels at the end of each bar with neon glow color
+        fig.add_trace(go.Scatter(
+            name='Total Score',
+            mode='text',
+            textposition='middle right',
+            textfont=dict(color="#06b6d4", size=12, family="Arial Black"),
+            texttemplate='<b>%{customdata:.2f}</b>',
+            hoverinfo='skip',
+            showlegend=False
+        ))
+        
+        fig.update_layout(
+            title='Charging Infrastructure Capacity - Components by City',
+            xaxis_title='Infrastructure Score Components',
+            yaxis_title='Cities (Sorted by Total Charging Score - Lowest to Highest)',
+            barmode='stack',
+            height=800,
+            paper_bgcolor='#000000',
+            plot_bgcolor='#000000',
+            font=dict(color='#f1f5f9', family="Arial"),
+            title_font=dict(size=16, color='#06b6d4'),
+            legend=dict(
+                orientation="h", 
+                yanchor="bottom", 
+                y=1.02, 
+                xanchor="right", 
+                x=1,
                 bgcolor='#000000',
                 bordercolor='#06b6d4',
                 borderwidth=1
-            ) for i in range(len(infra_sorted))
-        ]
-    )
+            ),
+            yaxis=dict(
+                type='category',
+                categoryorder='array', 
+                gridcolor='rgba(6, 182, 212, 0.3)',
+                color='#f1f5f9'
+            ),
+            xaxis=dict(
+                gridcolor='rgba(6, 182, 212, 0.3)',
+                color='#f1f5f9'
+            )
+        )
+        return fig
+    
+    # City names go once, as the axis categories; every trace sits on positions 0..n-1
+    positions = category_positions(infra_sorted['City'])
+    charging_scores = infra_sorted['Charging_Infrastructure_Score']
+    # Nearest charger when facility locations are loaded, otherwise distance from Boston
+    access_distance = infra_sorted.take(distance_column(infra_df, 'Access_Distance_Miles'))
+    urban_classes = pd.Series(infra_sorted['Urban_Classification'])
+    fig_charging = cached_figure('charging', build_charging_figure, [
+        dict(
+            x=infra_sorted['Single_Family_Pct'] / 100 * home_weight,  # Actual data * weight
+            customdata=infra_sorted['Single_Family_Pct'],
+            **positions
+        ),
+        dict(
+            x=urban_classes.map(URBAN_CHARGING_SCORES).to_numpy() * public_weight,
+            text=urban_classes.map(urban_labels).tolist(),
+            customdata=urban_classes.tolist(),
+            **positions
+        ),
+        dict(
+            x=np.maximum(0.3, 1.0 - access_distance / 100) * access_weight,
+            customdata=access_distance,
+            **positions
+        ),
+        dict(
+            x=charging_scores + 0.01,
+            customdata=charging_scores,
+            **positions
+        )
+    ], layout_updates=dict(
+        yaxis_categoryarray=infra_sorted['City'].tolist()
+    ))
     
-    st.plotly_chart(fig_charging, use_container_width=True)
+    plot_figure(fig_charging)
     
     # Grid Capacity Analysis
     st.subheader("Grid Capacity & Upgrade Requirements")
@@ -1124,66 +1944,66 @@ def display_infrastructure_analysis():
     grid_data = infra_df[['City', 'Grid_Capacity_Score', 'EV_Forecast_2029', 'Population_2024']].copy()
     grid_data['Grid_Load_2029'] = grid_data['EV_Forecast_2029'] / grid_data['Population_2024'] * 1000  # EVs per 1000 residents
     
-    fig_grid = px.scatter(
-        grid_data,
-        x='Grid_Capacity_Score',
-        y='Grid_Load_2029',
-        size='Population_2024',
-        color='Grid_Capacity_Score',
-        hover_name='City',
-        color_continuous_scale='RdYlGn',
-        title='Grid Capacity vs Expected Load (2029 EVs per 1000 Residents)',
-        labels={
-            'Grid_Capacity_Score': 'Grid Capacity Score (0-1, higher is better)',
-            'Grid_Load_2029': 'Expected Grid Load (EVs per 1000 residents in 2029)'
-        }
-    )
-    
-    # Add quadrant lines
-    fig_grid.add_hline(y=grid_data['Grid_Load_2029'].median(), line_dash="dash", line_color="gray", 
-                      annotation_text="Median Load")
-    fig_grid.add_vline(x=grid_data['Grid_Capacity_Score'].median(), line_dash="dash", line_color="gray",
-                      annotation_text="Median Capacity")
-    
-    fig_grid.update_layout(
-        height=600,
-        paper_bgcolor='#000000',
-        plot_bgcolor='#000000',
-        font=dict(color='#f1f5f9'),
-        title_font=dict(color='#06b6d4', size=16)
-    )
-    st.plotly_chart(fig_grid, use_container_width=True)
+    def build_grid_figure():
+        fig = go.Figure(go.Scatter(
+            mode='markers',
+            marker=dict(colorscale='RdYlGn', sizemode='area', showscale=True,
+                        colorbar=dict(title='Grid Capacity')),
+            hovertemplate='<b>%{hovertext}</b><br>Grid Capacity: %{x:.3f}<br>EVs per 1000 residents: %{y:.1f}<extra></extra>'
+        ))
+        
+        # Add quadrant lines (moved to the medians on every update)
+        fig.add_hline(y=0, line_dash="dash", line_color="gray", annotation_text="Median Load")
+        fig.add_vline(x=0, line_dash="dash", line_color="gray", annotation_text="Median Capacity")
+        
+        fig.update_layout(
+            title='Grid Capacity vs Expected Load (2029 EVs per 1000 Residents)',
+            xaxis_title='Grid Capacity Score (0-1, higher is better)',
+            yaxis_title='Expected Grid Load (EVs per 1000 residents in 2029)',
+            height=600,
+            paper_bgcolor='#000000',
+            plot_bgcolor='#000000',
+            font=dict(color='#f1f5f9'),
+            title_font=dict(color='#06b6d4', size=16)
+        )
+        return fig
+    
+    # Quadrant lines at the median load and capacity
+    median_load = grid_data['Grid_Load_2029'].median()
+    median_capacity = grid_data['Grid_Capacity_Score'].median()
+    fig_grid = cached_figure('grid', build_grid_figure, [{
+        'x': grid_data['Grid_Capacity_Score'],
+        'y': grid_data['Grid_Load_2029'],
+        'hovertext': grid_data['City'],
+        'marker.color': grid_data['Grid_Capacity_Score'],
+        'marker.size': grid_data['Population_2024'],
+        'marker.sizeref': bubble_sizeref(grid_data['Population_2024'])
+    }], shape_updates=[
+        dict(y0=median_load, y1=median_load),
+        dict(x0=median_capacity, x1=median_capacity)
+    ], annotation_updates=[
+        dict(y=median_load),
+        dict(x=median_capacity)
+    ])
+    plot_figure(fig_grid)
+    
+    # Hourly Load Simulation
+    st.subheader("Hourly Charging Load vs Grid Capacity")
+    display_hourly_load(infra_df, params)
     
     # Investment Priority Matrix
     st.subheader("Infrastructure Investment Priority Matrix")
     
     # Create investment priority data
-    investment_df = infra_df.copy()
-    investment_df['Investment_Priority'] = (
-        (1 - investment_df['Infrastructure_Readiness']) * 0.6 +  # Higher need = higher priority
-        (investment_df['EV_Forecast_2029'] / investment_df['EV_Forecast_2029'].max()) * 0.4  # Higher demand = higher priority
-    )
-    
-    # Categorize investment needs
-    def categorize_investment(readiness_score, forecast):
-        if readiness_score < 0.5 and forecast > 2000:
-            return "Critical - High Demand, Low Readiness"
-        elif readiness_score < 0.5:
-            return "High Priority - Low Readiness"
-        elif forecast > 2000:
-            return "Medium Priority - High Demand"
-        else:
-            return "Low Priority - Adequate Readiness"
-    
-    investment_df['Investment_Category'] = investment_df.apply(
-        lambda x: categorize_investment(x['Infrastructure_Readiness'], x['EV_Forecast_2029']), axis=1
-    )
+    investment_df = create_investment_data(stage_version(params, 'infrastructure'), infra_df)
     
     # Investment priority table
     investment_summary = investment_df[[
         'City', 'Infrastructure_Readiness', 'EV_Forecast_2029', 'Investment_Category',
         'Single_Family_Pct', 'Distance_from_Boston', 'Population_2024', 'Investment_Priority'
-    ]].sort_values('Investment_Priority', ascending=False)
+    ] + [
+        column for column in ['Access_Distance_Miles', 'Substation_Distance_Miles'] if column in investment_df.columns
+    ]].merge(categories_df, on='City', how='left')
     
     investment_summary = investment_summary.rename(columns={
         'Infrastructure_Readiness': 'Readiness Score',
@@ -1191,10 +2011,83 @@ def display_infrastructure_analysis():
         'Investment_Category': 'Investment Priority',
         'Single_Family_Pct': 'Single Family %',
         'Distance_from_Boston': 'Distance from Boston',
-        'Population_2024': 'Population'
+        'Population_2024': 'Population',
+        'Access_Distance_Miles': 'Nearest Charger (mi)',
+        'Substation_Distance_Miles': 'Nearest Substation (mi)'
     })
     
-    st.dataframe(investment_summary, use_container_width=True, height=500)
+    render_paginated_table('investment_table', investment_summary, scenario_key(params), 'Investment_Priority')
+    
+    # Charger Siting Allocation
+    st.subheader("Charger Siting Allocation")
+    
+    siting_df = create_charger_siting_plan(
+        stage_version(params, 'infrastructure'), infra_df, params['level2_budget'], params['dc_fast_budget'], params['grid_kw_per_score'],
+        params['siting_year']
+    )
+    
+    def build_siting_figure():
+        fig = make_subplots(specs=[[{"secondary_y": True}]])
+        fig.add_trace(go.Bar(
+            name='Level 2 Ports',
+            marker_color='#06b6d4',
+            hovertemplate='<b>%{x}</b><br>Level 2 Ports: %{y:,}<extra></extra>'
+        ))
+        fig.add_trace(go.Bar(
+            name='DC Fast Ports',
+            marker_color='#8b5cf6',
+            hovertemplate='<b>%{x}</b><br>DC Fast Ports: %{y:,}<extra></extra>'
+        ))
+        fig.add_trace(go.Scatter(
+            name='Forecast EVs Covered (%)',
+            mode='lines+markers',
+            line=dict(color='#f59e0b', width=2),
+            hovertemplate='<b>%{x}</b><br>EVs Covered: %{y:.1f}%<extra></extra>'
+        ), secondary_y=True)
+        
+        fig.update_layout(
+            title='Charger Budget Allocation by City (Grid-Constrained)',
+            barmode='group',
+            height=550,
+            paper_bgcolor='#000000',
+            plot_bgcolor='#000000',
+            font=dict(color='#f1f5f9'),
+            title_font=dict(color='#06b6d4', size=16),
+            legend=dict(orientation='h', yanchor='bottom', y=1.02, xanchor='right', x=1)
+        )
+        fig.update_xaxes(gridcolor='rgba(6, 182, 212, 0.3)', color='#f1f5f9')
+        fig.update_yaxes(title_text='Ports Allocated', gridcolor='rgba(6, 182, 212, 0.3)', color='#f1f5f9',
+                         secondary_y=False)
+        fig.update_yaxes(title_text='Forecast EVs Covered (%)', range=[0, 105], showgrid=False, color='#f59e0b',
+                         secondary_y=True)
+        return fig
+    
+    fig_siting = cached_figure('siting', build_siting_figure, [
+        dict(x=siting_df['City'], y=siting_df['Level_2_Chargers']),
+        dict(x=siting_df['City'], y=siting_df['DC_Fast_Chargers']),
+        dict(x=siting_df['City'], y=siting_df['Coverage_Pct'])
+    ])
+    plot_figure(fig_siting)
+    
+    total_covered = siting_df['EVs_Covered'].sum()
+    total_demand = siting_df['EV_Demand'].sum()
+    st.caption(
+        f"{siting_df['Level_2_Chargers'].sum():,} Level 2 and {siting_df['DC_Fast_Chargers'].sum():,} DC fast ports "
+        f"cover {total_covered:,.0f} of {total_demand:,.0f} forecast {params['siting_year']} EVs "
+        f"({total_covered / max(total_demand, 1):.1%}). Unplaced ports were blocked by grid headroom or demand."
+    )
+    
+    siting_summary = siting_df.rename(columns={
+        'Level_2_Chargers': 'Level 2 Ports',
+        'DC_Fast_Chargers': 'DC Fast Ports',
+        'Charger_kW': 'Charger Load (kW)',
+        'Grid_Capacity_kW': 'Grid Headroom (kW)',
+        'Grid_Utilization': 'Headroom Used',
+        'EV_Demand': f"{params['siting_year']} EV Forecast",
+        'EVs_Covered': 'EVs Covered',
+        'Coverage_Pct': 'Coverage %'
+    })
+    st.dataframe(siting_summary, use_container_width=True, height=500)
 
 
  # Infrastructure Feasibility Summary & Key Highlights
@@ -1273,16 +2166,19 @@ def display_infrastructure_analysis():
     """)
 
 
-def display_bev_analysis(cities_df, forecast_df, priority_df, risk_df, state_data):
-    """Display BEV market analysis"""
+def display_bev_analysis(forecast_df, state_data, params, horizon_df, categories_df):
+    """Display BEV market analysis: regression forecasts, horizon and forecast race"""
+    
+    # Forecast years shown in the chart and table, selected from the horizon table
+    chart_years = params['chart_years']
     
     # Linear Regression Forecasts
-    st.markdown("""
+    st.markdown(f"""
     <div class="deliverable-section">
     <h2>Linear Regression EV Forecasts (All 20 Cities)</h2>
-    <p><strong>Methodology:</strong> Linear allocation of authentic state target (200,000 EVs by 2025) based on demographic factors</p>
-    <p><strong>Base Data:</strong> Current ~77,000 EVs statewide, targeting official 200,000 by 2025</p>
-    <p><strong>Forecast Years:</strong> 2025 (1-year), 2027 (3-year), 2029 (5-year)</p>
+    <p><strong>Methodology:</strong> Linear allocation of authentic state target ({state_data['State_Target_2025']:,} EVs by 2025) based on demographic factors</p>
+    <p><strong>Base Data:</strong> Current ~77,000 EVs statewide, targeting {state_data['State_Target_2025']:,} by 2025</p>
+    <p><strong>Forecast Years:</strong> {', '.join(f"{year} ({year - FORECAST_BASE_YEAR}-year)" for year in chart_years)}; horizon to {params['horizon_end']}</p>
     </div>
     """, unsafe_allow_html=True)
     
@@ -1327,91 +2223,114 @@ def display_bev_analysis(cities_df, forecast_df, priority_df, risk_df, state_dat
         </div>
         """, unsafe_allow_html=True)
     
-    # Linear regression forecast chart - Cities on X-axis with 3 forecast lines - DESCENDING ORDER
-    fig_regression = go.Figure()
-    
-    # Sort cities by 2029 forecast in descending order (highest to lowest)
-    forecast_sorted = forecast_df.sort_values('EV_Forecast_2029', ascending=False)
-    
-    # Create three lines for the forecast years
-    fig_regression.add_trace(go.Scatter(
-        x=forecast_sorted['City'],
-        y=forecast_sorted['EV_Forecast_2025'],
-        mode='lines+markers',
-        name='2025 Forecast (1-Year)',
-        line=dict(color='#06b6d4', width=4),
-        marker=dict(size=8, symbol='circle'),
-        hovertemplate='<b>%{x}</b><br>2025 EV Forecast: %{y:,}<br>Population: %{customdata:,}<extra></extra>',
-        customdata=forecast_sorted['Population_2024']
-    ))
+    if state_data['Allocated_Target_2025'] < state_data['State_Target_2025']:
+        st.warning(
+            f"The {state_data['State_Target_2025']:,} EV target exceeds what the 200% annual growth cap allows; "
+            f"city allocations reach {state_data['Allocated_Target_2025']:,}."
+        )
     
-    fig_regression.add_trace(go.Scatter(
-        x=forecast_sorted['City'],
-        y=forecast_sorted['EV_Forecast_2027'],
-        mode='lines+markers',
-        name='2027 Forecast (3-Year)',
-        line=dict(color='#f59e0b', width=4),
-        marker=dict(size=8, symbol='diamond'),
-        hovertemplate='<b>%{x}</b><br>2027 EV Forecast: %{y:,}<br>Growth Rate: %{customdata:.1%}<extra></extra>',
-        customdata=forecast_sorted['Growth_Rate']
-    ))
+    # Linear regression forecast chart - Cities on X-axis with 3 forecast lines - DESCENDING ORDER
+    def build_regression_figure():
+        fig = go.Figure()
+        
+        # Create three lines for the forecast years (names and data set per chart year)
+        fig.add_trace(go.Scatter(
+            mode='lines+markers',
+            line=dict(color='#06b6d4', width=4),
+            marker=dict(size=8, symbol='circle')
+        ))
+        fig.add_trace(go.Scatter(
+            mode='lines+markers',
+            line=dict(color='#f59e0b', width=4),
+            marker=dict(size=8, symbol='diamond')
+        ))
+        fig.add_trace(go.Scatter(
+            mode='lines+markers',
+            line=dict(color='#10b981', width=4),
+            marker=dict(size=8, symbol='square')
+        ))
+        
+        fig.update_layout(
+            yaxis_title='Number of Electric Vehicles',
+            height=700,
+            hovermode='x unified',
+            paper_bgcolor='#000000',
+            plot_bgcolor='#000000',
+            font=dict(color='#f1f5f9'),
+            title_font=dict(color='#06b6d4', size=16),
+            legend=dict(
+                orientation="h",
+                yanchor="bottom",
+                y=1.02,
+                xanchor="center",
+                x=0.5,
+                bgcolor='#000000',
+                bordercolor='#06b6d4',
+                borderwidth=1
+            ),
+            xaxis=dict(
+                type='category',
+                tickangle=45,
+                tickmode='linear',
+                dtick=1,
+                gridcolor='rgba(6, 182, 212, 0.3)',
+                color='#f1f5f9'
+            ),
+            yaxis=dict(
+                gridcolor='rgba(6, 182, 212, 0.3)',
+                color='#f1f5f9'
+            )
+        )
+        return fig
+    
+    # Sort cities by the last chart year's forecast in descending order (highest to lowest)
+    last_year = chart_years[-1]
+    year_forecasts = forecast_by_year(horizon_df, chart_years, forecast_df['City'])
+    forecast_sorted = SortedColumns(forecast_df.assign(Sort_Forecast=year_forecasts[last_year]), 'Sort_Forecast',
+                                    ascending=False)
+    positions = category_positions(forecast_sorted['City'], 'x')
+    
+    # Hover context per line: population, growth rate, readiness
+    hover_context = [
+        ('Population_2024', 'Population: %{customdata:,}'),
+        ('Growth_Rate', 'Growth Rate: %{customdata:.1%}'),
+        ('Adoption_Readiness', 'Readiness Score: %{customdata:.3f}')
+    ]
+    regression_updates = []
+    for i, (column, hover) in enumerate(hover_context):
+        if i < len(chart_years):
+            year = chart_years[i]
+            regression_updates.append(dict(
+                visible=True,
+                name=f'{year} Forecast ({year - FORECAST_BASE_YEAR}-Year)',
+                y=forecast_sorted.take(year_forecasts[year]),
+                customdata=forecast_sorted[column],
+                **positions,
+                hovertemplate=f'<b>%{{x}}</b><br>{year} EV Forecast: %{{y:,}}<br>{hover}<extra></extra>'
+            ))
+        else:
+            regression_updates.append(dict(visible=False))
     
-    fig_regression.add_trace(go.Scatter(
-        x=forecast_sorted['City'],
-        y=forecast_sorted['EV_Forecast_2029'],
-        mode='lines+markers',
-        name='2029 Forecast (5-Year)',
-        line=dict(color='#10b981', width=4),
-        marker=dict(size=8, symbol='square'),
-        hovertemplate='<b>%{x}</b><br>2029 EV Forecast: %{y:,}<br>Readiness Score: %{customdata:.3f}<extra></extra>',
-        customdata=forecast_sorted['Adoption_Readiness']
+    fig_regression = cached_figure('regression', build_regression_figure, regression_updates, layout_updates=dict(
+        title=f'Linear Regression EV Forecasts - Cities Ranked by Highest to Lowest {last_year} Forecast',
+        xaxis=dict(title=f'Cities (Sorted by {last_year} EV Forecast - Highest to Lowest)',
+                   **category_axis(forecast_sorted['City']))
     ))
     
-    fig_regression.update_layout(
-        title='Linear Regression EV Forecasts - Cities Ranked by Highest to Lowest 2029 Forecast',
-        xaxis_title='Cities (Sorted by 2029 EV Forecast - Highest to Lowest)',
-        yaxis_title='Number of Electric Vehicles',
-        height=700,
-        hovermode='x unified',
-        paper_bgcolor='#000000',
-        plot_bgcolor='#000000',
-        font=dict(color='#f1f5f9'),
-        title_font=dict(color='#06b6d4', size=16),
-        legend=dict(
-            orientation="h",
-            yanchor="bottom",
-            y=1.02,
-            xanchor="center",
-            x=0.5,
-            bgcolor='#000000',
-            bordercolor='#06b6d4',
-            borderwidth=1
-        ),
-        xaxis=dict(
-            tickangle=45,
-            tickmode='array',
-            tickvals=list(range(len(forecast_sorted))),
-            ticktext=forecast_sorted['City'].tolist(),
-            gridcolor='rgba(6, 182, 212, 0.3)',
-            color='#f1f5f9'
-        ),
-        yaxis=dict(
-            gridcolor='rgba(6, 182, 212, 0.3)',
-            color='#f1f5f9'
-        )
-    )
-    
-    st.plotly_chart(fig_regression, use_container_width=True)
+    plot_figure(fig_regression)
     
     # Summary statistics table
     st.subheader("Linear Regression Forecast Summary")
     
-    summary_cols = ['City', 'Current_EVs_Estimate', 'Target_Share_2025', 'EV_Forecast_2025', 
-                   'EV_Forecast_2027', 'EV_Forecast_2029', 'Growth_Rate', 'Adoption_Readiness']
+    summary_cols = ['City', 'Current_EVs_Estimate', 'Target_Share_2025', 'Growth_Rate', 'Adoption_Readiness']
     
+    # Chart years plus the 2030 / 2035 planning milestones inside the horizon
+    summary_years = sorted(set(chart_years) | {year for year in PLANNING_YEARS if year <= params['horizon_end']})
     summary_df = forecast_df[summary_cols].copy()
-    summary_df['Growth_Rate'] = summary_df['Growth_Rate'].apply(lambda x: f"{x:.1%}")
-    summary_df = summary_df.round(3)
+    summary_forecasts = forecast_by_year(horizon_df, summary_years, summary_df['City'])
+    for position, year in enumerate(summary_years, start=3):
+        summary_df.insert(position, f'{year} Forecast', summary_forecasts[year])
+    summary_df = summary_df.round(3).merge(categories_df, on='City', how='left')
     
     summary_df = summary_df.rename(columns={
         'Current_EVs_Estimate': 'Current EVs (Est.)',
@@ -1419,119 +2338,166 @@ def display_bev_analysis(cities_df, forecast_df, priority_df, risk_df, state_dat
         'Adoption_Readiness': 'Readiness Score'
     })
     
-    st.dataframe(summary_df, use_container_width=True, height=500)
+    render_paginated_table('forecast_summary_table', summary_df, scenario_key(params), 'Current EVs (Est.)',
+                           formatters={'Growth_Rate': lambda x: f"{x:.1%}"})
+    
+    # Statewide trajectory over the full horizon
+    st.subheader("Forecast Horizon Trajectory")
+    
+    statewide = horizon_df.groupby('Year', sort=True)['EV_Forecast'].sum()
+    
+    def build_horizon_figure():
+        fig = go.Figure(go.Scatter(
+            name='20-City Total',
+            mode='lines',
+            line=dict(color='#06b6d4', width=3),
+            hovertemplate='%{x:.4~f}<br>20-City EV Forecast: %{y:,.0f}<extra></extra>'
+        ))
+        fig.update_layout(
+            xaxis_title='Year',
+            yaxis_title='Number of Electric Vehicles (log scale)',
+            yaxis_type='log',
+            height=450,
+            paper_bgcolor='#000000',
+            plot_bgcolor='#000000',
+            font=dict(color='#f1f5f9'),
+            title_font=dict(color='#06b6d4', size=16),
+            xaxis=dict(gridcolor='rgba(6, 182, 212, 0.3)', color='#f1f5f9'),
+            yaxis=dict(gridcolor='rgba(6, 182, 212, 0.3)', color='#f1f5f9')
+        )
+        return fig
+    
+    fig_horizon = cached_figure('horizon', build_horizon_figure, [
+        dict(x=statewide.index, y=statewide.to_numpy())
+    ], layout_updates=dict(
+        title=f'20-City EV Forecast Trajectory {FORECAST_BASE_YEAR}-{params["horizon_end"]} '
+              f'({"Monthly" if params["periods_per_year"] == 12 else "Annual"})'
+    ))
+    plot_figure(fig_horizon)
+    
+    # Animated race of the leading cities over the same horizon
+    st.subheader("Forecast Race by Year")
+    fig_race = forecast_race(stage_version(params, 'horizon'), horizon_df, params['periods_per_year'])
+    # Prebuilt and shared; its frames are plain JSON, so it goes to Streamlit as is
+    st.plotly_chart(fig_race, use_container_width=True)
+    st.caption("Press Play or drag the slider: each frame ranks the leading cities at one forecast time point.")
+
+def display_priority_analysis(priority_df, params, categories_df):
+    """Display the priority ranking, its stability and its uncertainty"""
     
     # Priority City Deployment Strategy
-    st.markdown("""
+    economic_w, education_w, infrastructure_w, market_w, transport_w = weight_vector(
+        params['priority_weights'], PRIORITY_WEIGHTS
+    )
+    st.markdown(f"""
     <div class="deliverable-section">
     <h2>DELIVERABLE 2: Priority City Deployment Strategy</h2>
-    <p><strong>Ranking Factors:</strong> Economic Capacity (25%) + Education (20%) + Infrastructure (20%) + Market Size (20%) + Transportation Patterns (15%)</p>
+    <p><strong>Ranking Factors:</strong> Economic Capacity ({economic_w:.0%}) + Education ({education_w:.0%}) + Infrastructure ({infrastructure_w:.0%}) + Market Size ({market_w:.0%}) + Transportation Patterns ({transport_w:.0%})</p>
 
     </div>
     """, unsafe_allow_html=True)
     
     # Priority ranking with stacked bar chart showing factors - DESCENDING ORDER
-    priority_top20 = priority_df.sort_values('Priority_Score', ascending=True)  # Changed to ascending=True for descending visual order
-    
-    fig_priority = go.Figure()
-    
-    # Create stacked bar chart with authentic factors
-    fig_priority.add_trace(go.Bar(
-        name='Economic Capacity',
-        y=priority_top20['City'],
-        x=priority_top20['Economic_Score'] * 0.25,  # Weight applied
-        orientation='h',
-        marker_color='#06b6d4',
-        hovertemplate='<b>%{y}</b><br>Economic Score: %{customdata:.3f}<br>Income: $%{text:,}<extra></extra>',
-        customdata=priority_top20['Economic_Score'],
-        text=priority_top20['Median_Income']
-    ))
+    priority_top20 = SortedColumns(priority_df, 'Priority_Score')  # Ascending for descending visual order
     
-    fig_priority.add_trace(go.Bar(
-        name='Education Level',
-        y=priority_top20['City'],
-        x=priority_top20['Education_Score'] * 0.20,
-        orientation='h',
-        marker_color='#f59e0b',
-        hovertemplate='<b>%{y}</b><br>Education Score: %{customdata:.3f}<br>Bachelor\'s+: %{text:.1f}%<extra></extra>',
-        customdata=priority_top20['Education_Score'],
-        text=priority_top20['Bachelor_Degree_Pct']
-    ))
-    
-    fig_priority.add_trace(go.Bar(
-        name='Infrastructure Readiness',
-        y=priority_top20['City'],
-        x=priority_top20['Infrastructure_Score'] * 0.20,
-        orientation='h',
-        marker_color='#10b981',
-        hovertemplate='<b>%{y}</b><br>Infrastructure Score: %{customdata:.3f}<br>Single Family: %{text:.1f}%<extra></extra>',
-        customdata=priority_top20['Infrastructure_Score'],
-        text=priority_top20['Single_Family_Pct']
-    ))
-    
-    fig_priority.add_trace(go.Bar(
-        name='Market Size',
-        y=priority_top20['City'],
-        x=priority_top20['Market_Size_Score'] * 0.20,
-        orientation='h',
-        marker_color='#ef4444',
-        hovertemplate='<b>%{y}</b><br>Market Size Score: %{customdata:.3f}<br>Population: %{text:,}<extra></extra>',
-        customdata=priority_top20['Market_Size_Score'],
-        text=priority_top20['Population_2024']
-    ))
-    
-    fig_priority.add_trace(go.Bar(
-        name='Transportation Pattern',
-        y=priority_top20['City'],
-        x=priority_top20['Transport_Score'] * 0.15,
-        orientation='h',
-        marker_color='#8b5cf6',
-        hovertemplate='<b>%{y}</b><br>Transport Score: %{customdata:.3f}<br>Drive Alone: %{text:.1f}%<extra></extra>',
-        customdata=priority_top20['Transport_Score'],
-        text=priority_top20['Drive_Alone_Pct']
-    ))
-    
-    fig_priority.update_layout(
-        title='Priority City Ranking - Highest to Lowest Priority (Authentic Data)',
-        xaxis_title='Weighted Priority Score Components',
-        yaxis_title='Cities (Ranked from Highest to Lowest Priority)',
-        barmode='stack',
-        height=800,
-        paper_bgcolor='#000000',
-        plot_bgcolor='#000000',
-        font=dict(color='#f1f5f9'),
-        title_font=dict(color='#06b6d4', size=16),
-        legend=dict(
-            orientation="h", 
-            yanchor="bottom", 
-            y=1.02, 
-            xanchor="right", 
-            x=1,
-            bgcolor='#000000',
-            bordercolor='#06b6d4',
-            borderwidth=1
-        ),
-        yaxis=dict(
-            categoryorder='array', 
-            categoryarray=priority_top20['City'].tolist(),
-            gridcolor='rgba(6, 182, 212, 0.3)',
-            color='#f1f5f9'
-        ),
-        xaxis=dict(
-            gridcolor='rgba(6, 182, 212, 0.3)',
-            color='#f1f5f9'
+    def build_priority_figure():
+        fig = go.Figure()
+        
+        # Create stacked bar chart with authentic factors
+        fig.add_trace(go.Bar(
+            name='Economic Capacity',
+            orientation='h',
+            marker_color='#06b6d4',
+            texttemplate='%{customdata[1]:,}',
+            hovertemplate='<b>%{y}</b><br>Economic Score: %{customdata[0]:.3f}<br>Income: $%{customdata[1]:,}<extra></extra>'
+        ))
+        fig.add_trace(go.Bar(
+            name='Education Level',
+            orientation='h',
+            marker_color='#f59e0b',
+            texttemplate='%{customdata[1]:.1f}',
+            hovertemplate='<b>%{y}</b><br>Education Score: %{customdata[0]:.3f}<br>Bachelor\'s+: %{customdata[1]:.1f}%<extra></extra>'
+        ))
+        fig.add_trace(go.Bar(
+            name='Infrastructure Readiness',
+            orientation='h',
+            marker_color='#10b981',
+            texttemplate='%{customdata[1]:.1f}',
+            hovertemplate='<b>%{y}</b><br>Infrastructure Score: %{customdata[0]:.3f}<br>Single Family: %{customdata[1]:.1f}%<extra></extra>'
+        ))
+        fig.add_trace(go.Bar(
+            name='Market Size',
+            orientation='h',
+            marker_color='#ef4444',
+            texttemplate='%{customdata[1]:,}',
+            hovertemplate='<b>%{y}</b><br>Market Size Score: %{customdata[0]:.3f}<br>Population: %{customdata[1]:,}<extra></extra>'
+        ))
+        fig.add_trace(go.Bar(
+            name='Transportation Pattern',
+            orientation='h',
+            marker_color='#8b5cf6',
+            texttemplate='%{customdata[1]:.1f}',
+            hovertemplate='<b>%{y}</b><br>Transport Score: %{customdata[0]:.3f}<br>Drive Alone: %{customdata[1]:.1f}%<extra></extra>'
+        ))
+        
+        fig.update_layout(
+            title='Priority City Ranking - Highest to Lowest Priority (Authentic Data)',
+            xaxis_title='Weighted Priority Score Components',
+            yaxis_title='Cities (Ranked from Highest to Lowest Priority)',
+            barmode='stack',
+            height=800,
+            paper_bgcolor='#000000',
+            plot_bgcolor='#000000',
+            font=dict(color='#f1f5f9'),
+            title_font=dict(color='#06b6d4', size=16),
+            legend=dict(
+                orientation="h", 
+                yanchor="bottom", 
+                y=1.02, 
+                xanchor="right", 
+                x=1,
+                bgcolor='#000000',
+                bordercolor='#06b6d4',
+                borderwidth=1
+            ),
+            yaxis=dict(
+                type='category',
+                categoryorder='array', 
+                gridcolor='rgba(6, 182, 212, 0.3)',
+                color='#f1f5f9'
+            ),
+            xaxis=dict(
+                gridcolor='rgba(6, 182, 212, 0.3)',
+                color='#f1f5f9'
+            )
         )
-    )
-    
-    st.plotly_chart(fig_priority, use_container_width=True)
+        return fig
+    
+    # Weighted factor contributions (scenario weights applied); customdata holds the
+    # factor score and the raw value behind it, the bar text shows the raw value
+    positions = category_positions(priority_top20['City'])
+    factor_traces = [
+        ('Economic_Score', economic_w, 'Median_Income'),
+        ('Education_Score', education_w, 'Bachelor_Degree_Pct'),
+        ('Infrastructure_Score', infrastructure_w, 'Single_Family_Pct'),
+        ('Market_Size_Score', market_w, 'Population_2024'),
+        ('Transport_Score', transport_w, 'Drive_Alone_Pct')
+    ]
+    fig_priority = cached_figure('priority', build_priority_figure, [
+        dict(x=priority_top20[score] * weight, customdata=np.column_stack([priority_top20[score], priority_top20[raw]]),
+             **positions)
+        for score, weight, raw in factor_traces
+    ], layout_updates=dict(yaxis_categoryarray=priority_top20['City'].tolist()))
+    
+    plot_figure(fig_priority)
     
     # Priority ranking table with matching chart names
     st.subheader("Priority Ranking Details")
     
-    priority_display = priority_df.sort_values('Priority_Score', ascending=False)[[
+    priority_display = priority_df[[
         'City', 'Priority_Rank', 'Priority_Score', 'Median_Income', 'Bachelor_Degree_Pct',
         'Single_Family_Pct', 'Population_2024', 'Drive_Alone_Pct'
-    ]].round(3)
+    ]].round(3).merge(categories_df, on='City', how='left')
     
     # Rename columns to match chart factor names
     priority_display = priority_display.rename(columns={
@@ -1544,7 +2510,50 @@ def display_bev_analysis(cities_df, forecast_df, priority_df, risk_df, state_dat
         'Drive_Alone_Pct': 'Transportation Pattern (%)'
     })
     
-    st.dataframe(priority_display, use_container_width=True, height=500)
+    render_paginated_table('priority_table', priority_display, scenario_key(params), 'Priority Rank', ascending=True)
+    
+    # Rank stability: weight changes needed to swap adjacent cities
+    st.subheader("Priority Rank Stability")
+    
+    stability_df = rank_stability_table(priority_df, params['priority_weights'], top_n=5)
+    city_margins = city_rank_stability(priority_df, params['priority_weights'])
+    top5_boundary = stability_df[stability_df['Top_N_Boundary']]
+    
+    # Datasets of five cities or fewer have no #5 vs #6 pair (and one city has no pair at all)
+    if len(top5_boundary):
+        top5_boundary = top5_boundary.iloc[0]
+        st.markdown(f"""
+        **Top-5 boundary:** {top5_boundary['City']} (#5) vs {top5_boundary['Next_City']} (#6) — 
+        a weight shift of **{top5_boundary['Min_Weight_Shift']:.3f}** swaps them 
+        (most sensitive to {top5_boundary['Most_Sensitive_Weight'].replace('_', ' ')}).
+        """)
+    if len(city_margins) > 1:
+        st.markdown(f"""
+        **Least stable city:** {city_margins.loc[city_margins['Stability_Margin'].idxmin(), 'City']} 
+        (margin {city_margins['Stability_Margin'].min():.3f})
+        """)
+    
+    stability_display = stability_df.drop(columns=['Top_N_Boundary']).replace([np.inf, -np.inf], np.nan).round(4)
+    stability_display = stability_display.rename(columns={
+        'Next_City': 'Next City',
+        'Score_Gap': 'Score Gap',
+        'Swap_Delta_Economic_Score': 'Economic Weight Δ',
+        'Swap_Delta_Education_Score': 'Education Weight Δ',
+        'Swap_Delta_Infrastructure_Score': 'Infrastructure Weight Δ',
+        'Swap_Delta_Market_Size_Score': 'Market Size Weight Δ',
+        'Swap_Delta_Transport_Score': 'Transportation Weight Δ',
+        'Min_Weight_Shift': 'Min Weight Shift',
+        'Most_Sensitive_Weight': 'Most Sensitive Weight'
+    })
+    
+    render_paginated_table('stability_table', stability_display, scenario_key(params), 'Rank', ascending=True)
+    
+    # Rank uncertainty: ACS estimates resampled within their margins of error
+    st.subheader("Priority Rank Uncertainty")
+    display_rank_uncertainty(priority_df, params)
+
+def display_risk_analysis(risk_df, priority_df):
+    """Display the risk assessment matrix and factor heatmap"""
     
     # DELIVERABLE 3: Risk Matrix
     st.markdown("""
@@ -1564,30 +2573,36 @@ def display_bev_analysis(cities_df, forecast_df, priority_df, risk_df, state_dat
     )
     
     # Risk matrix scatter plot
-    fig_risk = px.scatter(
-        risk_priority_df,
-        x='Overall_Risk_Score',
-        y='Priority_Score',
-        size='EV_Forecast_2029',
-        color='Risk_Category',
-        hover_name='City',
-        color_discrete_map={'Low Risk': '#10b981', 'Medium Risk': '#f59e0b', 'High Risk': '#ef4444'},
-        title='Risk vs Priority Matrix - All 20 Cities (Bubble Size = 2029 EV Forecast)',
-        labels={
-            'Overall_Risk_Score': 'Overall Risk Score (4-12, lower is better)',
-            'Priority_Score': 'Priority Score (0-1, higher is better)'
-        }
-    )
+    risk_colors = {'Low Risk': '#10b981', 'Medium Risk': '#f59e0b', 'High Risk': '#ef4444'}
+    
+    def build_risk_figure():
+        fig = go.Figure()
+        for category, color in risk_colors.items():
+            fig.add_trace(go.Scatter(
+                name=category,
+                mode='markers',
+                marker=dict(color=color, sizemode='area'),
+                hovertemplate='<b>%{hovertext}</b><br>Overall Risk: %{x:.1f}<br>Priority Score: %{y:.3f}<extra></extra>'
+            ))
+        fig.update_layout(
+            title='Risk vs Priority Matrix - All 20 Cities (Bubble Size = 2029 EV Forecast)',
+            xaxis_title='Overall Risk Score (4-12, lower is better)',
+            yaxis_title='Priority Score (0-1, higher is better)',
+            legend_title_text='Risk Category',
+            height=600,
+            paper_bgcolor='#000000',
+            plot_bgcolor='#000000',
+            font=dict(color='#f1f5f9'),
+            title_font=dict(color='#06b6d4', size=16)
+        )
+        return fig
     
-    fig_risk.update_layout(
-        height=600,
-        paper_bgcolor='#000000',
-        plot_bgcolor='#000000',
-        font=dict(color='#f1f5f9'),
-        title_font=dict(color='#06b6d4', size=16)
-    )
+    fig_risk = cached_figure('risk', build_risk_figure, category_bubble_data(
+        risk_priority_df, 'Risk_Category', risk_colors,
+        x='Overall_Risk_Score', y='Priority_Score', size='EV_Forecast_2029'
+    ))
     
-    st.plotly_chart(fig_risk, use_container_width=True)
+    plot_figure(fig_risk)
     
     # Risk factors breakdown heatmap
     st.subheader("Risk Factors Heatmap")
@@ -1595,23 +2610,177 @@ def display_bev_analysis(cities_df, forecast_df, priority_df, risk_df, state_dat
     # Create risk heatmap data
     risk_factors_data = risk_df[['City', 'Economic_Risk', 'Infrastructure_Risk', 'Demographic_Risk', 'Market_Risk']].set_index('City')
     
-    fig_heatmap = px.imshow(
-        risk_factors_data.T,
-        labels=dict(x="Cities", y="Risk Factors", color="Risk Level"),
-        x=risk_factors_data.index,
-        y=['Economic Risk', 'Infrastructure Risk', 'Demographic Risk', 'Market Risk'],
-        color_continuous_scale='RdYlGn_r',
-        title='Risk Factors Heatmap - All 20 Cities (1=Low, 2=Medium, 3=High)'
+    def build_heatmap_figure():
+        fig = go.Figure(go.Heatmap(
+            y=['Economic Risk', 'Infrastructure Risk', 'Demographic Risk', 'Market Risk'],
+            colorscale='RdYlGn_r',
+            colorbar=dict(title='Risk Level'),
+            hovertemplate='Cities: %{x}<br>Risk Factors: %{y}<br>Risk Level: %{z}<extra></extra>'
+        ))
+        fig.update_layout(
+            title='Risk Factors Heatmap - All 20 Cities (1=Low, 2=Medium, 3=High)',
+            xaxis_title='Cities',
+            yaxis_title='Risk Factors',
+            yaxis_autorange='reversed',
+            height=400,
+            paper_bgcolor='#000000',
+            plot_bgcolor='#000000',
+            font=dict(color='#f1f5f9'),
+            title_font=dict(color='#06b6d4', size=16)
+        )
+        return fig
+    
+    fig_heatmap = cached_figure('risk_heatmap', build_heatmap_figure, [
+        dict(z=risk_factors_data.T.to_numpy(), x=risk_factors_data.index)
+    ])
+    plot_figure(fig_heatmap)
+
+@st.cache_resource(max_entries=SHARED_SCENARIO_ENTRIES)
+def whatif_baseline(key, _cities_df, current_total, _params):
+    """
+    Shared what-if baseline for one scenario
+    
+    Keyed on the scenario hash: column statistics, totals and the baseline
+    readiness and priority scores are computed once per scenario, and every
+    variant afterwards only rescores the edited city (see whatif.py).
+    """
+    return WhatIfBaseline(
+        _cities_df, _params['state_target'], current_total, _params['population_share'],
+        _params['readiness_weights'], _params['priority_weights'], _params['risk_weights'],
+        _params['charging_weights'], _params['grid_weights'], _params['infrastructure_weights']
     )
+
+@st.cache_resource(max_entries=SHARED_SCENARIO_ENTRIES)
+def priority_rank_bootstrap(key, dataset, _priority_df, priority_weights, replicates=REPLICATES):
+    """
+    Bootstrap distribution of Priority_Rank under ACS sampling error
+    
+    Shared per priority stage version (key), like the other scenario
+    results, so the result is neither copied nor pickled on reruns. Margins of error come from the
+    ingested ACS files for an ingested vintage and from the typical-MOE
+    defaults otherwise (see bootstrap.py). Large tables draw fewer
+    replicates (bootstrap.replicates_for), and only the leading cities'
+    probabilities of ranks 1..DISTRIBUTION_RANKS are kept. Returns (summary
+    table, leading city x rank probability matrix in summary order,
+    replicates drawn).
+    """
+    if dataset.startswith('acs-'):
+        margins = acs_margins(ACS_DATA_DIR, _priority_df, int(dataset.split('-', 1)[1]))
+    else:
+        margins = default_margins(_priority_df)
+    replicates = replicates_for(len(_priority_df), replicates)
+    ranks = bootstrap_ranks(_priority_df, margins, priority_weights, replicates)
+    summary = rank_summary(_priority_df['City'], _priority_df['Priority_Rank'], ranks)
+    leaders = pd.Index(_priority_df['City']).get_indexer(summary['City'].head(DISTRIBUTION_RANKS))
+    return summary, rank_distribution(ranks, leaders), replicates
+
+def display_rank_uncertainty(priority_df, params):
+    """
+    Bootstrap distribution of the priority ranks for the scenario
+    
+    ON DEMAND:
+    - The bootstrap (see priority_rank_bootstrap) is never run by a rerun;
+      the view shows a Run button until this session has asked for the
+      scenario's priority stage version
+    - Keyed on that version, so risk, readiness and infrastructure changes
+      keep the result, and sessions on the same priority weights share it
+    """
     
-    fig_heatmap.update_layout(
-        height=400,
+    version = stage_version(params, 'priority')
+    bootstrapped = st.session_state.setdefault('rank_bootstrap_versions', set())
+    if version not in bootstrapped:
+        st.caption("Resamples the ACS inputs of every city within their margins of error and re-ranks each "
+                   "replicate; the result is kept for every session on the same priority weights.")
+        if not st.button("Run Rank Bootstrap", key='rank_bootstrap_run'):
+            return
+    
+    with st.spinner("Bootstrapping priority ranks..."):
+        rank_summary_df, rank_probabilities, replicates = priority_rank_bootstrap(
+            version, params['dataset'], priority_df, params['priority_weights']
+        )
+    bootstrapped.add(version)
+    top_column = f'Top_{TOP_N}_Probability'
+    
+    # Leading cities by point rank only; the full table below is paged
+    leaders = rank_summary_df['City'].to_numpy()[:len(rank_probabilities)]
+    fig_rank_distribution = go.Figure(go.Heatmap(
+        z=rank_probabilities, x=np.arange(1, rank_probabilities.shape[1] + 1), y=leaders,
+        colorscale=[[0, '#000000'], [1, '#06b6d4']], zmin=0, zmax=1,
+        hovertemplate='<b>%{y}</b><br>Rank %{x}: %{z:.1%} of replicates<extra></extra>'
+    ))
+    fig_rank_distribution.update_layout(
+        title=f'Priority Rank Distribution, Top {len(leaders)} Cities ({replicates:,} ACS Margin-of-Error Replicates)',
+        xaxis_title='Priority Rank',
+        yaxis=dict(autorange='reversed'),
+        height=max(400, 22 * len(leaders)),
         paper_bgcolor='#000000',
         plot_bgcolor='#000000',
         font=dict(color='#f1f5f9'),
         title_font=dict(color='#06b6d4', size=16)
     )
-    st.plotly_chart(fig_heatmap, use_container_width=True)
+    plot_figure(typed_figure(fig_rank_distribution))
+    
+    render_paginated_table('rank_uncertainty_table', rank_summary_df.rename(columns={
+        'Priority_Rank': 'Priority Rank',
+        'Median_Rank': 'Median Rank',
+        'Rank_Low': '90% Low',
+        'Rank_High': '90% High',
+        top_column: f'P(Top {TOP_N})'
+    }).round(3), scenario_key(params), 'Priority Rank', ascending=True)
+
+def display_whatif_comparison(cities_df, state_data, params):
+    """
+    What-if comparison for one city against the cached baseline
+    
+    WHAT-IF INPUTS:
+    - Demographic, housing and commute fields of one city, pre-filled with its data
+    - Urban classification (drives charging access in infrastructure readiness)
+    
+    OUTPUT:
+    - Counterfactual readiness, priority rank, risk and infrastructure
+      categories and forecast next to the baseline, with the change
+    - Evaluation time (no pipeline rerun; only the edited city is rescored,
+      and vehicle counts are re-apportioned across all cities)
+    """
+    st.subheader("What-If City Comparison")
+    
+    key = scenario_key(params)
+    baseline = whatif_baseline(key, cities_df, state_data['Estimated_Current_Total'], params)
+    
+    city = st.selectbox("City", cities_df['City'].tolist(), key='whatif_city')
+    city_row = cities_df.set_index('City').loc[city]
+    
+    with st.form('whatif_form'):
+        columns = st.columns(4)
+        overrides = {}
+        for n, column in enumerate(field for field in WHATIF_FIELDS if field != 'Urban_Classification'):
+            value = float(city_row[column])
+            overrides[column] = columns[n % 4].number_input(
+                column.replace('_', ' '), min_value=0.0, max_value=100.0 if column.endswith('_Pct') else None,
+                value=value, step=1.0 if column.endswith('_Pct') else max(1.0, round(value * 0.05, -2)),
+                key=f'whatif_{city}_{column}'
+            )
+        classes = list(URBAN_CHARGING_SCORES)
+        overrides['Urban_Classification'] = columns[3].selectbox(
+            "Urban Classification", classes, index=classes.index(city_row['Urban_Classification']),
+            key=f'whatif_{city}_Urban_Classification'
+        )
+        st.form_submit_button("Compare")
+    
+    start = datetime.now()
+    variant = baseline.evaluate(city, overrides)
+    elapsed = (datetime.now() - start).total_seconds()
+    
+    # The unedited city through the same path, so only the edits show as changes
+    comparison_df = comparison_table(baseline.evaluate(city, {}), variant)
+    for column in ('Baseline', 'What_If', 'Change'):
+        comparison_df[column] = comparison_df[column].map(
+            lambda value: f'{value:,.4f}' if isinstance(value, (float, np.floating)) else
+            f'{value:,}' if isinstance(value, (int, np.integer)) else str(value)
+        )
+    st.dataframe(comparison_df, use_container_width=True, hide_index=True)
+    st.caption(f"Evaluated in {elapsed * 1000:.2f} ms against the cached baseline; vehicle counts are "
+               f"re-apportioned over every city as in the pipeline")
 
 def main():
     # Header
@@ -1623,18 +2792,26 @@ def main():
     </div>
     """, unsafe_allow_html=True)
     
-    # Create tabs
-    tab1, tab2 = st.tabs(["📈 BEV Market Analysis", "⚡ Infrastructure Feasibility & Grid Readiness"])
+    # View selector: unlike st.tabs, which runs every tab's content on each
+    # rerun, only the selected view is rendered
+    view = st.radio("View", DASHBOARD_VIEWS, horizontal=True, label_visibility='collapsed', key='dashboard_view')
     
-    with tab1:
-        # Load and process data
-        with st.spinner("Processing authentic data and running linear regression models..."):
-            cities_df = load_authentic_massachusetts_cities_complete()
-            forecast_df, state_data = calculate_authentic_linear_regression_forecasts(cities_df)
-            priority_df = create_priority_factors_data(forecast_df)
-            risk_df = create_risk_assessment_matrix(forecast_df)
-        
-        display_bev_analysis(cities_df, forecast_df, priority_df, risk_df, state_data)
+    # Scenario parameters from the sidebar, and the latest ready results for them
+    params = render_scenario_sidebar()
+    with st.spinner("Processing authentic data and running linear regression models..."):
+        params, results = current_scenario_results(params)
+    cities_df, forecast_df, state_data, priority_df, risk_df, infra_df, horizon_df = results
+    render_export_sidebar(params)
+    
+    # Figure skeletons belong to one dataset version; drop them when it changes
+    if st.session_state.get('figure_cache_version') != params['dataset_version']:
+        st.session_state['figure_cache'] = {}
+        st.session_state['figure_cache_version'] = params['dataset_version']
+    
+    categories_df = city_categories(risk_df, infra_df)
+    
+    if view == DASHBOARD_VIEWS[0]:
+        display_bev_analysis(forecast_df, state_data, params, horizon_df, categories_df)
         
         # Summary Section
         st.header("Analysis Summary")
@@ -1686,9 +2863,18 @@ def main():
 
 
     
-    with tab2:
+    elif view == DASHBOARD_VIEWS[1]:
+        display_priority_analysis(priority_df, params, categories_df)
+    
+    elif view == DASHBOARD_VIEWS[2]:
+        display_risk_analysis(risk_df, priority_df)
+    
+    elif view == DASHBOARD_VIEWS[3]:
+        display_whatif_comparison(cities_df, state_data, params)
+    
+    else:
         # Infrastructure Feasibility & Grid Readiness content
-        display_infrastructure_analysis()
+        display_infrastructure_analysis(infra_df, params, categories_df)
 
         
 
@@ -0,0 +1,188 @@
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from acs_ingest import load_acs_values
+from scoring import PRIORITY_WEIGHTS, feature_inputs, weight_vector
+
+# ACS estimates behind the priority factors, perturbed by their margins of error
+# (population and distance are not survey estimates and stay fixed)
+PERTURBED_FIELDS = ('Median_Income', 'Median_Home_Value', 'Bachelor_Degree_Pct', 'Single_Family_Pct',
+                    'Drive_Alone_Pct')
+
+# ACS margins of error are 90% intervals: standard error = MOE / 1.645
+MOE_Z = 1.645
+
+# Stand-in margins when no ingested MOE exists (typical ACS 5-year values for
+# Massachusetts municipalities): relative for dollar amounts, percentage
+# points for shares
+DEFAULT_RELATIVE_MOE = {'Median_Income': 0.06, 'Median_Home_Value': 0.05}
+DEFAULT_POINT_MOE = {'Bachelor_Degree_Pct': 2.5, 'Single_Family_Pct': 2.5, 'Drive_Alone_Pct': 2.0}
+
+REPLICATES = 10000
+
+# Bound on replicates x cities kept in the rank array (10,000 replicates up
+# to 500 cities, proportionally fewer beyond), which bounds memory and time
+MAX_RANK_CELLS = 5000000
+
+# Leading cities and ranks in the rank-probability matrix
+DISTRIBUTION_RANKS = 25
+
+# Replicates evaluated per array operation; bounds the (replicates x cities x
+# fields) draw array at BATCH_REPLICATES * cities * 5 * 8 bytes
+BATCH_REPLICATES = 2500
+
+TOP_N = 5
+
+# Central rank interval reported per city
+INTERVAL = 0.90
+
+
+def default_margins(cities_df):
+    """Stand-in margins of error per city and perturbed field (DEFAULT_*_MOE)"""
+    margins = pd.DataFrame({'City': cities_df['City'].to_numpy()})
+    for field in PERTURBED_FIELDS:
+        if field in DEFAULT_RELATIVE_MOE:
+            margins[field] = cities_df[field].to_numpy(dtype=float) * DEFAULT_RELATIVE_MOE[field]
+        else:
+            margins[field] = DEFAULT_POINT_MOE[field]
+    return margins
+
+
+def acs_margins(acs_dir, cities_df, vintage=None):
+    """
+    Margins of error of an ingested ACS vintage (see acs_ingest.py)
+
+    Cities or fields without an ingested MOE keep the default margins.
+    """
+    margins = default_margins(cities_df)
+    values = load_acs_values(acs_dir, vintage, columns=['City', 'Field', 'MOE'])
+    values = values[values['Field'].isin(PERTURBED_FIELDS) & values['MOE'].notna()]
+    for field in PERTURBED_FIELDS:
+        moe = margins['City'].map(values[values['Field'] == field].drop_duplicates('City', keep='last')
+                                  .set_index('City')['MOE'])
+        margins[field] = moe.fillna(margins[field]).to_numpy(dtype=float)
+    return margins
+
+
+def _replicate_scores(draws, fixed, w):
+    """
+    Priority scores of a batch of replicates, (replicates x cities)
+
+    draws holds the perturbed PERTURBED_FIELDS as (replicates x cities x
+    fields); fixed the unperturbed inputs. The factor formulas are those of
+    scoring.feature_matrices, with the economic factor normalized by each
+    replicate's own maxima.
+    """
+    income, home_value, education, single_family, drive_alone = np.moveaxis(draws, -1, 0)
+    economic = (income / income.max(axis=1, keepdims=True)) * 0.6 + \
+        (home_value / home_value.max(axis=1, keepdims=True)) * 0.4
+    infrastructure = (single_family / 100) * 0.6 + fixed['distance_term'] * 0.4
+    return (economic * w[0] + education / 100 * w[1] + infrastructure * w[2]
+            + fixed['market_size'] * w[3] + drive_alone / 100 * w[4])
+
+
+def bootstrap_ranks(cities_df, margins, weights=None, replicates=REPLICATES, seed=0, batch=BATCH_REPLICATES):
+    """
+    Priority ranks of every city under ACS sampling error, (replicates x cities)
+
+    Each replicate draws every perturbed estimate from a normal with its
+    MOE-derived standard error (independently per field; ACS publishes no
+    covariances), clipped to valid values. A batch of replicates is drawn
+    as one (replicates x cities x fields) array, scored in one pass and
+    ranked along the city axis with a single argsort (rank 1 = highest
+    score, ties broken by table order).
+    """
+    w = weight_vector(weights, PRIORITY_WEIGHTS)
+    inputs = feature_inputs(cities_df)
+    estimates = cities_df[list(PERTURBED_FIELDS)].to_numpy(dtype=float)
+    scale = margins[list(PERTURBED_FIELDS)].to_numpy(dtype=float) / MOE_Z
+    fixed = {
+        'distance_term': 1 - inputs['distance'] / inputs['distance'].max(),
+        'market_size': inputs['population'] / inputs['population'].max()
+    }
+    # Dollar amounts stay positive, percentages within 0-100
+    lower = np.where([field.endswith('_Pct') for field in PERTURBED_FIELDS], 0.0, 1.0)
+    upper = np.where([field.endswith('_Pct') for field in PERTURBED_FIELDS], 100.0, np.inf)
+
+    n = len(cities_df)
+    rng = np.random.default_rng(seed)
+    ranks = np.empty((replicates, n), dtype=np.int16 if n < 2 ** 15 else np.int32)
+    positions = np.arange(1, n + 1, dtype=ranks.dtype)
+    for start in range(0, replicates, batch):
+        size = min(batch, replicates - start)
+        draws = np.clip(estimates + rng.standard_normal((size, n, len(PERTURBED_FIELDS))) * scale, lower, upper)
+        order = np.argsort(-_replicate_scores(draws, fixed, w), axis=1, kind='stable')
+        np.put_along_axis(ranks[start:start + size], order, np.broadcast_to(positions, order.shape), axis=1)
+    return ranks
+
+
+def replicates_for(n, replicates=REPLICATES, max_cells=MAX_RANK_CELLS):
+    """Replicates to draw for n cities: the requested number within max_cells (at least 100)"""
+    return int(min(replicates, max(100, max_cells // max(n, 1))))
+
+
+def rank_distribution(ranks, cities=None, max_rank=DISTRIBUTION_RANKS):
+    """
+    Share of replicates in which each city holds each rank 1..max_rank
+
+    Rows are the given city columns of ranks (all cities by default), so
+    the matrix is (len(cities) x max_rank) rather than cities x cities.
+    """
+    replicates, n = ranks.shape
+    if cities is not None:
+        ranks = ranks[:, cities]
+    max_rank = min(max_rank, n)
+    rows = np.broadcast_to(np.arange(ranks.shape[1]), ranks.shape)
+    kept = ranks <= max_rank
+    cells = rows[kept] * max_rank + (ranks[kept] - 1)
+    return np.bincount(cells, minlength=ranks.shape[1] * max_rank).reshape(-1, max_rank) / replicates
+
+
+def rank_summary(cities, point_ranks, ranks, top_n=TOP_N, interval=INTERVAL):
+    """Median rank, central rank interval and top-N probability per city"""
+    tail = (1 - interval) / 2
+    low, median, high = np.quantile(ranks, [tail, 0.5, 1 - tail], axis=0, method='inverted_cdf')
+    return pd.DataFrame({
+        'City': np.asarray(cities),
+        'Priority_Rank': np.asarray(point_ranks),
+        'Median_Rank': median.astype(int),
+        'Rank_Low': low.astype(int),
+        'Rank_High': high.astype(int),
+        f'Top_{top_n}_Probability': (ranks <= top_n).mean(axis=0)
+    }).sort_values(['Priority_Rank', 'Median_Rank']).reset_index(drop=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bootstrap Priority_Rank intervals from ACS margins of error")
+    parser.add_argument('--replicates', type=int, default=REPLICATES)
+    parser.add_argument('--cities', type=int, default=351, help="Synthetic municipalities to rank")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    import app
+    from numerics import dense_rank
+    from synthetic import CityModel, generate_chunks
+    cities_df = pd.concat(generate_chunks(CityModel(app.load_authentic_massachusetts_cities_complete()),
+                                          args.cities, args.seed), ignore_index=True)
+    priority_df = app.create_priority_factors_data(cities_df)
+
+    start = time.perf_counter()
+    ranks = bootstrap_ranks(cities_df, default_margins(cities_df), replicates=args.replicates, seed=args.seed)
+    summary = rank_summary(cities_df['City'], priority_df['Priority_Rank'], ranks)
+    elapsed = time.perf_counter() - start
+
+    # With zero margins every replicate reproduces the pipeline ranks
+    exact = bootstrap_ranks(cities_df, default_margins(cities_df).assign(**{f: 0.0 for f in PERTURBED_FIELDS}),
+                            replicates=1)
+    consistent = np.array_equal(exact[0], dense_rank(priority_df['Priority_Score'].to_numpy()))
+
+    print(f"{args.replicates:,} replicates x {args.cities} cities in {elapsed:.2f}s "
+          f"(zero-MOE ranks match pipeline: {consistent})")
+    print(summary.head(15).round(3).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,253 @@
+import argparse
+import json
+import time
+
+import numpy as np
+import pandas as pd
+
+from scoring import PRIORITY_WEIGHTS, READINESS_WEIGHTS, build_feature_matrices, weight_vector
+
+# Stages whose weights can be fitted, and the defaults each fit starts from
+STAGE_WEIGHTS = {'readiness': READINESS_WEIGHTS, 'priority': PRIORITY_WEIGHTS}
+
+# Projected-gradient stopping rule: at most MAX_ITER steps, stop early once
+# the projected gradient is below TOLERANCE relative to the gradient at zero
+MAX_ITER = 5000
+TOLERANCE = 1e-8
+
+# Cross-validation folds across cities
+FOLDS = 5
+
+# Observed per-city EV counts (e.g. registrations by municipality) are read from this column
+OBSERVED_COLUMN = 'Observed_EVs'
+
+
+def load_observations(path, cities_df):
+    """
+    Observed EV counts aligned with a city table
+
+    The CSV needs City and Observed_EVs columns; every city of cities_df must
+    appear. Returns the counts as a float array in cities_df order.
+    """
+    observed = pd.read_csv(path)
+    missing_columns = [column for column in ('City', OBSERVED_COLUMN) if column not in observed.columns]
+    if missing_columns:
+        raise ValueError(f"Observation file is missing columns: {', '.join(missing_columns)}")
+
+    counts = cities_df[['City']].merge(observed[['City', OBSERVED_COLUMN]], on='City', how='left')
+    missing = counts.loc[counts[OBSERVED_COLUMN].isna(), 'City'].tolist()
+    if missing:
+        raise ValueError(f"No observed EV count for: {', '.join(missing[:10])}")
+    return counts[OBSERVED_COLUMN].to_numpy(dtype=float)
+
+
+def normal_equations(features, rates, sample_weight):
+    """
+    Gram matrix, moment vector and constant of the weighted least-squares loss
+
+    loss(v) = sum_i s_i (r_i - F_i v)^2 = v'Gv - 2b'v + c, so after this one
+    pass over the cities every loss and gradient evaluation costs
+    O(factors^2), however many cities or tracts there are.
+    """
+    weighted = features * sample_weight[:, None]
+    return features.T @ weighted, weighted.T @ rates, float(rates @ (sample_weight * rates))
+
+
+def loss_and_gradient(v, gram, moments, constant):
+    """Weighted squared error and its gradient at v"""
+    gv = gram @ v
+    return float(v @ gv - 2 * moments @ v + constant), 2 * (gv - moments)
+
+
+def projected_gradient(gram, moments, constant, start=None, max_iter=MAX_ITER, tol=TOLERANCE):
+    """
+    Non-negative least squares by accelerated projected gradient (FISTA)
+
+    The factors are rescaled to unit diagonal first (a positive diagonal
+    scaling keeps the constraint v >= 0), which tames the correlated
+    income and education columns. Steps are 1/L with L the gradient's
+    Lipschitz constant (twice the largest eigenvalue of the scaled Gram
+    matrix); momentum restarts whenever the loss rises. start warm-starts
+    the iterate (e.g. from the previous fit or the default weights). Stops
+    once the projected gradient is below tol relative to the gradient at
+    v = 0, so a warm start near the optimum stops within a few steps. The
+    constant c is left out of the iteration, where it would only swamp the
+    loss differences the restart test compares. Returns (v, loss,
+    iterations).
+    """
+    diagonal = np.sqrt(np.maximum(np.diag(gram), np.finfo(float).tiny))
+    gram, moments = gram / np.outer(diagonal, diagonal), moments / diagonal
+    lipschitz = 2 * max(float(np.linalg.eigvalsh(gram)[-1]), np.finfo(float).tiny)
+    step = 1 / lipschitz
+    x = np.maximum(np.asarray(start, dtype=float) * diagonal, 0) if start is not None else np.zeros(len(moments))
+    y, t = x.copy(), 1.0
+    loss, _ = loss_and_gradient(x, gram, moments, 0.0)
+    threshold = tol * max(2 * np.linalg.norm(moments), np.finfo(float).tiny)
+
+    for iteration in range(1, max_iter + 1):
+        _, gradient = loss_and_gradient(y, gram, moments, 0.0)
+        x_next = np.maximum(y - step * gradient, 0)
+        loss_next, gradient_next = loss_and_gradient(x_next, gram, moments, 0.0)
+        if loss_next > loss:
+            # Momentum overshot: restart from the last iterate with a plain step
+            y, t = x.copy(), 1.0
+            continue
+
+        t_next = (1 + np.sqrt(1 + 4 * t * t)) / 2
+        y = x_next + (t - 1) / t_next * (x_next - x)
+        x, t, loss = x_next, t_next, loss_next
+        if np.linalg.norm(x - np.maximum(x - gradient_next, 0)) <= threshold:
+            break
+    return x / diagonal, loss + constant, iteration
+
+
+def default_scale(gram, moments, defaults):
+    """Least-squares rate scale for the default weights (their only free parameter)"""
+    w = weight_vector(None, defaults)
+    curvature = float(w @ gram @ w)
+    return w * (max(float(moments @ w), 0) / curvature if curvature > 0 else 0.0)
+
+
+def fit_weights(features, rates, sample_weight, defaults, start=None, max_iter=MAX_ITER, tol=TOLERANCE):
+    """
+    Fit non-negative stage weights so the weighted score tracks the adoption rates
+
+    Solves min_v sum_i s_i (r_i - F_i v)^2 with v >= 0; v is the weight
+    vector times a free rate scale, so normalizing v gives weights on the
+    defaults' total (the sum-to-one constraint of READINESS_WEIGHTS) and
+    the norm gives the scale. Warm-starts from start, else from the
+    best-scaled default weights.
+
+    Returns a dict: weights ({factor: weight}, usable as the stage's
+    *_weights scenario parameter), scale, loss, iterations and the raw
+    vector.
+    """
+    gram, moments, constant = normal_equations(features, rates, sample_weight)
+    start = default_scale(gram, moments, defaults) if start is None else start
+    v, loss, iterations = projected_gradient(gram, moments, constant, start, max_iter, tol)
+
+    total = sum(defaults.values())
+    if v.sum() <= 0:
+        weights, scale = weight_vector(None, defaults), 0.0
+    else:
+        weights, scale = v * (total / v.sum()), v.sum() / total
+    return {
+        'weights': {factor: float(weight) for factor, weight in zip(defaults, weights)},
+        'scale': float(scale),
+        'loss': loss,
+        'iterations': iterations,
+        'vector': v
+    }
+
+
+def weighted_rmse(features, rates, sample_weight, v):
+    """Sample-weighted root mean squared rate error of the scores F v"""
+    residual = rates - features @ v
+    return float(np.sqrt(np.sum(sample_weight * residual ** 2) / np.sum(sample_weight)))
+
+
+def cross_validate(features, rates, sample_weight, defaults, folds=FOLDS, seed=0, start=None):
+    """
+    K-fold cross-validation across cities: fitted vs default weights
+
+    Cities are shuffled with the seed and split into folds; each fold is
+    held out in turn, weights are fitted on the rest (warm-started from
+    start, typically the all-city fit) and both the fitted and the
+    best-scaled default weights are scored on the held-out cities.
+    """
+    order = np.random.default_rng(seed).permutation(len(rates))
+    rows = []
+    for fold, held_out in enumerate(np.array_split(order, min(folds, len(rates)))):
+        train = np.setdiff1d(order, held_out)
+        fit = fit_weights(features[train], rates[train], sample_weight[train], defaults, start)
+        gram, moments, _ = normal_equations(features[train], rates[train], sample_weight[train])
+        rows.append({
+            'Fold': fold + 1,
+            'Held_Out_Cities': len(held_out),
+            'Fitted_RMSE': weighted_rmse(features[held_out], rates[held_out], sample_weight[held_out],
+                                         fit['vector']),
+            'Default_RMSE': weighted_rmse(features[held_out], rates[held_out], sample_weight[held_out],
+                                          default_scale(gram, moments, defaults)),
+            'Iterations': fit['iterations']
+        })
+    return pd.DataFrame(rows)
+
+
+def calibrate(cities_df, observed, stage='readiness', folds=FOLDS, seed=0):
+    """
+    Fit a stage's weights to observed per-city EV counts
+
+    The target is the adoption rate (observed EVs per resident) and cities
+    are weighted by population, so the loss is the squared error in vehicle
+    counts scaled by city size. The readiness cap at 1.0 is left out of the
+    fit; it only binds for cities that saturate every factor.
+
+    Returns (fit, cross-validation table); fit['weights'] plugs straight
+    into calculate_authentic_linear_regression_forecasts(readiness_weights=...)
+    or the matching *_weights scenario parameter.
+    """
+    if stage not in STAGE_WEIGHTS:
+        raise ValueError(f"Unknown stage {stage!r}; expected one of {tuple(STAGE_WEIGHTS)}")
+    features = build_feature_matrices(cities_df)
+    population = features['population']
+    rates = np.asarray(observed, dtype=float) / population
+
+    fit = fit_weights(features[stage], rates, population, STAGE_WEIGHTS[stage])
+    cv = cross_validate(features[stage], rates, population, STAGE_WEIGHTS[stage], folds, seed, start=fit['vector'])
+    return fit, cv
+
+
+def simulate_observations(cities_df, weights, rng, scale=0.002, noise=0.2, stage='readiness'):
+    """Poisson EV counts from known weights with lognormal city effects (for checking recovery)"""
+    features = build_feature_matrices(cities_df)
+    rates = scale * features[stage] @ weight_vector(weights, STAGE_WEIGHTS[stage])
+    rates *= rng.lognormal(0, noise, len(rates))
+    return rng.poisson(features['population'] * rates).astype(float)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fit stage weights to observed EV counts with cross-validation")
+    parser.add_argument('observations', nargs='?', help="CSV with City and Observed_EVs for the built-in cities")
+    parser.add_argument('--simulate', type=int, metavar='ROWS',
+                        help="Instead, fit synthetic tracts with counts drawn from known weights")
+    parser.add_argument('--stage', choices=list(STAGE_WEIGHTS), default='readiness')
+    parser.add_argument('--folds', type=int, default=FOLDS)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', help="Write the fitted weights as JSON ({stage}_weights: {...})")
+    args = parser.parse_args()
+    if not args.observations and not args.simulate:
+        parser.error("give an observations CSV or --simulate ROWS")
+
+    import app
+    cities_df = app.load_authentic_massachusetts_cities_complete()
+    defaults = STAGE_WEIGHTS[args.stage]
+    if args.simulate:
+        from synthetic import CityModel, generate_chunks
+        cities_df = pd.concat(generate_chunks(CityModel(cities_df), args.simulate, args.seed), ignore_index=True)
+        rng = np.random.default_rng(args.seed)
+        truth = dict(zip(defaults, rng.dirichlet(np.ones(len(defaults))) * sum(defaults.values())))
+        observed = simulate_observations(cities_df, truth, rng, stage=args.stage)
+    else:
+        truth = None
+        observed = load_observations(args.observations, cities_df)
+
+    start = time.perf_counter()
+    fit, cv = calibrate(cities_df, observed, args.stage, args.folds, args.seed)
+    elapsed = time.perf_counter() - start
+
+    print(f"{len(cities_df):,} cities, {args.folds}-fold CV, {elapsed:.2f}s, {fit['iterations']} iterations")
+    table = pd.DataFrame({'Factor': list(defaults), 'Default': list(defaults.values()),
+                          'Fitted': list(fit['weights'].values())})
+    if truth is not None:
+        table['Simulated'] = list(truth.values())
+    print(table.round(3).to_string(index=False))
+    print(cv.to_string(index=False, float_format=lambda value: f'{value:.3g}'))
+
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump({f'{args.stage}_weights': fit['weights']}, f, indent=2)
+        print(f"wrote {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,6 @@
+import logging
+
+# The dashboard modules import at the repository root (pytest puts this
+# directory on sys.path) and their stage functions run outside a Streamlit
+# session, which logs a warning per cached function
+logging.getLogger('streamlit').setLevel(logging.ERROR)
@@ -0,0 +1,160 @@
+import hashlib
+import json
+import threading
+from collections import Counter, OrderedDict, namedtuple
+from concurrent.futures import Future, ThreadPoolExecutor
+
+# One pipeline stage: a function of its upstream results (positional, in
+# inputs order) and of its scenario parameters (keyword, by name)
+Node = namedtuple('Node', ['name', 'func', 'inputs', 'params'], defaults=((), ()))
+
+STAGE_THREAD_PREFIX = 'dag-stage'
+
+
+def version_key(*parts):
+    """Short stable hash of JSON-serializable parts"""
+    payload = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+
+class DagExecutor:
+    """
+    Memoized executor for a pipeline of stages with declared dependencies
+
+    Parameters:
+    - nodes: Node list; inputs name upstream nodes, params name scenario keys
+    - max_entries: results kept per node (least recently used dropped first)
+    - workers: threads for stages that can run side by side
+
+    A node's version is a hash of its name, its upstream versions and the
+    values of its own params, computed from the params dict alone before
+    anything runs. Results are memoized by version, so changing one
+    parameter changes the versions of its node and everything downstream
+    only; every other node is served from the memo without hashing any
+    DataFrame. Stages ready at the same time (e.g. priority, risk and
+    infrastructure after the forecast) run concurrently; a wave with a single
+    stage to compute runs on the calling thread. Two callers asking for the
+    same version at once share one computation.
+    """
+
+    def __init__(self, nodes, max_entries=32, workers=4):
+        self.nodes = {node.name: node for node in nodes}
+        self.order = self._topological_order()
+        self.max_entries = max_entries
+
+        self._lock = threading.Lock()
+        self._memo = {name: OrderedDict() for name in self.nodes}
+        self._pending = {}
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=STAGE_THREAD_PREFIX)
+        self.counts = Counter()
+
+    def _topological_order(self):
+        order, state = [], {}
+
+        def visit(name, path):
+            if name not in self.nodes:
+                raise ValueError(f"Unknown stage {name!r} (input of {path[-1]!r})")
+            if state.get(name) == 'done':
+                return
+            if state.get(name) == 'visiting':
+                raise ValueError(f"Stage cycle: {' -> '.join(path + [name])}")
+            state[name] = 'visiting'
+            for upstream in self.nodes[name].inputs:
+                visit(upstream, path + [name])
+            state[name] = 'done'
+            order.append(name)
+
+        for name in self.nodes:
+            visit(name, [name])
+        return order
+
+    def versions(self, params):
+        """Version of every node for a params dict (no stage runs)"""
+        versions = {}
+        for name in self.order:
+            node = self.nodes[name]
+            versions[name] = version_key(
+                name, [versions[upstream] for upstream in node.inputs], {key: params[key] for key in node.params}
+            )
+        return versions
+
+    def stale(self, params):
+        """Nodes a run with these params would compute (not memoized yet)"""
+        versions = self.versions(params)
+        with self._lock:
+            return [name for name in self.order if versions[name] not in self._memo[name]]
+
+    def run(self, params, targets=None):
+        """
+        Results of the target nodes (default: every node) for a params dict
+
+        Only the targets and their upstream nodes are considered; each is
+        taken from the memo or computed once its inputs are ready.
+        """
+        versions = self.versions(params)
+        needed = self._upstream(targets or self.order)
+        results = {}
+        while len(results) < len(needed):
+            wave = [name for name in self.order if name in needed and name not in results
+                    and all(upstream in results for upstream in self.nodes[name].inputs)]
+            futures = {}
+            misses = [name for name in wave if not self._memoized(name, versions[name])]
+            for name in wave:
+                node = self.nodes[name]
+                args = [results[upstream] for upstream in node.inputs]
+                kwargs = {key: params[key] for key in node.params}
+                futures[name] = self._result(name, versions[name], args, kwargs, concurrent=len(misses) > 1)
+            for name, future in futures.items():
+                results[name] = future.result()
+        return {name: results[name] for name in (targets or self.order)}
+
+    def _upstream(self, targets):
+        needed, stack = set(), list(targets)
+        while stack:
+            name = stack.pop()
+            if name not in needed:
+                needed.add(name)
+                stack.extend(self.nodes[name].inputs)
+        return needed
+
+    def _memoized(self, name, version):
+        with self._lock:
+            return version in self._memo[name]
+
+    def _result(self, name, version, args, kwargs, concurrent):
+        """Future for one node version: memoized, already in flight, or started now"""
+        with self._lock:
+            memo = self._memo[name]
+            if version in memo:
+                memo.move_to_end(version)
+                self.counts[(name, 'reused')] += 1
+                future = Future()
+                future.set_result(memo[version])
+                return future
+            if (name, version) in self._pending:
+                return self._pending[(name, version)]
+            future = self._pending[(name, version)] = Future()
+
+        if concurrent:
+            self._pool.submit(self._compute, name, version, args, kwargs, future)
+        else:
+            self._compute(name, version, args, kwargs, future)
+        return future
+
+    def _compute(self, name, version, args, kwargs, future):
+        try:
+            value = self.nodes[name].func(*args, **kwargs)
+        except BaseException as error:
+            with self._lock:
+                self._pending.pop((name, version), None)
+            future.set_exception(error)
+            return
+
+        with self._lock:
+            memo = self._memo[name]
+            memo[version] = value
+            while len(memo) > self.max_entries:
+                memo.popitem(last=False)
+            self._pending.pop((name, version), None)
+            self.counts[(name, 'computed')] += 1
+        future.set_result(value)
@@ -0,0 +1,158 @@
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from acs_ingest import ACS_ESTIMATES, load_acs_values
+
+# Bump when the city table gains, drops or redefines a column; versions
+# registered under an older schema are then never reused
+SCHEMA_VERSION = 1
+
+CITY_COLUMNS = [
+    'City', 'Population_2024', 'Median_Income', 'Bachelor_Degree_Pct', 'Drive_Alone_Pct',
+    'Single_Family_Pct', 'Median_Home_Value', 'Public_Transit_Pct', 'Urban_Classification',
+    'Distance_from_Boston'
+]
+
+# Provenance of the built-in city table (see load_authentic_massachusetts_cities_complete)
+BUILTIN_SOURCES = [
+    {'fields': ['Population_2024'], 'source': 'US Census Bureau Vintage 2024 Population Estimates',
+     'url': 'https://www.census.gov/programs-surveys/popest.html'},
+    {'fields': ['Median_Income'], 'source': 'ACS 2019-2023 5-Year Estimates, Table S1901',
+     'url': 'https://data.census.gov/table/ACSST5Y2023.S1901'},
+    {'fields': ['Bachelor_Degree_Pct'], 'source': 'ACS 2019-2023 5-Year Estimates, Table S1501',
+     'url': 'https://data.census.gov/table/ACSST5Y2023.S1501'},
+    {'fields': ['Drive_Alone_Pct', 'Public_Transit_Pct'], 'source': 'ACS 2019-2023 5-Year Estimates, Table S0801',
+     'url': 'https://data.census.gov/table/ACSST5Y2023.S0801'},
+    {'fields': ['Single_Family_Pct', 'Median_Home_Value'], 'source': 'ACS 2019-2023 5-Year Estimates, Table DP04',
+     'url': 'https://data.census.gov/table/ACSDP5Y2023.DP04'},
+    {'fields': ['Urban_Classification'], 'source': 'Census urban area definitions',
+     'url': 'https://www.census.gov/programs-surveys/geography/guidance/geo-areas/urban-rural.html'},
+    {'fields': ['Distance_from_Boston'], 'source': 'Google Maps driving distance', 'url': None}
+]
+
+
+def validate_schema(df, columns=CITY_COLUMNS):
+    """Raise ValueError if the city table is missing any schema column"""
+    missing = [column for column in columns if column not in df.columns]
+    if missing:
+        raise ValueError(f"City dataset is missing columns: {', '.join(missing)}")
+
+
+def content_hash(df):
+    """SHA-256 over column names, dtypes and every value (row order included)"""
+    digest = hashlib.sha256()
+    digest.update(json.dumps([[str(column), str(dtype)] for column, dtype in df.dtypes.items()]).encode())
+    digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def dataset_record(name, df, sources, vintage=None, schema_version=SCHEMA_VERSION):
+    """
+    Registry entry for one loaded dataset
+
+    The version ID combines the dataset name, schema version and a prefix of
+    the content hash, so identical data always maps to the same ID and any
+    edit to the data produces a new one.
+    """
+    digest = content_hash(df)
+    return {
+        'version_id': f'{name}-s{schema_version}-{digest[:12]}',
+        'name': name,
+        'vintage': vintage,
+        'content_hash': digest,
+        'schema_version': schema_version,
+        'rows': int(len(df)),
+        'columns': [str(column) for column in df.columns],
+        'sources': sources,
+        'loaded_at': datetime.now(timezone.utc).isoformat(timespec='seconds')
+    }
+
+
+class DatasetRegistry:
+    """
+    Versions of the city dataset seen by this installation, persisted as JSON
+
+    register() records each load; a version that is already known keeps its
+    first registration time and gets its last load time updated. Writes go
+    through a temp file and os.replace, and a lock serializes sessions in
+    the same process.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._records = {}
+        if os.path.exists(path):
+            with open(path) as handle:
+                self._records = {record['version_id']: record for record in json.load(handle)}
+
+    def register(self, name, df, sources, vintage=None):
+        """Record a loaded dataset and return its registry entry"""
+        validate_schema(df)
+        record = dataset_record(name, df, sources, vintage)
+        with self._lock:
+            known = self._records.get(record['version_id'])
+            if known is not None:
+                record['registered_at'] = known.get('registered_at', known['loaded_at'])
+            else:
+                record['registered_at'] = record['loaded_at']
+            self._records[record['version_id']] = record
+            self._save()
+        return record
+
+    def get(self, version_id):
+        return self._records.get(version_id)
+
+    def versions(self, name=None):
+        """Registered versions, most recently loaded first"""
+        records = [record for record in self._records.values() if name is None or record['name'] == name]
+        return sorted(records, key=lambda record: record['loaded_at'], reverse=True)
+
+    def _save(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp_path = f'{self.path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(tmp_path, 'w') as handle:
+            json.dump(list(self._records.values()), handle, indent=2)
+        os.replace(tmp_path, self.path)
+
+
+def acs_vintages(acs_dir):
+    """ACS vintages available in an acs_ingest output directory"""
+    if not os.path.isdir(acs_dir):
+        return []
+    vintages = load_acs_values(acs_dir, columns=['Vintage'])['Vintage'].dropna()
+    return sorted(int(vintage) for vintage in vintages.unique())
+
+
+def acs_city_dataset(base_df, acs_dir, vintage):
+    """
+    City table with the ACS fields replaced by one ingested vintage
+
+    Population, urban classification and distance come from base_df. Cities
+    or fields missing from the ingested extracts keep their base_df values
+    and are listed in the returned sources, next to the source files each
+    field was read from.
+    """
+    values = load_acs_values(acs_dir, vintage, columns=['City', 'Field', 'Estimate', 'Table', 'Source_File'])
+    values = values[values['City'].isin(base_df['City']) & values['Field'].isin(ACS_ESTIMATES)]
+
+    cities_df = base_df.copy()
+    sources = []
+    for field, (table, _) in ACS_ESTIMATES.items():
+        field_values = values[values['Field'] == field].drop_duplicates('City', keep='last')
+        estimates = cities_df['City'].map(field_values.set_index('City')['Estimate'])
+        filled = estimates.notna().to_numpy()
+        cities_df[field] = np.where(filled, estimates, cities_df[field]).astype(cities_df[field].dtype)
+        sources.append({
+            'fields': [field],
+            'source': f'ACS {vintage} Table {table} (ingested)',
+            'files': sorted(field_values['Source_File'].unique().tolist()),
+            'fallback_cities': cities_df.loc[~filled, 'City'].tolist()
+        })
+    return cities_df, sources
@@ -0,0 +1,235 @@
+import argparse
+import json
+import os
+import shutil
+import zipfile
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Excel export uses XlsxWriter in constant-memory mode (rows flushed as written)
+try:
+    import xlsxwriter
+except ImportError:
+    xlsxwriter = None
+
+# Rows per Parquet row group / Excel or GeoJSON write batch
+CHUNK_ROWS = 50000
+
+# Excel limits a sheet to 1,048,576 rows (one is the header)
+EXCEL_MAX_ROWS = 1048575
+
+EXPORT_FORMATS = {
+    'parquet': ('bev_results_parquet.zip', 'application/zip'),
+    'excel': ('bev_results.xlsx', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+    'geojson': ('bev_cities.geojson', 'application/geo+json')
+}
+
+# Columns carried into the per-city GeoJSON properties, by source table
+GEOJSON_COLUMNS = {
+    'forecast': ['City', 'Population_2024', 'Current_EVs_Estimate', 'Target_Share_2025', 'EV_Forecast_2025',
+                 'EV_Forecast_2027', 'EV_Forecast_2029', 'Growth_Rate', 'Adoption_Readiness'],
+    'priority': ['City', 'Priority_Score', 'Priority_Rank'],
+    'risk': ['City', 'Overall_Risk_Score', 'Risk_Category'],
+    'infrastructure': ['City', 'Charging_Infrastructure_Score', 'Grid_Capacity_Score', 'Infrastructure_Readiness',
+                       'Infrastructure_Category'],
+    'investment': ['City', 'Investment_Priority', 'Investment_Category']
+}
+
+
+def _row_chunks(df, chunk_rows=CHUNK_ROWS):
+    for start in range(0, len(df), chunk_rows):
+        yield df.iloc[start:start + chunk_rows]
+
+
+def _json_ready(chunk):
+    """Chunk as records with NaN -> None and NumPy scalars -> Python values"""
+    return chunk.astype(object).where(chunk.notna(), None).to_dict('records')
+
+
+def write_parquet_table(df, sink, chunk_rows=CHUNK_ROWS):
+    """
+    Write one DataFrame to a Parquet sink (path or binary file object)
+
+    Each chunk of chunk_rows becomes its own row group, so only one chunk is
+    converted to Arrow at a time. The schema comes from the first chunk.
+    """
+    schema = pa.Schema.from_pandas(df.iloc[:chunk_rows], preserve_index=False)
+    with pq.ParquetWriter(sink, schema) as writer:
+        for chunk in _row_chunks(df, chunk_rows):
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+
+
+def write_parquet_zip(tables, path, chunk_rows=CHUNK_ROWS):
+    """One Parquet file per table, streamed row group by row group into a ZIP"""
+    with zipfile.ZipFile(path, 'w', compression=zipfile.ZIP_STORED) as archive:
+        for name, df in tables.items():
+            with archive.open(f'{name}.parquet', 'w') as member:
+                write_parquet_table(df, pa.PythonFile(member, mode='w'), chunk_rows)
+    return path
+
+
+def write_excel(tables, path, chunk_rows=CHUNK_ROWS):
+    """
+    Multi-sheet workbook, one sheet per table
+
+    XlsxWriter's constant_memory mode flushes every row to disk once the
+    next row starts, so rows are written strictly in order, chunk by chunk.
+    Tables longer than the Excel row limit continue on numbered sheets.
+    """
+    if xlsxwriter is None:
+        raise ImportError("Excel export requires XlsxWriter (pip install XlsxWriter)")
+
+    workbook = xlsxwriter.Workbook(path, {'constant_memory': True, 'nan_inf_to_errors': True})
+    header_format = workbook.add_format({'bold': True})
+
+    for name, df in tables.items():
+        columns = [str(column) for column in df.columns]
+        sheet_parts = range(0, max(len(df), 1), EXCEL_MAX_ROWS)
+        for part, sheet_start in enumerate(sheet_parts, start=1):
+            sheet_name = name[:31] if len(sheet_parts) == 1 else f'{name[:27]}_{part}'
+            worksheet = workbook.add_worksheet(sheet_name)
+            worksheet.write_row(0, 0, columns, header_format)
+
+            row = 1
+            sheet_df = df.iloc[sheet_start:sheet_start + EXCEL_MAX_ROWS]
+            for chunk in _row_chunks(sheet_df, chunk_rows):
+                for values in chunk.astype(object).where(chunk.notna(), None).itertuples(index=False, name=None):
+                    worksheet.write_row(row, 0, values)
+                    row += 1
+
+    workbook.close()
+    return path
+
+
+def city_summary(tables):
+    """One row per city with the headline columns from every stage"""
+    summary = None
+    for name, columns in GEOJSON_COLUMNS.items():
+        if name not in tables:
+            continue
+        part = tables[name][[column for column in columns if column in tables[name].columns]]
+        summary = part if summary is None else summary.merge(part, on='City', how='left')
+    return summary
+
+
+def write_geojson(summary_df, centroids, path, chunk_rows=CHUNK_ROWS):
+    """
+    Point FeatureCollection at each city centroid, written feature by feature
+
+    centroids needs City, Latitude and Longitude; cities without a centroid
+    get a null geometry so no rows are dropped.
+    """
+    located = summary_df.merge(centroids[['City', 'Latitude', 'Longitude']], on='City', how='left')
+
+    with open(path, 'w', encoding='utf-8') as handle:
+        handle.write('{"type": "FeatureCollection", "features": [\n')
+        first = True
+        for chunk in _row_chunks(located, chunk_rows):
+            for record in _json_ready(chunk):
+                lat, lon = record.pop('Latitude'), record.pop('Longitude')
+                geometry = None if lat is None or lon is None else {
+                    'type': 'Point', 'coordinates': [round(lon, 6), round(lat, 6)]
+                }
+                feature = {'type': 'Feature', 'geometry': geometry, 'properties': record}
+                handle.write(('' if first else ',\n') + json.dumps(feature, default=_json_default))
+                first = False
+        handle.write('\n]}\n')
+    return path
+
+
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def export_results(tables, out_dir, centroids=None, formats=('parquet', 'excel', 'geojson'), chunk_rows=CHUNK_ROWS):
+    """
+    Write the pipeline tables in each requested format
+
+    Returns {format: path}. GeoJSON is skipped when no centroids are given;
+    Excel is skipped when XlsxWriter is not installed.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    paths = {}
+    for export_format in formats:
+        file_name = EXPORT_FORMATS[export_format][0]
+        path = os.path.join(out_dir, file_name)
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+
+        if export_format == 'parquet':
+            write_parquet_zip(tables, tmp_path, chunk_rows)
+        elif export_format == 'excel':
+            if xlsxwriter is None:
+                continue
+            write_excel(tables, tmp_path, chunk_rows)
+        elif export_format == 'geojson':
+            if centroids is None:
+                continue
+            write_geojson(city_summary(tables), centroids, tmp_path, chunk_rows)
+
+        os.replace(tmp_path, path)
+        paths[export_format] = path
+    return paths
+
+
+def prune_export_dirs(root, keep):
+    """
+    Delete all but the keep most recently used per-scenario folders under
+    root; returns the deleted paths
+
+    Folders are ranked by modification time (export_file touches its folder
+    on every use).
+    """
+    if not os.path.isdir(root):
+        return []
+    folders = [os.path.join(root, name) for name in os.listdir(root) if os.path.isdir(os.path.join(root, name))]
+    folders.sort(key=os.path.getmtime, reverse=True)
+    for folder in folders[keep:]:
+        shutil.rmtree(folder, ignore_errors=True)
+    return folders[keep:]
+
+
+def export_file(tables, out_dir, export_format, centroids=None, chunk_rows=CHUNK_ROWS):
+    """
+    Path of one export in out_dir, written first if it is not there yet
+
+    tables and centroids are callables returning the pipeline tables and
+    the city centroids (or None), so nothing is computed when the file
+    exists. Marks out_dir as used for prune_export_dirs. Returns None when
+    the format is unavailable (see export_results).
+    """
+    path = os.path.join(out_dir, EXPORT_FORMATS[export_format][0])
+    if not os.path.exists(path):
+        path = export_results(tables(), out_dir, centroids() if centroids else None, (export_format,),
+                              chunk_rows).get(export_format)
+    if os.path.isdir(out_dir):
+        os.utime(out_dir)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the BEV pipeline outputs (research-default scenario)")
+    parser.add_argument('out_dir', help="Directory for the export files")
+    parser.add_argument('--format', dest='formats', nargs='+', choices=list(EXPORT_FORMATS),
+                        default=list(EXPORT_FORMATS), help="Formats to write (default: all)")
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS, help="Rows per row group / write batch")
+    args = parser.parse_args()
+
+    # Same stages and defaults as the dashboard, run outside Streamlit
+    import app
+    tables = app.pipeline_export_tables(app.default_scenario_params())
+    centroids = app.load_city_centroids()
+
+    paths = export_results(tables, args.out_dir, centroids, args.formats, args.chunk_rows)
+    for export_format, path in paths.items():
+        print(f"{export_format}: {path} ({os.path.getsize(path):,} bytes)")
+    for export_format in set(args.formats) - set(paths):
+        print(f"{export_format}: skipped (missing dependency or input)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+import argparse
+import base64
+import hashlib
+import time
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+import plotly.io
+import plotly.tools
+
+# Trace attributes plotly.js (2.28+) decodes from typed-array specs
+# ({dtype, bdata, shape}); text and category labels stay JSON lists
+TYPED_ATTRIBUTES = ('x', 'y', 'z', 'customdata')
+
+# Shorter arrays stay plain lists (the spec wrapper would outweigh the saving)
+MIN_TYPED_LENGTH = 8
+
+INT32 = np.iinfo(np.int32)
+
+# Fractional values go as float32: 7 significant digits, more than any
+# hover or text format of the dashboard shows (templates format their
+# numbers; an unformatted %{customdata} would print the float32 digits)
+FLOAT_DTYPE = np.float32
+
+
+class SortedColumns:
+    """
+    Columns of one frame in one sort order, as NumPy arrays
+
+    The order is one argsort; every column a chart asks for is a single take
+    along it, computed once and shared by all traces of the chart instead of
+    re-sorting or re-aligning a Series per trace.
+    """
+
+    def __init__(self, df, by, ascending=True):
+        values = df[by].to_numpy()
+        self.order = np.argsort(values if ascending else -values, kind='stable')
+        self.df = df
+        self._columns = {}
+
+    def __len__(self):
+        return len(self.order)
+
+    def __getitem__(self, column):
+        if column not in self._columns:
+            self._columns[column] = self.df[column].to_numpy()[self.order]
+        return self._columns[column]
+
+    def take(self, values):
+        """Any per-row array of the frame (in frame order) in the sorted order"""
+        return np.asarray(values)[self.order]
+
+
+def category_axis(categories):
+    """
+    Layout of a category axis whose labels are sent once
+
+    The labels seed the axis categories in order (categoryorder 'array'),
+    so category i sits at position i whether or not any trace names it.
+    """
+    return dict(type='category', categoryorder='array', categoryarray=list(categories))
+
+
+def category_positions(categories, axis='y'):
+    """
+    Trace keys placing points 0..n-1 on the categories of category_axis
+
+    A trace without y (or x) gets positions y0 + i * dy; y0 is the first
+    label (category 0), so the trace carries no labels of its own and hover
+    text still shows the category name.
+    """
+    return {f'{axis}0': categories[0] if len(categories) else None, f'd{axis}': 1}
+
+
+def typed_array(values):
+    """
+    Typed-array spec of a numeric array, or None to leave it as a JSON list
+
+    Whole numbers within the int32 range go as exact int32 (plotly.js has
+    no int64 dtype), anything else as FLOAT_DTYPE. 2-D arrays (several
+    customdata columns) carry their shape.
+    """
+    if not isinstance(values, np.ndarray) or values.dtype.kind not in 'iuf' or \
+            values.size < MIN_TYPED_LENGTH or values.ndim > 2:
+        return None
+    whole = values if values.dtype.kind in 'iu' else None
+    if whole is None and np.isfinite(values).all() and (values == np.round(values)).all():
+        whole = values
+    if whole is not None and INT32.min <= whole.min() and whole.max() <= INT32.max:
+        values = np.ascontiguousarray(whole, dtype=np.int32)
+    else:
+        values = np.ascontiguousarray(values, dtype=FLOAT_DTYPE)
+    spec = {'dtype': values.dtype.str.lstrip('<|'), 'bdata': base64.b64encode(values.tobytes()).decode('ascii')}
+    if values.ndim == 2:
+        spec['shape'] = f'{values.shape[0]},{values.shape[1]}'
+    return spec
+
+
+def typed_figure(fig):
+    """
+    Copy of a figure with its numeric trace arrays as typed-array payloads
+
+    Built from fig.to_dict(), where trace data are still NumPy arrays, and
+    wrapped in an unvalidated Figure: plotly.py 5 does not know the
+    typed-array spec, but st.plotly_chart serializes a Figure without
+    re-validating it and plotly.js decodes the spec.
+    """
+    spec = fig.to_dict()
+    for trace in spec['data']:
+        for attribute in TYPED_ATTRIBUTES:
+            encoded = typed_array(trace.get(attribute))
+            if encoded is not None:
+                trace[attribute] = encoded
+    return go.Figure(spec, _validate=False)
+
+
+def update_fingerprint(value):
+    """
+    Comparable digest of figure update values
+
+    Dicts, lists and tuples are walked; arrays, Series and Indexes are
+    reduced to dtype, shape and a hash of their contents (pd.util.hash_array),
+    so comparing two reruns' updates costs one pass over the data instead of
+    keeping a copy of it. Anything else is kept as is.
+    """
+    if isinstance(value, dict):
+        return tuple((key, update_fingerprint(item)) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return tuple(update_fingerprint(item) for item in value)
+    if isinstance(value, (np.ndarray, pd.Series, pd.Index)):
+        values = np.asarray(value)
+        digest = hashlib.blake2b(pd.util.hash_array(values.ravel()).tobytes(), digest_size=16).hexdigest()
+        return values.dtype.str, values.shape, digest
+    return value
+
+
+def serialized_payload(fig, typed=False):
+    """
+    Figure JSON as st.plotly_chart produces it, and the seconds it took
+
+    Timed over the whole path: the typed-array conversion (when typed),
+    Streamlit's figure-to-dict step and the JSON encoding.
+    """
+    start = time.perf_counter()
+    figure = plotly.tools.return_figure_from_figure_or_data(typed_figure(fig) if typed else fig,
+                                                            validate_figure=True)
+    payload = plotly.io.to_json(figure, validate=False)
+    return payload, time.perf_counter() - start
+
+
+def payload_report(figures, repeats=3):
+    """
+    Payload size (KB) and best-of-repeats serialization time (ms) per figure
+
+    figures maps a name to (before, after): the chart built with labels and
+    values as per-trace JSON lists, and built with shared category
+    positions, rendered as typed arrays.
+    """
+    rows = []
+    for name, (before, after) in figures.items():
+        row = {'Figure': name}
+        for label, fig, typed in (('Before', before, False), ('After', after, True)):
+            timings = []
+            for _ in range(repeats):
+                payload, seconds = serialized_payload(fig, typed)
+                timings.append(seconds)
+            row[f'{label}_KB'] = len(payload) / 1024
+            row[f'{label}_ms'] = min(timings) * 1000
+        rows.append(row)
+    report = pd.DataFrame(rows)
+    report['Size_Reduction'] = report['Before_KB'] / report['After_KB']
+    report['Time_Reduction'] = report['Before_ms'] / report['After_ms']
+    return report
+
+
+def benchmark_figures(cities_df):
+    """
+    The dashboard's priority stacked-bar and forecast-line charts for one city table
+
+    Returns {name: (before, after)} for payload_report: before repeats the
+    city names and Python-formatted text in every trace, after sends the
+    names once and the numbers as arrays.
+    """
+    from scoring import PRIORITY_WEIGHTS, build_feature_matrices, priority_scores
+
+    features = build_feature_matrices(cities_df)
+    scored = cities_df.assign(Priority_Score=priority_scores(features))
+    columns = SortedColumns(scored, 'Priority_Score')
+    cities = columns['City']
+    income = columns['Median_Income']
+
+    priority_before, priority_after = go.Figure(), go.Figure()
+    for j, factor in enumerate(PRIORITY_WEIGHTS):
+        factor_scores = columns.take(features['priority'][:, j])
+        priority_before.add_trace(go.Bar(
+            y=cities.tolist(), x=(factor_scores * PRIORITY_WEIGHTS[factor]).tolist(), orientation='h',
+            customdata=factor_scores.tolist(), text=income.tolist(),
+            hovertemplate='<b>%{y}</b><br>Score: %{customdata:.3f}<br>Income: $%{text:,}<extra></extra>'
+        ))
+        priority_after.add_trace(go.Bar(
+            x=factor_scores * PRIORITY_WEIGHTS[factor], orientation='h', **category_positions(cities),
+            customdata=np.column_stack([factor_scores, income]), texttemplate='%{customdata[1]:,}',
+            hovertemplate='<b>%{y}</b><br>Score: %{customdata[0]:.3f}<br>Income: $%{customdata[1]:,}<extra></extra>'
+        ))
+    priority_before.update_layout(barmode='stack', yaxis_categoryarray=cities.tolist())
+    priority_after.update_layout(barmode='stack', yaxis=category_axis(cities))
+
+    forecast_before, forecast_after = go.Figure(), go.Figure()
+    population = columns['Population_2024']
+    for years in (1, 3, 5):
+        forecast = np.round(population * 0.01 * 1.3 ** years)
+        hover = '<b>%{x}</b><br>EVs: %{y:,}<br>Population: %{customdata:,}'
+        forecast_before.add_trace(go.Scatter(x=cities.tolist(), y=forecast.tolist(), mode='lines+markers',
+                                             customdata=population.tolist(), hovertemplate=hover))
+        forecast_after.add_trace(go.Scatter(y=forecast, mode='lines+markers', **category_positions(cities, 'x'),
+                                            customdata=population, hovertemplate=hover))
+    forecast_before.update_layout(xaxis_tickvals=list(range(len(cities))), xaxis_ticktext=cities.tolist())
+    forecast_after.update_layout(xaxis=category_axis(cities))
+    return {'priority': (priority_before, priority_after), 'forecast': (forecast_before, forecast_after)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Figure payload size and serialization time, before and after")
+    parser.add_argument('--cities', type=int, nargs='+', default=[20, 351, 2000, 20000])
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    import app
+    from synthetic import CityModel, generate_chunks
+    model = CityModel(app.load_authentic_massachusetts_cities_complete())
+    for n in args.cities:
+        cities_df = pd.concat(generate_chunks(model, n, args.seed), ignore_index=True)
+        report = payload_report(benchmark_figures(cities_df))
+        print(f"{n:,} cities")
+        print(report.round(2).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,275 @@
+import hashlib
+import os
+import pickle
+
+import numpy as np
+import pandas as pd
+
+# BallTree with the haversine metric (scikit-learn is in requirements.txt); a
+# bare environment without it falls back to exact batched search on unit
+# vectors (same results, O(n * m) BLAS work)
+try:
+    from sklearn.neighbors import BallTree
+except ImportError:
+    BallTree = None
+
+# Mean Earth radius (miles), matching the mile-based Distance_from_Boston column
+EARTH_RADIUS_MILES = 3958.8
+
+# Facility types read from the facilities file and the distance columns they feed
+# - Charger: public Level II / DC fast charging stations -> Access_Distance_Miles
+# - Substation: distribution/transmission substations -> Substation_Distance_Miles
+FACILITY_DISTANCE_COLUMNS = {
+    'Charger': 'Access_Distance_Miles',
+    'Substation': 'Substation_Distance_Miles'
+}
+
+# Accepted spellings for coordinate columns in local files
+LATITUDE_COLUMNS = ('Latitude', 'latitude', 'lat', 'LAT', 'INTPTLAT')
+LONGITUDE_COLUMNS = ('Longitude', 'longitude', 'lon', 'lng', 'LON', 'INTPTLONG')
+
+# Bump when the cached index/query format changes
+CACHE_VERSION = 1
+
+
+def _find_column(df, candidates):
+    for column in candidates:
+        if column in df.columns:
+            return column
+    raise KeyError(f"None of {candidates} found in columns {list(df.columns)}")
+
+
+def load_points(path, id_column=None):
+    """
+    Load centroids or facility locations from a local CSV or Parquet file
+
+    Coordinates may use any of the common spellings (Latitude/lat/INTPTLAT...);
+    they are returned as float Latitude and Longitude columns. Rows without
+    coordinates are dropped.
+    """
+    if str(path).lower().endswith('.parquet'):
+        df = pd.read_parquet(path)
+    else:
+        df = pd.read_csv(path)
+
+    lat_col = _find_column(df, LATITUDE_COLUMNS)
+    lon_col = _find_column(df, LONGITUDE_COLUMNS)
+    df = df.rename(columns={lat_col: 'Latitude', lon_col: 'Longitude'})
+    df['Latitude'] = pd.to_numeric(df['Latitude'], errors='coerce')
+    df['Longitude'] = pd.to_numeric(df['Longitude'], errors='coerce')
+    df = df.dropna(subset=['Latitude', 'Longitude']).reset_index(drop=True)
+
+    if id_column is not None and id_column not in df.columns:
+        df[id_column] = np.arange(len(df))
+    return df
+
+
+def haversine_miles(lat1, lon1, lat2, lon2):
+    """
+    Great-circle distance in miles; inputs in degrees and broadcast like NumPy
+
+    Passing column vectors for one side and row vectors for the other gives
+    the full (n x m) distance matrix in a single vectorized call.
+    """
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(a, dtype=float)) for a in (lat1, lon1, lat2, lon2))
+    a = (np.sin((lat2 - lat1) / 2) ** 2
+         + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_MILES * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def unit_vectors(latitudes, longitudes):
+    """Points on the unit sphere; the dot product of two is the cosine of their central angle"""
+    lat = np.radians(np.asarray(latitudes, dtype=float))
+    lon = np.radians(np.asarray(longitudes, dtype=float))
+    return np.column_stack([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)])
+
+
+def _points_key(*arrays):
+    """Content hash of coordinate arrays (plus settings) used as the cache key"""
+    digest = hashlib.sha256(str(CACHE_VERSION).encode())
+    for array in arrays:
+        array = np.ascontiguousarray(array)
+        digest.update(str(array.dtype).encode())
+        digest.update(str(array.shape).encode())
+        digest.update(array.tobytes())
+    return digest.hexdigest()[:24]
+
+
+def _atomic_pickle(obj, path):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as handle:
+        pickle.dump(obj, handle, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+
+
+class SpatialIndex:
+    """
+    Nearest-neighbour index over facility coordinates
+
+    Builds a haversine BallTree, which is pickled with the index, so a cached
+    index skips the tree construction. Without scikit-learn the index keeps
+    facility unit vectors and ranks candidates by dot product
+    (a single matrix product per batch, monotone in great-circle distance),
+    then measures the k winners with haversine, so callers get identical
+    distances either way.
+    """
+
+    def __init__(self, latitudes, longitudes):
+        self.latitudes = np.asarray(latitudes, dtype=float)
+        self.longitudes = np.asarray(longitudes, dtype=float)
+        self.key = _points_key(self.latitudes, self.longitudes)
+        self.vectors = unit_vectors(self.latitudes, self.longitudes)
+        self.tree = None
+        if BallTree is not None and len(self.latitudes):
+            self.tree = BallTree(np.radians(np.column_stack([self.latitudes, self.longitudes])), metric='haversine')
+
+    def __len__(self):
+        return len(self.latitudes)
+
+    def query(self, latitudes, longitudes, k=1, batch_size=4096):
+        """
+        k nearest facilities for every query point
+
+        Returns (distances, indices), both (n x k) and sorted nearest first.
+        k is clipped to the number of facilities. The fallback path works
+        through batch_size query points at a time so the temporary similarity
+        block stays at batch_size x facilities.
+        """
+        latitudes = np.asarray(latitudes, dtype=float)
+        longitudes = np.asarray(longitudes, dtype=float)
+        k = min(int(k), len(self))
+        n = len(latitudes)
+
+        if k == 0 or n == 0:
+            return np.full((n, max(k, 0)), np.inf), np.full((n, max(k, 0)), -1, dtype=np.int64)
+
+        if self.tree is not None:
+            distances, indices = self.tree.query(np.radians(np.column_stack([latitudes, longitudes])), k=k)
+            return distances * EARTH_RADIUS_MILES, indices.astype(np.int64)
+
+        query_vectors = unit_vectors(latitudes, longitudes)
+        distances = np.empty((n, k))
+        indices = np.empty((n, k), dtype=np.int64)
+        for start in range(0, n, batch_size):
+            stop = min(start + batch_size, n)
+            # Larger cosine = closer; partial sort for the k closest, then
+            # measure and order just those k
+            similarity = query_vectors[start:stop] @ self.vectors.T
+            if k < similarity.shape[1]:
+                nearest = np.argpartition(-similarity, k - 1, axis=1)[:, :k]
+            else:
+                nearest = np.broadcast_to(np.arange(similarity.shape[1]), similarity.shape).copy()
+            nearest_distances = haversine_miles(
+                latitudes[start:stop, None], longitudes[start:stop, None],
+                self.latitudes[nearest], self.longitudes[nearest]
+            )
+            ordering = np.argsort(nearest_distances, axis=1, kind='stable')
+            indices[start:stop] = np.take_along_axis(nearest, ordering, axis=1)
+            distances[start:stop] = np.take_along_axis(nearest_distances, ordering, axis=1)
+        return distances, indices
+
+
+def load_or_build_index(latitudes, longitudes, cache_dir=None):
+    """
+    Build a SpatialIndex, reusing the pickled copy in cache_dir when the
+    facility coordinates are unchanged
+    """
+    key = _points_key(np.asarray(latitudes, dtype=float), np.asarray(longitudes, dtype=float))
+    if cache_dir is not None:
+        path = os.path.join(cache_dir, f'index-{key}.pkl')
+        if os.path.exists(path):
+            with open(path, 'rb') as handle:
+                return pickle.load(handle)
+
+    index = SpatialIndex(latitudes, longitudes)
+
+    if cache_dir is not None:
+        os.makedirs(cache_dir, exist_ok=True)
+        _atomic_pickle(index, path)
+    return index
+
+
+def nearest_facilities(centroids, facilities, k=3, cache_dir=None, batch_size=4096):
+    """
+    Nearest and k-nearest facility distances for every centroid
+
+    Both frames need Latitude and Longitude (see load_points). Results are
+    cached in cache_dir keyed on the centroid and facility coordinates, so a
+    rerun with unchanged inputs is a single file read.
+
+    Returns (distances, indices) arrays of shape (centroids x k).
+    """
+    lat = centroids['Latitude'].to_numpy(dtype=float)
+    lon = centroids['Longitude'].to_numpy(dtype=float)
+    facility_lat = facilities['Latitude'].to_numpy(dtype=float)
+    facility_lon = facilities['Longitude'].to_numpy(dtype=float)
+
+    query_path = None
+    if cache_dir is not None:
+        key = _points_key(lat, lon, facility_lat, facility_lon, np.asarray([k]))
+        query_path = os.path.join(cache_dir, f'nearest-{key}.npz')
+        if os.path.exists(query_path):
+            with np.load(query_path) as cached:
+                return cached['distances'], cached['indices']
+
+    index = load_or_build_index(facility_lat, facility_lon, cache_dir)
+    distances, indices = index.query(lat, lon, k=k, batch_size=batch_size)
+
+    if query_path is not None:
+        tmp_path = query_path + '.tmp.npz'
+        np.savez(tmp_path, distances=distances, indices=indices)
+        os.replace(tmp_path, query_path)
+    return distances, indices
+
+
+def facility_distance_table(centroids, facilities, k=3, cache_dir=None, name_column='City',
+                            type_column='Facility_Type', id_column='Facility_Id'):
+    """
+    Per-centroid distance summary for each facility type
+
+    For every type in the facilities file (e.g. Charger, Substation) adds:
+    - Nearest_<Type>_Miles and Nearest_<Type>_Id
+    - Mean_<k>_Nearest_<Type>_Miles (mean over the k closest)
+
+    Types listed in FACILITY_DISTANCE_COLUMNS also fill the column the
+    scoring stage reads (Access_Distance_Miles, Substation_Distance_Miles).
+    """
+    table = centroids[[name_column, 'Latitude', 'Longitude']].copy()
+    if type_column not in facilities.columns:
+        facilities = facilities.assign(**{type_column: 'Charger'})
+    if id_column not in facilities.columns:
+        facilities = facilities.assign(**{id_column: np.arange(len(facilities))})
+
+    for facility_type, group in facilities.groupby(type_column, sort=True):
+        group = group.reset_index(drop=True)
+        distances, indices = nearest_facilities(table, group, k=k, cache_dir=cache_dir)
+        label = str(facility_type).replace(' ', '_')
+
+        table[f'Nearest_{label}_Miles'] = distances[:, 0]
+        table[f'Nearest_{label}_Id'] = group[id_column].to_numpy()[indices[:, 0]]
+        table[f'Mean_{distances.shape[1]}_Nearest_{label}_Miles'] = distances.mean(axis=1)
+
+        if facility_type in FACILITY_DISTANCE_COLUMNS:
+            table[FACILITY_DISTANCE_COLUMNS[facility_type]] = distances[:, 0]
+
+    return table.drop(columns=['Latitude', 'Longitude'])
+
+
+def attach_facility_distances(cities_df, centroids_path, facilities_path, k=3, cache_dir=None):
+    """
+    Add facility distance columns to cities_df when the local files exist
+
+    Without a facilities file the frame is returned unchanged and every
+    scoring stage keeps using Distance_from_Boston.
+    """
+    if not (os.path.exists(centroids_path) and os.path.exists(facilities_path)):
+        return cities_df
+
+    centroids = load_points(centroids_path)
+    centroids = centroids[centroids['City'].isin(cities_df['City'])]
+    facilities = load_points(facilities_path)
+    if facilities.empty:
+        return cities_df
+
+    distances = facility_distance_table(centroids, facilities, k=k, cache_dir=cache_dir)
+    return cities_df.merge(distances, on='City', how='left')
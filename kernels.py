@@ -0,0 +1,257 @@
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from parallel import INPUT_NAMES, OUTPUT_NAMES, URBAN_LABELS, gathered_outputs
+from scoring import (
+    CHARGING_WEIGHTS, GRID_WEIGHTS, INFRASTRUCTURE_WEIGHTS, MA_MEDIAN_INCOME, NORMALIZED_INPUTS,
+    PRIORITY_WEIGHTS, READINESS_WEIGHTS, RISK_WEIGHTS, URBAN_CHARGING_SCORES, city_charging_score,
+    city_demographic_risk, city_economic_risk, city_grid_capacity, city_infrastructure_risk, city_market_risk,
+    city_readiness, feature_inputs, feature_matrices, feature_statistics, infrastructure_scores,
+    priority_scores, readiness_scores, risk_scores, urban_codes, weight_vector
+)
+
+# Optional: Numba compiles the fused kernel; without it the NumPy stage functions run
+try:
+    import numba
+except ImportError:
+    numba = None
+
+# Scoring backends: 'numba' (compiled kernel), 'numpy' (vectorized stage
+# functions) and 'python' (the kernel uncompiled - slow, for checking it
+# where Numba is not installed)
+BACKENDS = ('numba', 'numpy', 'python')
+DEFAULT_BACKEND = 'numba' if numba is not None else 'numpy'
+
+# Urban-class code counted as an infrastructure risk
+URBAN_CORE_CODE = URBAN_LABELS.index('Urban Core')
+
+
+def _score_rows(inputs, codes, statistics, readiness_w, priority_w, risk_w, charging_w, grid_w,
+                split, urban_scores, urban_core_code, median_income, out):
+    """
+    Every per-city stage score in one pass over the rows
+
+    inputs is the (INPUT_NAMES x cities) array, codes the int8 urban
+    classes, statistics the NORMALIZED_INPUTS maxima; out receives one row
+    per OUTPUT_NAMES entry. The formulas are those of
+    scoring.feature_matrices and the stage score functions, written per
+    city so each row's inputs are read once and no feature matrix is built.
+    Plain loops and scalars only, so Numba compiles it in nopython mode.
+    """
+    max_population, max_income, max_home_value, max_distance = statistics[0], statistics[1], \
+        statistics[2], statistics[3]
+    for i in range(inputs.shape[1]):
+        population, income, home_value = inputs[0, i], inputs[1, i], inputs[2, i]
+        education, single_family = inputs[3, i], inputs[4, i]
+        drive_alone, transit = inputs[5, i], inputs[6, i]
+        distance, substation_distance = inputs[7, i], inputs[8, i]
+        code = codes[i]
+
+        # Readiness
+        readiness = (min(income / median_income, 1.0) * readiness_w[0]
+                     + education / 100 * readiness_w[1]
+                     + single_family / 100 * readiness_w[2]
+                     + population / max_population * readiness_w[3]
+                     + drive_alone / 100 * readiness_w[4]
+                     + max(0.5, 1.0 - distance / 100) * readiness_w[5])
+        out[0, i] = min(readiness, 1.0)
+
+        # Priority factors and score
+        economic = (income / max_income) * 0.6 + (home_value / max_home_value) * 0.4
+        infrastructure = (single_family / 100) * 0.6 + (1 - distance / max_distance) * 0.4
+        out[1, i] = economic
+        out[2, i] = education / 100
+        out[3, i] = infrastructure
+        out[4, i] = population / max_population
+        out[5, i] = drive_alone / 100
+        out[6, i] = (out[1, i] * priority_w[0] + out[2, i] * priority_w[1] + out[3, i] * priority_w[2]
+                     + out[4, i] * priority_w[3] + out[5, i] * priority_w[4])
+
+        # Risk levels (1 = low, 3 = high) and overall score
+        economic_risk = 3 if income < 50000 else (2 if income < 75000 else 1)
+        infrastructure_risk = 1
+        if single_family < 30:
+            infrastructure_risk += 1
+        if distance > 40:
+            infrastructure_risk += 1
+        if code == urban_core_code:
+            infrastructure_risk += 1
+        infrastructure_risk = min(infrastructure_risk, 3)
+        demographic_risk = 3 if education < 25 else (2 if education < 45 else 1)
+        if transit > 20 and drive_alone < 50:
+            market_risk = 3
+        elif transit > 10 or drive_alone < 70:
+            market_risk = 2
+        else:
+            market_risk = 1
+        out[7, i] = economic_risk
+        out[8, i] = infrastructure_risk
+        out[9, i] = demographic_risk
+        out[10, i] = market_risk
+        out[11, i] = (economic_risk * risk_w[0] + infrastructure_risk * risk_w[1]
+                      + demographic_risk * risk_w[2] + market_risk * risk_w[3])
+
+        # Charging, grid capacity and infrastructure readiness
+        charging = (single_family / 100 * charging_w[0] + urban_scores[code] * charging_w[1]
+                    + max(0.3, 1.0 - distance / 100) * charging_w[2])
+        grid = min(min(income / 100000, 1.0) * grid_w[0]
+                   + max(0.4, 1.0 - substation_distance / 100) * grid_w[1]
+                   + (1 - min(population / 100000, 1.0)) * grid_w[2], 1.0)
+        out[12, i] = charging
+        out[13, i] = grid
+        out[14, i] = charging * split[0] + grid * split[1]
+
+
+# Compiled once and cached under __pycache__ next to this file (or
+# NUMBA_CACHE_DIR), so later processes load the machine code instead of
+# paying the JIT again
+_compiled = numba.njit(cache=True, nogil=True)(_score_rows) if numba is not None else None
+
+
+def kernel_arguments(cities_df, params=None):
+    """Contiguous input arrays, weight vectors and constants of _score_rows for a city table"""
+    params = params or {}
+    inputs = feature_inputs(cities_df)
+    statistics = feature_statistics(inputs)
+    return (
+        np.ascontiguousarray(np.vstack([inputs[name] for name in INPUT_NAMES])),
+        urban_codes(inputs['urban_class']),
+        np.asarray([statistics[name] for name in NORMALIZED_INPUTS]),
+        weight_vector(params.get('readiness_weights'), READINESS_WEIGHTS),
+        weight_vector(params.get('priority_weights'), PRIORITY_WEIGHTS),
+        weight_vector(params.get('risk_weights'), RISK_WEIGHTS),
+        weight_vector(params.get('charging_weights'), CHARGING_WEIGHTS),
+        weight_vector(params.get('grid_weights'), GRID_WEIGHTS),
+        weight_vector(params.get('infrastructure_weights'), INFRASTRUCTURE_WEIGHTS),
+        np.asarray([URBAN_CHARGING_SCORES[label] for label in URBAN_LABELS]),
+        URBAN_CORE_CODE,
+        float(MA_MEDIAN_INCOME)
+    )
+
+
+def _numpy_scores(cities_df, params):
+    """The same outputs from the vectorized stage functions"""
+    inputs = feature_inputs(cities_df)
+    features = feature_matrices(inputs, feature_statistics(inputs))
+    charging, grid, infrastructure = infrastructure_scores(
+        features, params.get('charging_weights'), params.get('grid_weights'), params.get('infrastructure_weights')
+    )
+    scores = {'Adoption_Readiness': readiness_scores(features, params.get('readiness_weights'))}
+    scores.update({name: features['priority'][:, j] for j, name in enumerate(PRIORITY_WEIGHTS)})
+    scores['Priority_Score'] = priority_scores(features, params.get('priority_weights'))
+    scores.update({name: features['risk'][:, j] for j, name in enumerate(RISK_WEIGHTS)})
+    scores['Overall_Risk_Score'] = risk_scores(features, params.get('risk_weights'))
+    scores['Charging_Infrastructure_Score'] = charging
+    scores['Grid_Capacity_Score'] = grid
+    scores['Infrastructure_Readiness'] = infrastructure
+    return scores
+
+
+def fused_scores(cities_df, params=None, backend=None):
+    """
+    Per-city stage scores ({OUTPUT_NAMES: array}) from the chosen backend
+
+    backend defaults to 'numba' when Numba is installed and 'numpy'
+    otherwise; asking for 'numba' without it falls back to 'numpy'. The
+    kernel backends raise ValueError for an unknown Urban_Classification
+    (scoring.urban_codes).
+    """
+    params = params or {}
+    backend = backend or DEFAULT_BACKEND
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend {backend!r}; expected one of {BACKENDS}")
+    if backend == 'numpy' or (backend == 'numba' and _compiled is None):
+        return _numpy_scores(cities_df, params)
+
+    out = np.empty((len(OUTPUT_NAMES), len(cities_df)))
+    kernel = _compiled if backend == 'numba' else _score_rows
+    kernel(*kernel_arguments(cities_df, params), out)
+    return {name: out[j] for j, name in enumerate(OUTPUT_NAMES)}
+
+
+def fused_outputs(cities_df, params=None, backend=None):
+    """
+    Stage outputs of the research-default pipeline with fused row scoring
+
+    Growth rates depend on the whole-table allocation (largest remainder
+    over every city's readiness), so they run after the row pass, in
+    parallel.gathered_outputs, with the priority rank and the categories.
+    """
+    return gathered_outputs(cities_df, fused_scores(cities_df, params, backend), params)
+
+
+def _apply_scores(cities_df):
+    """The row-wise pandas .apply formulas the stages used before vectorization"""
+    max_population = cities_df['Population_2024'].max()
+    readiness = cities_df.apply(lambda row: city_readiness(row, max_population), axis=1)
+    risk = cities_df.apply(lambda row: (
+        city_economic_risk(row['Median_Income'])
+        + city_infrastructure_risk(row['Single_Family_Pct'], row['Distance_from_Boston'],
+                                         row['Urban_Classification'])
+        + city_demographic_risk(row['Bachelor_Degree_Pct'])
+        + city_market_risk(row['Public_Transit_Pct'], row['Drive_Alone_Pct'])
+    ), axis=1)
+    infrastructure = cities_df.apply(
+        lambda row: city_charging_score(row) * 0.6 + city_grid_capacity(row) * 0.4, axis=1
+    )
+    return readiness, risk, infrastructure
+
+
+def benchmark(cities_df, apply_rows=100000, repeats=3):
+    """
+    Best-of-repeats wall time per backend, with rows per second
+
+    The apply path is timed on the first apply_rows rows only (it runs at a
+    few thousand rows per second) and compared by throughput. The numba
+    row's first call is reported separately: it is the JIT compile on a cold
+    cache and only the cache load afterwards.
+    """
+    def best(run, df):
+        times = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            run(df)
+            times.append(time.perf_counter() - start)
+        return min(times)
+
+    rows = []
+    if _compiled is not None:
+        start = time.perf_counter()
+        fused_scores(cities_df.head(1), backend='numba')
+        rows.append({'Backend': 'numba (first call)', 'Rows': 1, 'Seconds': time.perf_counter() - start})
+        rows.append({'Backend': 'numba', 'Rows': len(cities_df),
+                     'Seconds': best(lambda df: fused_scores(df, backend='numba'), cities_df)})
+    rows.append({'Backend': 'numpy', 'Rows': len(cities_df),
+                 'Seconds': best(lambda df: fused_scores(df, backend='numpy'), cities_df)})
+    sample = cities_df.head(apply_rows)
+    rows.append({'Backend': 'apply', 'Rows': len(sample), 'Seconds': best(_apply_scores, sample)})
+
+    results = pd.DataFrame(rows)
+    results['Rows_per_Second'] = results['Rows'] / results['Seconds']
+    results['Speedup_vs_Apply'] = results['Rows_per_Second'] / results['Rows_per_Second'].iloc[-1]
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the fused scoring kernel against NumPy and apply")
+    parser.add_argument('--rows', type=int, default=1000000, help="Synthetic rows to score")
+    parser.add_argument('--apply-rows', type=int, default=100000, help="Rows timed on the apply path")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    import app
+    from synthetic import CityModel, generate_chunks
+    model = CityModel(app.load_authentic_massachusetts_cities_complete())
+    cities_df = pd.concat(generate_chunks(model, args.rows, args.seed), ignore_index=True)
+
+    print(f"{args.rows:,} rows, numba {'not installed' if numba is None else numba.__version__}, "
+          f"cache dir {os.environ.get('NUMBA_CACHE_DIR', '__pycache__')}")
+    print(benchmark(cities_df, args.apply_rows).round(4).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
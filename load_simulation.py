@@ -0,0 +1,211 @@
+import json
+import os
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+HOURS_PER_YEAR = 8760
+
+# Charging behaviour assumptions (expected value per EV)
+# - Daily energy: ~11,000 miles/year at ~0.3 kWh/mile (DOE fueleconomy.gov averages)
+# - Home: Level 2 at 7.2 kW, evening arrivals, overnight dwell
+# - Public: mixed Level 2 / DC fast (~25 kW average session power), midday arrivals
+DAILY_KWH_PER_EV = 11000 * 0.3 / 365
+
+CHARGING_PROFILES = {
+    'Home': {'arrival_mean': 18.5, 'arrival_std': 2.0, 'dwell_hours': 11.0, 'power_kw': 7.2},
+    'Public': {'arrival_mean': 12.5, 'arrival_std': 3.5, 'dwell_hours': 2.0, 'power_kw': 25.0}
+}
+
+# Day-to-day variation: weekend demand by location, and winter energy penalty
+# (cold weather raises kWh/mile; peak in mid-January)
+WEEKEND_FACTORS = {'Home': 1.1, 'Public': 0.8}
+WINTER_AMPLITUDE = 0.15
+
+
+def daily_profile(arrival_mean, arrival_std, dwell_hours, power_kw, daily_kwh=DAILY_KWH_PER_EV):
+    """
+    Expected 24-hour charging load (kW per EV) for one charging location
+
+    Arrivals follow a wrapped normal distribution over the hour of day.
+    Each session draws power_kw from arrival until daily_kwh is delivered or
+    the dwell ends, whichever comes first; the profile is the arrival
+    distribution convolved (circularly, so overnight sessions wrap past
+    midnight) with that charging window, fractional last hour included.
+    """
+    hours = np.arange(24)
+    # Wrapped normal: fold +/- 1 day so evening arrivals spill correctly past midnight
+    offsets = (hours[:, None] + 0.5 - arrival_mean + np.array([-24, 0, 24])[None, :]) / arrival_std
+    arrival = np.exp(-0.5 * offsets ** 2).sum(axis=1)
+    arrival /= arrival.sum()
+
+    charge_hours = min(dwell_hours, daily_kwh / power_kw)
+    window = np.clip(charge_hours - np.arange(int(np.ceil(charge_hours)) + 1), 0.0, 1.0)
+    window = window[window > 0] * power_kw
+
+    profile = np.zeros(24)
+    for lag, kw in enumerate(window):
+        profile += np.roll(arrival, lag) * kw
+    return profile
+
+
+def annual_profiles(year, profiles=CHARGING_PROFILES, daily_kwh=DAILY_KWH_PER_EV):
+    """
+    8760-hour expected load (kW per EV) for each charging location
+
+    The daily shape is tiled over the year and scaled by weekend and
+    seasonal factors. Returns {location: array of HOURS_PER_YEAR}; leap
+    years drop Dec 31 so every year has the same length.
+    """
+    days = HOURS_PER_YEAR // 24
+    weekday = (date(year, 1, 1).weekday() + np.arange(days)) % 7
+    weekend = weekday >= 5
+    seasonal = 1 + WINTER_AMPLITUDE * np.cos(2 * np.pi * (np.arange(days) - 15) / 365)
+
+    result = {}
+    for location, spec in profiles.items():
+        day_factor = seasonal * np.where(weekend, WEEKEND_FACTORS.get(location, 1.0), 1.0)
+        shape = daily_profile(daily_kwh=daily_kwh, **spec)
+        result[location] = (day_factor[:, None] * shape[None, :]).ravel()
+    return result
+
+
+def home_charging_share(single_family_pct, floor=0.3, ceiling=0.9):
+    """Share of charging done at home, rising with single-family housing (NREL: ~80% overall)"""
+    return np.clip(np.asarray(single_family_pct, dtype=float) / 100 + floor, floor, ceiling)
+
+
+def simulate_hourly_load(evs, home_share, years, capacity_kw, out_path, profiles=CHARGING_PROFILES,
+                         daily_kwh=DAILY_KWH_PER_EV, block_size=512):
+    """
+    Hourly charging load for every site and year, streamed to a memory-mapped array
+
+    Parameters:
+    - evs: (sites x years) EV counts
+    - home_share: per-site share of charging at home (rest is public)
+    - years: forecast years matching the columns of evs
+    - capacity_kw: per-site grid capacity to compare peaks against
+    - out_path: .npy file holding a float32 (years x sites x 8760) array
+
+    Load for a site is evs x (home_share x home profile + public share x
+    public profile). Work proceeds one year and block_size sites at a time,
+    so peak memory is one float32 block_size x 8760 block regardless of how
+    many sites or years are simulated (5k tracts x 5 years is ~875 MB on
+    disk, ~18 MB in memory). Hours are written straight into the memmap;
+    peaks, peak hour and annual energy are reduced from each block as it is
+    produced.
+
+    Returns a long DataFrame (Site, Year, Peak_kW, Peak_Hour, Annual_MWh,
+    Capacity_kW, Peak_Utilization). A JSON sidecar records the years and
+    shape so open_hourly_load can slice the file later.
+    """
+    evs = np.asarray(evs, dtype=float)
+    home_share = np.asarray(home_share, dtype=float)
+    capacity_kw = np.asarray(capacity_kw, dtype=float)
+    n_sites, n_years = evs.shape
+
+    os.makedirs(os.path.dirname(os.path.abspath(out_path)), exist_ok=True)
+    tmp_path = f'{out_path}.{os.getpid()}.tmp.npy'
+    hourly = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=np.float32,
+                                       shape=(n_years, n_sites, HOURS_PER_YEAR))
+
+    peak_kw = np.empty((n_years, n_sites))
+    peak_hour = np.empty((n_years, n_sites), dtype=np.int64)
+    annual_mwh = np.empty((n_years, n_sites))
+
+    for y, year in enumerate(years):
+        location_profiles = annual_profiles(year, profiles, daily_kwh)
+        public = location_profiles['Public'].astype(np.float32)
+        home_minus_public = location_profiles['Home'].astype(np.float32) - public
+
+        for start in range(0, n_sites, block_size):
+            stop = min(start + block_size, n_sites)
+            # evs x (public + share x (home - public)), built in place in one float32 block
+            block = np.multiply(home_share[start:stop, None].astype(np.float32), home_minus_public[None, :])
+            block += public[None, :]
+            block *= evs[start:stop, y, None].astype(np.float32)
+
+            hourly[y, start:stop] = block
+            peak_hour[y, start:stop] = block.argmax(axis=1)
+            peak_kw[y, start:stop] = block.max(axis=1)
+            annual_mwh[y, start:stop] = block.sum(axis=1, dtype=np.float64) / 1000
+
+        hourly.flush()
+
+    del hourly
+    with open(tmp_path + '.json', 'w') as handle:
+        json.dump({'years': [int(year) for year in years], 'sites': n_sites, 'hours': HOURS_PER_YEAR}, handle)
+    os.replace(tmp_path + '.json', out_path + '.json')
+    os.replace(tmp_path, out_path)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        utilization = np.where(capacity_kw[None, :] > 0, peak_kw / capacity_kw[None, :], np.inf)
+
+    return pd.DataFrame({
+        'Site': np.tile(np.arange(n_sites), n_years),
+        'Year': np.repeat(np.asarray(years, dtype=int), n_sites),
+        'Peak_kW': peak_kw.ravel(),
+        'Peak_Hour': peak_hour.ravel(),
+        'Annual_MWh': annual_mwh.ravel(),
+        'Capacity_kW': np.tile(capacity_kw, n_years),
+        'Peak_Utilization': utilization.ravel()
+    })
+
+
+def open_hourly_load(path):
+    """
+    Read-only memmap of a simulate_hourly_load result plus its year list
+
+    Opening a file marks it as used (its modification time), which is the
+    order prune_hourly_loads evicts in.
+    """
+    with open(path + '.json') as handle:
+        meta = json.load(handle)
+    os.utime(path)
+    return np.load(path, mmap_mode='r'), meta['years']
+
+
+def prune_hourly_loads(directory, keep, pattern_prefix='hourly-'):
+    """
+    Delete all but the keep most recently used hourly load files (and their
+    JSON sidecars) in directory; returns the deleted paths
+
+    Files are ranked by modification time, which simulate_hourly_load sets
+    on writing and open_hourly_load on every read. Readers that still map a
+    deleted file keep reading it (the data stays until they close it).
+    """
+    if not os.path.isdir(directory):
+        return []
+    paths = [os.path.join(directory, name) for name in os.listdir(directory)
+             if name.startswith(pattern_prefix) and name.endswith('.npy') and '.tmp' not in name]
+    paths.sort(key=os.path.getmtime, reverse=True)
+    deleted = []
+    for path in paths[keep:]:
+        for stale in (path, path + '.json'):
+            try:
+                os.remove(stale)
+            except FileNotFoundError:
+                pass
+        deleted.append(path)
+    return deleted
+
+
+def city_load_summary(infra_df, out_path, capacity_kw, years=None, profiles=CHARGING_PROFILES):
+    """
+    Simulate hourly load for the dashboard's cities
+
+    EVs come from the EV_Forecast_{year} columns (all of them unless years is
+    given) and the home charging share from Single_Family_Pct. Returns the
+    long peak table with City in place of the site index.
+    """
+    if years is None:
+        years = sorted(int(column.rsplit('_', 1)[1]) for column in infra_df.columns
+                       if column.startswith('EV_Forecast_') and column.rsplit('_', 1)[1].isdigit())
+
+    evs = infra_df[[f'EV_Forecast_{year}' for year in years]].to_numpy(dtype=float)
+    peaks = simulate_hourly_load(
+        evs, home_charging_share(infra_df['Single_Family_Pct']), years, capacity_kw, out_path, profiles
+    )
+    peaks.insert(0, 'City', infra_df['City'].to_numpy()[peaks['Site']])
+    return peaks.drop(columns='Site')
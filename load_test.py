@@ -0,0 +1,112 @@
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+import urllib.request
+
+from tornado.websocket import websocket_connect
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+# Optional: psutil gives RSS on any platform; /proc is used on Linux otherwise
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+def resident_mb(pid):
+    """Resident memory of a process in MB"""
+    if psutil is not None:
+        return psutil.Process(pid).memory_info().rss / 2 ** 20
+    with open(f'/proc/{pid}/status') as handle:
+        for line in handle:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) / 1024
+    raise RuntimeError("Cannot read process memory (install psutil)")
+
+
+def start_server(app_path, port, timeout=60):
+    """Run the dashboard headless and wait for its health endpoint"""
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'streamlit', 'run', app_path, '--server.headless', 'true',
+         '--server.port', str(port), '--browser.gatherUsageStats', 'false'],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with urllib.request.urlopen(f'http://127.0.0.1:{port}/_stcore/health', timeout=1) as response:
+                if response.status == 200:
+                    return server
+        except OSError:
+            time.sleep(0.25)
+    server.terminate()
+    raise RuntimeError(f"Streamlit did not start on port {port}")
+
+
+async def open_session(port):
+    """
+    Headless browser stand-in: connect a session and run the script once
+
+    Sends the same rerun request a browser sends on page load and reads
+    ForwardMsgs until the run finishes. The socket is returned open so the
+    server keeps the session (and its session state) alive.
+    """
+    connection = await websocket_connect(f'ws://127.0.0.1:{port}/_stcore/stream', max_message_size=2 ** 30)
+    request = BackMsg()
+    request.rerun_script.query_string = ''
+    await connection.write_message(request.SerializeToString(), binary=True)
+
+    while True:
+        raw = await connection.read_message()
+        if raw is None:
+            raise RuntimeError("Server closed the session")
+        message = ForwardMsg()
+        message.ParseFromString(raw)
+        if message.WhichOneof('type') == 'script_finished':
+            return connection
+
+
+async def run_load_test(port, pid, sessions):
+    connections = []
+    samples = [resident_mb(pid)]
+    for n in range(1, sessions + 1):
+        start = time.perf_counter()
+        connections.append(await open_session(port))
+        elapsed = time.perf_counter() - start
+        await asyncio.sleep(0.5)  # Let the server finish post-run bookkeeping
+        samples.append(resident_mb(pid))
+        print(f"session {n:3d}: {samples[-1]:8.1f} MB  (+{samples[-1] - samples[-2]:6.1f} MB, run {elapsed:.2f}s)")
+
+    for connection in connections:
+        connection.close()
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Server memory per concurrent dashboard session")
+    parser.add_argument('--sessions', type=int, default=20, help="Concurrent sessions to open")
+    parser.add_argument('--port', type=int, default=8599, help="Port for the headless server")
+    parser.add_argument('--app', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app.py'))
+    args = parser.parse_args()
+
+    server = start_server(args.app, args.port)
+    try:
+        samples = asyncio.run(run_load_test(args.port, server.pid, args.sessions))
+    finally:
+        server.terminate()
+        server.wait()
+
+    # The first session pays for imports, data loading and the shared scenario results
+    later = [after - before for before, after in zip(samples[1:], samples[2:])]
+    print(f"\nidle server: {samples[0]:.1f} MB, first session: +{samples[1] - samples[0]:.1f} MB")
+    if later:
+        print(f"each additional session: {sum(later) / len(later):.2f} MB on average "
+              f"(min {min(later):.2f}, max {max(later):.2f})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+import numpy as np
+
+# Every normalization sum and weighted score accumulates in float64, whatever
+# the storage dtype of the inputs
+ACCUMULATOR_DTYPE = np.float64
+
+# Rows upcast at a time by weighted_sum (bounds the float64 temporary)
+BLOCK_ROWS = 65536
+
+# Scores closer than this many units in the last place of their storage dtype
+# (relative to the largest score) count as tied
+TIE_ULPS = 4
+
+
+def stable_sum(values, axis=None):
+    """
+    Sum with a float64 accumulator
+
+    NumPy reduces contiguous arrays pairwise, so the error grows with
+    log(n) rather than n; the float64 accumulator keeps float32 inputs from
+    losing digits once the running total dwarfs the individual values.
+    """
+    return np.sum(values, axis=axis, dtype=ACCUMULATOR_DTYPE)
+
+
+class KahanSum:
+    """
+    Compensated running total for sums built chunk by chunk
+
+    Each chunk is reduced with stable_sum and the chunk totals are combined
+    with Neumaier's variant of Kahan summation, so streaming a column in any
+    number of chunks gives the same total as one pass to within one rounding.
+    """
+
+    def __init__(self):
+        self.total = 0.0
+        self.compensation = 0.0
+
+    def add(self, values):
+        value = float(stable_sum(values))
+        total = self.total + value
+        if abs(self.total) >= abs(value):
+            self.compensation += (self.total - total) + value
+        else:
+            self.compensation += (value - total) + self.total
+        self.total = total
+        return self
+
+    @property
+    def value(self):
+        return self.total + self.compensation
+
+
+def normalize(values):
+    """Shares of the total (float64 sum), returned in the input's floating dtype"""
+    values = np.asarray(values)
+    dtype = values.dtype if np.issubdtype(values.dtype, np.floating) else ACCUMULATOR_DTYPE
+    return (values.astype(ACCUMULATOR_DTYPE, copy=False) / stable_sum(values)).astype(dtype, copy=False)
+
+
+def weighted_sum(matrix, weights, block_rows=BLOCK_ROWS):
+    """
+    matrix @ weights with float64 accumulation, returned in the matrix dtype
+
+    float64 and integer matrices take the plain (float64) product. Narrower matrices are upcast
+    block_rows rows at a time, so a float32 feature matrix keeps its memory
+    saving and the temporary stays at one block.
+    """
+    weights = np.asarray(weights, dtype=ACCUMULATOR_DTYPE)
+    if matrix.dtype == ACCUMULATOR_DTYPE or not np.issubdtype(matrix.dtype, np.floating):
+        return matrix @ weights
+
+    result = np.empty(len(matrix), dtype=matrix.dtype)
+    for start in range(0, len(matrix), block_rows):
+        block = matrix[start:start + block_rows].astype(ACCUMULATOR_DTYPE)
+        result[start:start + block_rows] = block @ weights
+    return result
+
+
+def tie_tolerance(scores, dtype=None):
+    """Gap below which two scores are indistinguishable at their storage precision"""
+    dtype = np.dtype(dtype or (scores.dtype if np.issubdtype(scores.dtype, np.floating) else ACCUMULATOR_DTYPE))
+    scale = np.nanmax(np.abs(scores)) if len(scores) else 0.0
+    return TIE_ULPS * np.finfo(dtype).eps * scale
+
+
+def dense_rank(scores, ascending=False, tolerance=None):
+    """
+    Dense rank (1 = best) with deterministic tie detection
+
+    Scores are sorted (stable, original order breaking exact ties) and a new
+    rank starts only where the gap to the previous score exceeds tolerance
+    (tie_tolerance by default), so values that differ by rounding noise
+    share a rank instead of being ordered by that noise. NaN ranks last.
+    """
+    scores = np.asarray(scores)
+    if tolerance is None:
+        tolerance = tie_tolerance(scores)
+    values = scores.astype(ACCUMULATOR_DTYPE)
+    key = values if ascending else -values
+    order = np.lexsort((np.arange(len(values)), key))
+
+    gaps = np.abs(np.diff(values[order])) > tolerance
+    gaps |= np.isnan(values[order][1:]) & ~np.isnan(values[order][:-1])
+    ranks = np.empty(len(values), dtype=np.int64)
+    ranks[order] = np.concatenate([[0], np.cumsum(gaps)]) + 1 if len(values) else []
+    return ranks
+
+
+def rank_inversions(reference, candidate, tolerance, ascending=False):
+    """
+    Adjacent pairs of the reference ranking that the candidate scores put in
+    the opposite order by more than tolerance (ties are not churn)
+    """
+    reference = np.asarray(reference, dtype=ACCUMULATOR_DTYPE)
+    candidate = np.asarray(candidate, dtype=ACCUMULATOR_DTYPE)
+    order = np.lexsort((np.arange(len(reference)), reference if ascending else -reference))
+    steps = np.diff(candidate[order])
+    return int(np.sum(steps < -tolerance) if ascending else np.sum(steps > tolerance))
+
+
+def precision_report(reference, candidate):
+    """Max absolute and relative error of candidate against a float64 reference"""
+    reference = np.asarray(reference, dtype=ACCUMULATOR_DTYPE)
+    difference = np.abs(np.asarray(candidate, dtype=ACCUMULATOR_DTYPE) - reference)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        relative = np.where(reference != 0, difference / np.abs(reference), difference)
+    return {'max_abs_error': float(np.nanmax(difference)), 'max_rel_error': float(np.nanmax(relative))}
+
+
+def _synthetic_cities(n, seed=0):
+    """City-schema table with realistic ranges for precision checks"""
+    import pandas as pd
+
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'City': [f'Tract_{i}' for i in range(n)],
+        'Population_2024': rng.lognormal(8.3, 0.6, n).round(),
+        'Median_Income': rng.lognormal(11.4, 0.4, n).round(),
+        'Bachelor_Degree_Pct': rng.uniform(5, 90, n).round(1),
+        'Drive_Alone_Pct': rng.uniform(20, 90, n).round(1),
+        'Single_Family_Pct': rng.uniform(0, 95, n).round(1),
+        'Median_Home_Value': rng.lognormal(13.0, 0.4, n).round(),
+        'Public_Transit_Pct': rng.uniform(0, 40, n).round(1),
+        'Urban_Classification': rng.choice(['Urban Core', 'Urban', 'Suburban'], n),
+        'Distance_from_Boston': rng.uniform(0, 120, n).round()
+    })
+
+
+def compare_precision(cities_df):
+    """
+    Run the scoring stages on float64 and float32 feature matrices
+
+    Returns {stage: report}: errors of the float32 scores against the float64
+    reference, ranking inversions once ties are judged at float32 tolerance,
+    and category flips at the readiness thresholds (scores within float32
+    rounding of a threshold). Also reports the drift of a naive sequential
+    float32 total, for contrast.
+    """
+    from scoring import (build_feature_matrices, readiness_scores, priority_scores, infrastructure_scores,
+                         categorize_infrastructure, ALLOCATION_POPULATION_SHARE)
+
+    reference = build_feature_matrices(cities_df)
+    fast = build_feature_matrices(cities_df, dtype=np.float32)
+
+    stages = {
+        'Readiness_Weight': lambda features: normalize(readiness_scores(features)),
+        'Allocation_Weight': lambda features: (
+            normalize(features['population']) * ALLOCATION_POPULATION_SHARE
+            + normalize(readiness_scores(features)) * (1 - ALLOCATION_POPULATION_SHARE)
+        ),
+        'Priority_Score': priority_scores,
+        'Infrastructure_Readiness': lambda features: infrastructure_scores(features)[2]
+    }
+
+    reports = {}
+    for stage, score in stages.items():
+        expected, actual = score(reference), score(fast)
+        tolerance = tie_tolerance(actual)
+        report = precision_report(expected, actual)
+        report['rank_inversions'] = rank_inversions(expected, actual, tolerance)
+        if stage == 'Infrastructure_Readiness':
+            flips = categorize_infrastructure(expected) != categorize_infrastructure(actual)
+            report['category_flips'] = int(np.sum(flips))
+        reports[stage] = report
+
+    population = cities_df['Population_2024'].to_numpy(dtype=np.float32)
+    exact = float(stable_sum(cities_df['Population_2024'].to_numpy(dtype=float)))
+    naive = float(np.cumsum(population, dtype=np.float32)[-1])
+    reports['naive_float32_total'] = {'max_rel_error': abs(naive - exact) / exact,
+                                      'stable_rel_error': abs(float(stable_sum(population)) - exact) / exact}
+    reports['feature_bytes'] = {
+        'float64': sum(value.nbytes for value in reference.values()),
+        'float32': sum(value.nbytes for value in fast.values())
+    }
+    return reports
+
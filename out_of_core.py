@@ -0,0 +1,248 @@
+import argparse
+import os
+import resource
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from numerics import dense_rank
+from scoring import (
+    ALLOCATION_POPULATION_SHARE, ESTIMATED_CURRENT_EVS, FORECAST_YEARS, PRIORITY_WEIGHTS, RISK_WEIGHTS,
+    STATE_TARGET_2025, NORMALIZED_INPUTS, allocation_counts, categorize_infrastructure, categorize_investment,
+    categorize_risk, feature_inputs, feature_matrices, feature_statistics, forecast_matrix, growth_rates,
+    infrastructure_scores, investment_priority, priority_scores, readiness_scores, risk_scores
+)
+
+# Rows read, scored and written at a time
+CHUNK_ROWS = 250000
+
+# Output files, one per stage; every file has one row per input row, in input order
+STAGE_FILES = {
+    'forecast': 'forecast.parquet',
+    'priority': 'priority.parquet',
+    'risk': 'risk.parquet',
+    'infrastructure': 'infrastructure.parquet',
+    'investment': 'investment.parquet'
+}
+
+
+def iter_chunks(path, chunk_rows=CHUNK_ROWS, columns=None):
+    """City table rows from a Parquet file, chunk_rows at a time"""
+    for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_rows, columns=columns):
+        yield batch.to_pandas()
+
+
+class StageWriter:
+    """One Parquet file per stage, written a chunk (row group) at a time"""
+
+    def __init__(self, out_dir):
+        os.makedirs(out_dir, exist_ok=True)
+        self.out_dir = out_dir
+        self._writers = {}
+
+    def path(self, stage):
+        return os.path.join(self.out_dir, STAGE_FILES[stage])
+
+    def write(self, stage, df):
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        if stage not in self._writers:
+            self._writers[stage] = pq.ParquetWriter(f'{self.path(stage)}.tmp', table.schema, compression='zstd')
+        self._writers[stage].write_table(table)
+
+    def close(self):
+        for stage, writer in self._writers.items():
+            writer.close()
+            os.replace(f'{self.path(stage)}.tmp', self.path(stage))
+        self._writers = {}
+
+
+def scan_statistics(path, chunk_rows=CHUNK_ROWS):
+    """
+    Pass 1: dataset maxima
+
+    These are the only cross-row terms of the feature matrices, so after
+    this pass any chunk can be featurized exactly as in the full table.
+    """
+    maxima = {name: -np.inf for name in NORMALIZED_INPUTS}
+    rows = 0
+    for chunk in iter_chunks(path, chunk_rows):
+        for name, value in feature_statistics(feature_inputs(chunk)).items():
+            maxima[name] = max(maxima[name], value)
+        rows += len(chunk)
+    return {'statistics': maxima, 'rows': rows}
+
+
+def scan_scores(path, statistics, params, chunk_rows=CHUNK_ROWS):
+    """
+    Pass 2: the statewide allocation and forecasts and the priority ranks
+
+    Readiness is capped at 1.0 per city, so it needs the pass 1 maxima and
+    cannot be gathered in the same pass. Population, readiness and the
+    priority score are kept per row (8 bytes each): the statewide current
+    and target counts are apportioned once over every row with
+    scoring.allocation_counts, as in the in-memory pipeline, and a dense
+    rank needs every score. The forecasts are rounded once over every row
+    too, since each year's whole-vehicle rounding preserves the statewide
+    total (scoring.forecast_matrix).
+    """
+    population, readiness, priority = [], [], []
+    for chunk in iter_chunks(path, chunk_rows):
+        features = feature_matrices(feature_inputs(chunk), statistics)
+        population.append(features['population'])
+        readiness.append(readiness_scores(features, params.get('readiness_weights')))
+        priority.append(priority_scores(features, params.get('priority_weights')))
+    population, readiness, priority = (np.concatenate(values) if values else np.empty(0)
+                                       for values in (population, readiness, priority))
+
+    population_weight, readiness_weight, allocation_weight, current_evs, target_share = allocation_counts(
+        population, readiness, params.get('current_total', ESTIMATED_CURRENT_EVS),
+        params.get('state_target', STATE_TARGET_2025), params.get('population_share', ALLOCATION_POPULATION_SHARE)
+    )
+    growth_rate = growth_rates(current_evs, target_share)
+    return {
+        'population_weight': population_weight,
+        'readiness_weight': readiness_weight,
+        'allocation_weight': allocation_weight,
+        'current_evs': current_evs,
+        'target_share': target_share,
+        'growth_rate': growth_rate,
+        'forecast': forecast_matrix(current_evs, growth_rate, FORECAST_YEARS),
+        'priority_ranks': dense_rank(priority).astype(np.int32)
+    }
+
+
+def score_chunks(path, out, scan, scores, params, chunk_rows=CHUNK_ROWS):
+    """
+    Pass 3: score every chunk through all stages and write it out
+
+    Returns the largest 2029 forecast (the investment stage normalizes by it).
+    """
+    statistics = scan['statistics']
+
+    start = 0
+    for chunk in iter_chunks(path, chunk_rows):
+        inputs = feature_inputs(chunk)
+        features = feature_matrices(inputs, statistics)
+        cities = chunk[['City']].reset_index(drop=True)
+        rows = slice(start, start + len(chunk))
+
+        # Forecast: this chunk's slice of the statewide allocation
+        forecast = scores['forecast'][rows]
+
+        forecast_df = chunk.reset_index(drop=True).assign(
+            Adoption_Readiness=readiness_scores(features, params.get('readiness_weights')),
+            Population_Weight=scores['population_weight'][rows],
+            Readiness_Weight=scores['readiness_weight'][rows],
+            Allocation_Weight=scores['allocation_weight'][rows],
+            Current_EVs_Estimate=scores['current_evs'][rows],
+            Target_Share_2025=scores['target_share'][rows],
+            Growth_Rate=scores['growth_rate'][rows],
+            **{f'EV_Forecast_{year}': forecast[:, j] for j, year in enumerate(FORECAST_YEARS)}
+        )
+        out.write('forecast', forecast_df)
+
+        priority_df = cities.assign(**{factor: features['priority'][:, j] for j, factor in enumerate(PRIORITY_WEIGHTS)})
+        priority_df['Priority_Score'] = priority_scores(features, params.get('priority_weights'))
+        priority_df['Priority_Rank'] = scores['priority_ranks'][rows]
+        out.write('priority', priority_df)
+
+        risk_df = cities.assign(**{factor: features['risk'][:, j] for j, factor in enumerate(RISK_WEIGHTS)})
+        risk_df['Overall_Risk_Score'] = risk_scores(features, params.get('risk_weights'))
+        risk_df['Risk_Category'] = categorize_risk(risk_df['Overall_Risk_Score'].to_numpy())
+        out.write('risk', risk_df)
+
+        charging, grid, infrastructure = infrastructure_scores(
+            features, params.get('charging_weights'), params.get('grid_weights'),
+            params.get('infrastructure_weights')
+        )
+        out.write('infrastructure', cities.assign(
+            Charging_Infrastructure_Score=charging,
+            Grid_Capacity_Score=grid,
+            Infrastructure_Readiness=infrastructure,
+            Infrastructure_Category=categorize_infrastructure(infrastructure)
+        ))
+
+        start += len(chunk)
+    forecast_2029 = scores['forecast'][:, FORECAST_YEARS.index(2029)]
+    return int(forecast_2029.max()) if len(forecast_2029) else 0
+
+
+def score_investment(out, max_forecast_2029, chunk_rows=CHUNK_ROWS):
+    """Pass 4: investment priority from the written forecast and infrastructure files"""
+    forecasts = iter_chunks(out.path('forecast'), chunk_rows, columns=['City', 'EV_Forecast_2029'])
+    readiness = iter_chunks(out.path('infrastructure'), chunk_rows, columns=['Infrastructure_Readiness'])
+    for forecast_df, infra_df in zip(forecasts, readiness):
+        score = infra_df['Infrastructure_Readiness'].to_numpy()
+        forecast_2029 = forecast_df['EV_Forecast_2029'].to_numpy()
+        out.write('investment', forecast_df.assign(
+            Infrastructure_Readiness=score,
+            Investment_Priority=investment_priority(score, forecast_2029, max_forecast_2029),
+            Investment_Category=categorize_investment(score, forecast_2029)
+        ))
+
+
+def run_out_of_core(input_path, out_dir, params=None, chunk_rows=CHUNK_ROWS):
+    """
+    Run every scoring stage over a Parquet city table without loading it whole
+
+    The input is streamed in chunk_rows row chunks:
+    - pass 1 gathers the dataset maxima
+    - pass 2 the statewide allocation, forecasts and priority ranks
+    - pass 3 scores each chunk through the forecast, priority, risk and
+      infrastructure stages and appends it to one Parquet file per stage
+    - pass 4 streams the forecast and infrastructure files into the
+      investment stage
+
+    Every stage sees the same global statistics as the in-memory pipeline,
+    and the whole-vehicle counts are apportioned once over every row, so the
+    outputs match it exactly. Peak memory is a few chunks plus a few 8-byte
+    values per row (the allocation, forecasts and priority scores).
+
+    params takes the scenario keys of the dashboard (state_target,
+    population_share and the *_weights dicts); missing keys use the
+    research defaults. Returns {stage: path}.
+    """
+    params = params or {}
+    out = StageWriter(out_dir)
+    try:
+        scan = scan_statistics(input_path, chunk_rows)
+        scores = scan_scores(input_path, scan['statistics'], params, chunk_rows)
+        max_forecast_2029 = score_chunks(input_path, out, scan, scores, params, chunk_rows)
+    finally:
+        out.close()
+    try:
+        score_investment(out, max_forecast_2029, chunk_rows)
+    finally:
+        out.close()
+    return {stage: out.path(stage) for stage in STAGE_FILES}
+
+
+def peak_memory_mb():
+    """Peak resident memory of this process so far (ru_maxrss is in bytes on macOS, KiB on Linux)"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2 ** 20 if sys.platform == 'darwin' else peak / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score a large city table in bounded memory")
+    parser.add_argument('input_path', help="Parquet city table (e.g. from synthetic.py)")
+    parser.add_argument('out_dir', help="Directory for one Parquet file per stage")
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS, help="Rows per chunk")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    paths = run_out_of_core(args.input_path, args.out_dir, chunk_rows=args.chunk_rows)
+    elapsed = time.perf_counter() - start
+
+    rows = pq.ParquetFile(args.input_path).metadata.num_rows
+    print(f"scored {rows:,} rows in {elapsed:.2f}s, peak memory {peak_memory_mb():.0f} MB")
+    for stage, path in paths.items():
+        print(f"{stage}: {path} ({os.path.getsize(path) / 2 ** 20:.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from numerics import dense_rank
+from scoring import (
+    ALLOCATION_POPULATION_SHARE, ESTIMATED_CURRENT_EVS, PRIORITY_WEIGHTS, RISK_WEIGHTS, STATE_TARGET_2025,
+    URBAN_CHARGING_SCORES, allocate_forecasts, categorize_infrastructure, categorize_risk, feature_inputs,
+    feature_matrices, feature_statistics, infrastructure_scores, priority_scores, readiness_scores, risk_scores,
+    urban_codes
+)
+
+# Rows per task; each task reads and writes one contiguous slice of the shared arrays
+CHUNK_ROWS = 65536
+
+# Numeric feature inputs, stored as rows of one shared (inputs x cities) array
+# so every input of a chunk is a contiguous slice
+INPUT_NAMES = ('population', 'income', 'home_value', 'education', 'single_family', 'drive_alone', 'transit',
+               'distance', 'substation_distance')
+
+# Urban classification travels as int8 codes into this label order
+URBAN_LABELS = tuple(URBAN_CHARGING_SCORES)
+
+# Per-city outputs written by the workers, one row each of the shared output array
+OUTPUT_NAMES = (
+    ('Adoption_Readiness',) + tuple(PRIORITY_WEIGHTS) + ('Priority_Score',) + tuple(RISK_WEIGHTS)
+    + ('Overall_Risk_Score', 'Charging_Infrastructure_Score', 'Grid_Capacity_Score', 'Infrastructure_Readiness')
+)
+
+
+class SharedArray:
+    """NumPy array backed by a named shared-memory block (created here or attached by name)"""
+
+    def __init__(self, shape, dtype, name=None):
+        self.shape, self.dtype = tuple(shape), np.dtype(dtype)
+        size = max(int(np.prod(self.shape)) * self.dtype.itemsize, 1)
+        self.block = shared_memory.SharedMemory(name=name, create=name is None, size=size)
+        self.array = np.ndarray(self.shape, dtype=self.dtype, buffer=self.block.buf)
+
+    @property
+    def spec(self):
+        """What a worker needs to attach: (shape, dtype, block name)"""
+        return self.shape, self.dtype.str, self.block.name
+
+    def close(self):
+        self.array = None
+        self.block.close()
+
+    def unlink(self):
+        self.close()
+        self.block.unlink()
+
+
+# Arrays and scenario state of a worker process, set once by _attach
+_worker = {}
+
+
+def _attach(inputs_spec, codes_spec, outputs_spec, statistics, params):
+    """Pool initializer: map the shared arrays and keep the broadcast statistics"""
+    _worker['inputs'] = SharedArray(*inputs_spec[:2], name=inputs_spec[2])
+    _worker['codes'] = SharedArray(*codes_spec[:2], name=codes_spec[2])
+    _worker['outputs'] = SharedArray(*outputs_spec[:2], name=outputs_spec[2])
+    _worker['statistics'] = statistics
+    _worker['params'] = params
+
+
+def _score_range(start, stop):
+    """Score rows start:stop straight from the shared inputs into the shared outputs"""
+    inputs_array, out = _worker['inputs'].array, _worker['outputs'].array
+    params = _worker['params']
+
+    inputs = {name: inputs_array[j, start:stop] for j, name in enumerate(INPUT_NAMES)}
+    inputs['urban_class'] = np.asarray(URBAN_LABELS, dtype=object)[_worker['codes'].array[start:stop]]
+    features = feature_matrices(inputs, _worker['statistics'])
+
+    n_priority, n_risk = len(PRIORITY_WEIGHTS), len(RISK_WEIGHTS)
+    out[0, start:stop] = readiness_scores(features, params.get('readiness_weights'))
+    out[1:1 + n_priority, start:stop] = features['priority'].T
+    out[1 + n_priority, start:stop] = priority_scores(features, params.get('priority_weights'))
+    row = 2 + n_priority
+    out[row:row + n_risk, start:stop] = features['risk'].T
+    out[row + n_risk, start:stop] = risk_scores(features, params.get('risk_weights'))
+    out[row + n_risk + 1:, start:stop] = np.vstack(infrastructure_scores(
+        features, params.get('charging_weights'), params.get('grid_weights'), params.get('infrastructure_weights')
+    ))
+    return stop - start
+
+
+def score_parallel(cities_df, params=None, workers=None, chunk_rows=CHUNK_ROWS):
+    """
+    Per-city stage scores computed chunk by chunk on a process pool
+
+    The numeric inputs are copied once into a shared-memory block and the
+    urban classes into an int8 one; workers map both by name, so a task
+    ships only its (start, stop) pair and reads its slice without copying.
+    The dataset maxima are computed once here and broadcast to every worker
+    with the pool initializer. Each worker writes its rows into a
+    preallocated shared output array, which is the gathered result.
+
+    workers=1 runs the same tasks in this process (no pool). Returns
+    {output name: array} for OUTPUT_NAMES. Raises ValueError for an
+    Urban_Classification outside URBAN_LABELS.
+    """
+    params = params or {}
+    workers = workers or os.cpu_count() or 1
+    inputs = feature_inputs(cities_df)
+    statistics = feature_statistics(inputs)
+    n = len(cities_df)
+
+    shared_inputs = SharedArray((len(INPUT_NAMES), n), np.float64)
+    shared_codes = SharedArray((n,), np.int8)
+    shared_outputs = SharedArray((len(OUTPUT_NAMES), n), np.float64)
+    try:
+        for j, name in enumerate(INPUT_NAMES):
+            shared_inputs.array[j] = inputs[name]
+        shared_codes.array[:] = urban_codes(inputs['urban_class'])
+
+        ranges = [(start, min(start + chunk_rows, n)) for start in range(0, n, chunk_rows)]
+        initargs = (shared_inputs.spec, shared_codes.spec, shared_outputs.spec, statistics, params)
+        if workers == 1 or len(ranges) <= 1:
+            _attach(*initargs)
+            try:
+                for start, stop in ranges:
+                    _score_range(start, stop)
+            finally:
+                for name in ('inputs', 'codes', 'outputs'):
+                    _worker.pop(name).close()
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_attach, initargs=initargs) as pool:
+                list(pool.map(_score_range, *zip(*ranges)))
+
+        return {name: shared_outputs.array[j].copy() for j, name in enumerate(OUTPUT_NAMES)}
+    finally:
+        for shared in (shared_inputs, shared_codes, shared_outputs):
+            shared.unlink()
+
+
+def parallel_outputs(cities_df, params=None, workers=None, chunk_rows=CHUNK_ROWS):
+    """
+    Stage outputs of the research-default pipeline with parallel row scoring
+
+    Row-wise scores come from score_parallel; the steps that need every
+    city at once - allocation, dense priority rank and the categories on
+    the gathered scores - run here on the gathered arrays.
+    """
+    params = params or {}
+    return gathered_outputs(cities_df, score_parallel(cities_df, params, workers, chunk_rows), params)
+
+
+def gathered_outputs(cities_df, scores, params=None):
+    """Stage outputs from gathered per-city scores ({OUTPUT_NAMES: array}) plus the whole-table steps"""
+    params = params or {}
+    allocation = allocate_forecasts(
+        cities_df['Population_2024'].to_numpy(dtype=float), scores['Adoption_Readiness'],
+        current_total=params.get('current_total', ESTIMATED_CURRENT_EVS),
+        state_target=params.get('state_target', STATE_TARGET_2025),
+        population_share=params.get('population_share', ALLOCATION_POPULATION_SHARE)
+    )
+
+    outputs = pd.DataFrame({'City': cities_df['City'].to_numpy()})
+    outputs['Adoption_Readiness'] = scores['Adoption_Readiness']
+    for name, values in allocation.items():
+        outputs[name] = values
+    for name in OUTPUT_NAMES[1:]:
+        outputs[name] = scores[name]
+    for name in RISK_WEIGHTS:
+        outputs[name] = outputs[name].astype(np.int64)
+    outputs['Priority_Rank'] = dense_rank(scores['Priority_Score'])
+    outputs['Risk_Category'] = categorize_risk(scores['Overall_Risk_Score'])
+    outputs['Infrastructure_Category'] = categorize_infrastructure(scores['Infrastructure_Readiness'])
+    return outputs
+
+
+def benchmark(cities_df, worker_counts=(1, 2, 4, 8), chunk_rows=CHUNK_ROWS, repeats=3):
+    """Best-of-repeats wall time of score_parallel per worker count, against the serial stage functions"""
+    def best(run):
+        times = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            run()
+            times.append(time.perf_counter() - start)
+        return min(times)
+
+    def serial():
+        from scoring import build_feature_matrices
+        features = build_feature_matrices(cities_df)
+        readiness_scores(features)
+        priority_scores(features)
+        risk_scores(features)
+        infrastructure_scores(features)
+
+    rows = [{'Workers': 'serial', 'Seconds': best(serial)}]
+    for workers in worker_counts:
+        rows.append({'Workers': workers, 'Seconds': best(lambda: score_parallel(cities_df, None, workers, chunk_rows))})
+    results = pd.DataFrame(rows)
+    results['Speedup'] = results['Seconds'].iloc[0] / results['Seconds']
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scaling benchmark for shared-memory parallel scoring")
+    parser.add_argument('--rows', type=int, default=2000000, help="Synthetic rows to score")
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    import app
+    from synthetic import CityModel, generate_chunks
+    model = CityModel(app.load_authentic_massachusetts_cities_complete())
+    cities_df = pd.concat(generate_chunks(model, args.rows, args.seed), ignore_index=True)
+
+    print(f"{args.rows:,} rows, {os.cpu_count()} CPUs, {args.chunk_rows:,}-row chunks")
+    print(benchmark(cities_df, args.workers, args.chunk_rows).round(3).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
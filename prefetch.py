@@ -0,0 +1,116 @@
+import queue
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+# One computed result: the data version it was built from, the value itself
+# and when it finished. Snapshots are never modified, only replaced.
+Snapshot = namedtuple('Snapshot', ['version', 'value', 'computed_at'])
+
+WORKER_THREAD_NAME = 'background-refresh'
+
+
+class BackgroundRefresher:
+    """
+    Latest ready result per key, recomputed on a background thread
+
+    Parameters:
+    - compute: function(params, version) -> value
+    - version_of: function(params) -> current data version for those params
+    - interval: seconds between checks for new data versions
+    - max_tracked: keys kept fresh (least recently requested dropped first)
+
+    Readers call snapshot() and always get a finished result (or None before
+    the first one exists). The worker builds replacements off to the side
+    and swaps each one in with a single dict assignment under a lock, so a
+    reader sees either the old snapshot or the new one, never a partial
+    result. Every interval seconds - or immediately after request() - the
+    worker re-checks the data version of every tracked key and recomputes
+    the ones whose snapshot is out of date.
+    """
+
+    def __init__(self, compute, version_of, interval=300, max_tracked=32):
+        self._compute = compute
+        self._version_of = version_of
+        self.interval = interval
+        self.max_tracked = max_tracked
+
+        self._lock = threading.Lock()
+        self._snapshots = {}
+        self._tracked = OrderedDict()
+        self._pending = set()
+        self._queue = queue.Queue()
+        self.errors = {}
+
+        self._thread = threading.Thread(target=self._run, name=WORKER_THREAD_NAME, daemon=True)
+        self._thread.start()
+
+    def snapshot(self, key):
+        return self._snapshots.get(key)
+
+    def track(self, key, params):
+        """Keep key fresh from now on (most recently used keys are kept)"""
+        with self._lock:
+            self._tracked[key] = params
+            self._tracked.move_to_end(key)
+            while len(self._tracked) > self.max_tracked:
+                dropped, _ = self._tracked.popitem(last=False)
+                self._snapshots.pop(dropped, None)
+
+    def request(self, key, params):
+        """Queue a background recompute of key unless one is already queued"""
+        self.track(key, params)
+        with self._lock:
+            if key in self._pending:
+                return
+            self._pending.add(key)
+        self._queue.put(key)
+
+    def compute_now(self, key, params):
+        """Compute key in the calling thread (first request for a key) and store it"""
+        self.track(key, params)
+        return self._refresh(key, params)
+
+    def _refresh(self, key, params):
+        version = self._version_of(params)
+        snapshot = Snapshot(version, self._compute(params, version), time.time())
+        with self._lock:
+            if key in self._tracked:
+                self._snapshots[key] = snapshot
+        return snapshot
+
+    def _stale_keys(self):
+        with self._lock:
+            tracked = list(self._tracked.items())
+        stale = []
+        for key, params in tracked:
+            snapshot = self._snapshots.get(key)
+            if snapshot is None or snapshot.version != self._version_of(params):
+                stale.append(key)
+        return stale
+
+    def _run(self):
+        while True:
+            try:
+                keys = [self._queue.get(timeout=self.interval)]
+            except queue.Empty:
+                keys = []
+            try:
+                keys += [key for key in self._stale_keys() if key not in keys]
+            except Exception as error:
+                self.errors['version_check'] = error
+
+            for key in keys:
+                with self._lock:
+                    self._pending.discard(key)
+                    params = self._tracked.get(key)
+                if params is None:
+                    continue
+                try:
+                    snapshot = self._snapshots.get(key)
+                    if snapshot is None or snapshot.version != self._version_of(params):
+                        self._refresh(key, params)
+                    self.errors.pop(key, None)
+                except Exception as error:
+                    # Keep serving the previous snapshot; the next check retries
+                    self.errors[key] = error
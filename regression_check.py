@@ -0,0 +1,442 @@
+import argparse
+import logging
+import math
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+# Optional: Hypothesis drives the property checks; the golden check runs without it
+try:
+    from hypothesis import HealthCheck, Phase, given, settings, strategies as strats
+except ImportError:
+    given = None
+
+from datasets import CITY_COLUMNS
+from numerics import TIE_ULPS
+from scoring import (
+    ESTIMATED_CURRENT_EVS, FORECAST_BASE_YEAR, FORECAST_YEARS, STATE_TARGET_2025, city_charging_score,
+    city_demographic_risk, city_economic_risk, city_grid_capacity, city_infrastructure_risk, city_market_risk,
+    city_readiness
+)
+
+GOLDEN_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'golden_stage_outputs.csv')
+
+# Stage outputs frozen in the golden file and compared by the property checks
+FORECAST_COLUMNS = [
+    'Adoption_Readiness', 'Population_Weight', 'Readiness_Weight', 'Allocation_Weight',
+    'Current_EVs_Estimate', 'Target_Share_2025', 'Growth_Rate',
+    'EV_Forecast_2025', 'EV_Forecast_2027', 'EV_Forecast_2029'
+]
+PRIORITY_COLUMNS = [
+    'Economic_Score', 'Education_Score', 'Infrastructure_Score', 'Market_Size_Score', 'Transport_Score',
+    'Priority_Score', 'Priority_Rank'
+]
+RISK_COLUMNS = [
+    'Economic_Risk', 'Infrastructure_Risk', 'Demographic_Risk', 'Market_Risk', 'Overall_Risk_Score',
+    'Risk_Category'
+]
+INFRASTRUCTURE_COLUMNS = [
+    'Charging_Infrastructure_Score', 'Grid_Capacity_Score', 'Infrastructure_Readiness', 'Infrastructure_Category'
+]
+OUTPUT_COLUMNS = FORECAST_COLUMNS + PRIORITY_COLUMNS + RISK_COLUMNS + INFRASTRUCTURE_COLUMNS
+
+# Float outputs may move by reassociation only; integers and labels must match exactly
+RTOL = 1e-9
+ATOL = 1e-12
+
+# Random tables per engine; a failing table is reported as drawn unless
+# shrinking is asked for (shrinking a 40-city table can take minutes)
+PROPERTY_EXAMPLES = 50
+
+# Statewide figures of the research-default scenario
+CURRENT_TOTAL = ESTIMATED_CURRENT_EVS
+STATE_TARGET = STATE_TARGET_2025
+
+
+def pipeline_outputs(cities_df):
+    """Stage outputs of the dashboard pipeline (research defaults, no facility distances)"""
+    import app
+
+    forecast_df, _ = app.calculate_authentic_linear_regression_forecasts(cities_df.copy())
+    priority_df = app.create_priority_factors_data(forecast_df)
+    risk_df = app.create_risk_assessment_matrix(forecast_df)
+    infra_df = app.create_infrastructure_data(forecast_df)
+    return pd.concat([
+        forecast_df[['City'] + FORECAST_COLUMNS],
+        priority_df[PRIORITY_COLUMNS],
+        risk_df[RISK_COLUMNS],
+        infra_df[INFRASTRUCTURE_COLUMNS]
+    ], axis=1)
+
+
+def parallel_pipeline_outputs(cities_df):
+    """Stage outputs with row scoring split into small chunks over two worker processes"""
+    from parallel import parallel_outputs
+    return parallel_outputs(cities_df, workers=2, chunk_rows=8)
+
+
+def fused_pipeline_outputs(cities_df):
+    """Stage outputs with the fused row kernel (compiled with Numba when installed, else run as Python)"""
+    from kernels import fused_outputs, numba
+    return fused_outputs(cities_df, backend='python' if numba is None else 'numba')
+
+
+# Engines checked against the reference; optimized backends register here
+ENGINES = {'pipeline': pipeline_outputs, 'parallel': parallel_pipeline_outputs, 'fused': fused_pipeline_outputs}
+
+
+# ---------------------------------------------------------------------------
+# Reference implementation: the stage formulas one city at a time, in plain
+# Python, as written before the stages were vectorized (the per-city
+# formulas are the city_* functions of scoring.py). Slow, but easy to audit
+# against the methodology in the stage docstrings.
+# ---------------------------------------------------------------------------
+
+def _reference_largest_remainder(shares, total):
+    """
+    Floor every share, then give the units lost to flooring to the largest
+    fractions; fractions within rounding noise of each other tie and go to
+    the lower index
+    """
+    floors = [math.floor(share + 1e-9) for share in shares]
+    missing = max(int(round(total - sum(floors))), 0)
+    tolerance = TIE_ULPS * sys.float_info.epsilon * max((abs(share) for share in shares), default=0.0)
+    by_fraction = sorted(range(len(shares)), key=lambda i: (-(shares[i] - floors[i]), i))
+    level, levels = 0, {}
+    for previous, i in zip([None] + by_fraction, by_fraction):
+        if previous is not None and (shares[previous] - floors[previous]) - (shares[i] - floors[i]) > tolerance:
+            level += 1
+        levels[i] = level
+    order = sorted(range(len(shares)), key=lambda i: (levels[i], i))
+    for i in order[:missing]:
+        floors[i] += 1
+    return floors
+
+
+def _reference_apportion(weights, total, caps=None):
+    """Proportional split of total, fixing capped items and re-splitting the rest"""
+    n = len(weights)
+    caps = caps if caps is not None else [math.inf] * n
+    capped = [False] * n
+    while True:
+        free_weight = sum(weight for weight, fixed in zip(weights, capped) if not fixed)
+        left = total - sum(cap for cap, fixed in zip(caps, capped) if fixed)
+        scale = max(left, 0) / free_weight if free_weight > 0 else 0.0
+        shares = [cap if fixed else weight * scale for weight, cap, fixed in zip(weights, caps, capped)]
+        over = [i for i in range(n) if not capped[i] and shares[i] > caps[i]]
+        if not over:
+            break
+        for i in over:
+            capped[i] = True
+    return [min(share, cap) for share, cap in zip(shares, caps)]
+
+
+def _reference_growth_rate(current_evs, target_2025):
+    if current_evs > 0:
+        return min(target_2025 / current_evs - 1, 2.0)
+    return 0.5
+
+
+def _reference_risk_category(score):
+    if score >= 10:
+        return "High Risk"
+    elif score >= 7:
+        return "Medium Risk"
+    return "Low Risk"
+
+
+def _reference_infrastructure_category(score):
+    if score >= 0.75:
+        return "High Readiness"
+    elif score >= 0.5:
+        return "Medium Readiness"
+    return "Low Readiness"
+
+
+def reference_outputs(cities_df):
+    """Stage outputs computed row by row (see the reference helpers above)"""
+    rows = cities_df.to_dict('records')
+    max_population = max(row['Population_2024'] for row in rows)
+    max_income = max(row['Median_Income'] for row in rows)
+    max_home_value = max(row['Median_Home_Value'] for row in rows)
+    max_distance = max(row['Distance_from_Boston'] for row in rows)
+
+    readiness = [city_readiness(row, max_population) for row in rows]
+    population_total = sum(row['Population_2024'] for row in rows)
+    readiness_total = sum(readiness)
+
+    out = []
+    for row, score in zip(rows, readiness):
+        population_weight = row['Population_2024'] / population_total
+        readiness_weight = score / readiness_total
+        out.append({
+            'City': row['City'],
+            'Adoption_Readiness': score,
+            'Population_Weight': population_weight,
+            'Readiness_Weight': readiness_weight,
+            'Allocation_Weight': population_weight * 0.7 + readiness_weight * 0.3
+        })
+
+    weights = [city['Allocation_Weight'] for city in out]
+    current = _reference_largest_remainder(_reference_apportion(weights, CURRENT_TOTAL), CURRENT_TOTAL)
+    caps = [math.floor(evs * 3) for evs in current]
+    target = _reference_largest_remainder(
+        _reference_apportion(weights, STATE_TARGET, caps), min(STATE_TARGET, sum(caps))
+    )
+    for city, evs, share in zip(out, current, target):
+        city['Current_EVs_Estimate'] = evs
+        city['Target_Share_2025'] = share
+        city['Growth_Rate'] = _reference_growth_rate(evs, share)
+
+    for city, row in zip(out, rows):
+        city['Economic_Score'] = (row['Median_Income'] / max_income) * 0.6 + \
+            (row['Median_Home_Value'] / max_home_value) * 0.4
+        city['Education_Score'] = row['Bachelor_Degree_Pct'] / 100
+        city['Infrastructure_Score'] = (row['Single_Family_Pct'] / 100) * 0.6 + \
+            (1 - row['Distance_from_Boston'] / max_distance) * 0.4
+        city['Market_Size_Score'] = row['Population_2024'] / max_population
+        city['Transport_Score'] = row['Drive_Alone_Pct'] / 100
+        city['Priority_Score'] = (
+            city['Economic_Score'] * 0.25 + city['Education_Score'] * 0.20 +
+            city['Infrastructure_Score'] * 0.20 + city['Market_Size_Score'] * 0.20 +
+            city['Transport_Score'] * 0.15
+        )
+
+        city['Economic_Risk'] = city_economic_risk(row['Median_Income'])
+        city['Infrastructure_Risk'] = city_infrastructure_risk(
+            row['Single_Family_Pct'], row['Distance_from_Boston'], row['Urban_Classification']
+        )
+        city['Demographic_Risk'] = city_demographic_risk(row['Bachelor_Degree_Pct'])
+        city['Market_Risk'] = city_market_risk(row['Public_Transit_Pct'], row['Drive_Alone_Pct'])
+        city['Overall_Risk_Score'] = (city['Economic_Risk'] + city['Infrastructure_Risk'] +
+                                      city['Demographic_Risk'] + city['Market_Risk'])
+        city['Risk_Category'] = _reference_risk_category(city['Overall_Risk_Score'])
+
+        city['Charging_Infrastructure_Score'] = city_charging_score(row)
+        city['Grid_Capacity_Score'] = city_grid_capacity(row)
+        city['Infrastructure_Readiness'] = (city['Charging_Infrastructure_Score'] * 0.6 +
+                                            city['Grid_Capacity_Score'] * 0.4)
+        city['Infrastructure_Category'] = _reference_infrastructure_category(city['Infrastructure_Readiness'])
+
+    return pd.DataFrame(out)
+
+
+# ---------------------------------------------------------------------------
+# Comparisons
+# ---------------------------------------------------------------------------
+
+def _close(actual, expected):
+    return np.isclose(actual.astype(float), expected.astype(float), rtol=RTOL, atol=ATOL)
+
+
+def compare_to_golden(outputs, golden):
+    """Mismatches between stage outputs and the frozen golden table, as messages"""
+    problems = []
+    if outputs['City'].tolist() != golden['City'].tolist():
+        return ["city order differs from the golden file"]
+    for column in OUTPUT_COLUMNS:
+        if column not in outputs.columns:
+            problems.append(f"{column}: missing")
+            continue
+        actual, expected = outputs[column].to_numpy(), golden[column].to_numpy()
+        if expected.dtype.kind == 'f':
+            bad = ~_close(actual, expected)
+        else:
+            bad = actual != expected
+        for i in np.flatnonzero(bad)[:5]:
+            problems.append(f"{column}[{golden['City'].iloc[i]}]: {actual[i]!r} != golden {expected[i]!r}")
+    return problems
+
+
+def compare_to_reference(outputs, reference):
+    """
+    Property violations of engine outputs against the reference, as messages
+
+    Scores agree to RTOL; risk levels agree exactly. Categories agree except
+    for scores within rounding of a threshold. The current and target counts
+    agree to one vehicle and keep exact totals. Growth rates follow the
+    engine's own counts, and each forecast is its own current estimate
+    compounded at its own growth rate, rounded by largest remainder (within
+    one vehicle, exact total). The priority rank orders every pair of cities
+    the reference scores separate.
+    """
+    problems = []
+
+    def check(name, bad):
+        for i in np.flatnonzero(bad)[:3]:
+            problems.append(f"{name}[{reference['City'].iloc[i]}]: {outputs[name].iloc[i]!r} "
+                            f"vs reference {reference[name].iloc[i]!r}")
+
+    for column in ('Adoption_Readiness', 'Population_Weight', 'Readiness_Weight', 'Allocation_Weight',
+                   'Economic_Score', 'Education_Score', 'Infrastructure_Score', 'Market_Size_Score',
+                   'Transport_Score', 'Priority_Score', 'Charging_Infrastructure_Score', 'Grid_Capacity_Score',
+                   'Infrastructure_Readiness'):
+        check(column, ~_close(outputs[column].to_numpy(), reference[column].to_numpy()))
+
+    for column in ('Economic_Risk', 'Infrastructure_Risk', 'Demographic_Risk', 'Market_Risk',
+                   'Overall_Risk_Score', 'Risk_Category'):
+        check(column, outputs[column].to_numpy() != reference[column].to_numpy())
+
+    readiness = reference['Infrastructure_Readiness'].to_numpy()
+    near_threshold = (np.abs(readiness - 0.75) < 1e-9) | (np.abs(readiness - 0.5) < 1e-9)
+    check('Infrastructure_Category',
+          (outputs['Infrastructure_Category'].to_numpy() != reference['Infrastructure_Category'].to_numpy())
+          & ~near_threshold)
+
+    for column in ('Current_EVs_Estimate', 'Target_Share_2025'):
+        actual, expected = outputs[column].to_numpy(), reference[column].to_numpy()
+        check(column, np.abs(actual - expected) > 1)
+        if actual.sum() != expected.sum():
+            problems.append(f"{column} total {actual.sum()} != reference {expected.sum()}")
+
+    current, target = outputs['Current_EVs_Estimate'].to_numpy(), outputs['Target_Share_2025'].to_numpy()
+    growth = outputs['Growth_Rate'].to_numpy()
+    expected_growth = np.asarray([_reference_growth_rate(c, t) for c, t in zip(current, target)])
+    check('Growth_Rate', ~_close(growth, expected_growth))
+
+    # A one-vehicle tie in the current estimate moves a city's growth cap and
+    # so its whole compounding path; forecasts are therefore checked against
+    # the engine's own estimate and growth rate rather than the reference's
+    for year in FORECAST_YEARS:
+        column = f'EV_Forecast_{year}'
+        actual = outputs[column].to_numpy()
+        real = current * (1 + growth) ** (year - FORECAST_BASE_YEAR)
+        check(column, np.abs(actual - real) >= 1 + RTOL * np.abs(real))
+        if actual.sum() != round(real.sum()):
+            problems.append(f"{column} total {actual.sum()} != compounded {round(real.sum())}")
+
+    scores = reference['Priority_Score'].to_numpy()
+    ranks = outputs['Priority_Rank'].to_numpy()
+    separated = scores[:, None] - scores[None, :] > 1e-9
+    misordered = separated & (ranks[:, None] >= ranks[None, :])
+    if misordered.any():
+        i, j = np.argwhere(misordered)[0]
+        problems.append(f"Priority_Rank: {reference['City'].iloc[i]} scores above "
+                        f"{reference['City'].iloc[j]} but ranks {ranks[i]} vs {ranks[j]}")
+    return problems
+
+
+# ---------------------------------------------------------------------------
+# Golden file
+# ---------------------------------------------------------------------------
+
+def builtin_cities():
+    """The built-in 20-city table the golden file was frozen from"""
+    import app
+    return app.load_authentic_massachusetts_cities_complete()
+
+
+def write_golden(path=GOLDEN_PATH):
+    outputs = pipeline_outputs(builtin_cities())
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    outputs.to_csv(path, index=False, float_format='%.17g')
+    return outputs
+
+
+def read_golden(path=GOLDEN_PATH):
+    return pd.read_csv(path)
+
+
+# ---------------------------------------------------------------------------
+# Random schema-valid city tables
+# ---------------------------------------------------------------------------
+
+def city_tables(max_cities=40):
+    """
+    Hypothesis strategy for city tables with the CITY_COLUMNS schema
+
+    Values span the real ranges and are drawn often from the exact scoring
+    thresholds (e.g. $50k / $75k income, 30% single-family, 40 miles), where
+    a rewrite is most likely to flip a comparison.
+    """
+    def around(low, high, thresholds, integer=False, places=1):
+        values = strats.integers(low, high) if integer else \
+            strats.floats(low, high, allow_nan=False).map(lambda value: round(value, places))
+        return strats.one_of(strats.sampled_from(thresholds), values)
+
+    row = strats.fixed_dictionaries({
+        'Population_2024': strats.integers(1000, 700000),
+        'Median_Income': around(20000, 250000, [50000, 75000, 100000, 101341], integer=True),
+        'Bachelor_Degree_Pct': around(0, 100, [25.0, 45.0]),
+        'Drive_Alone_Pct': around(0, 100, [50.0, 70.0]),
+        'Single_Family_Pct': around(0, 100, [30.0]),
+        'Median_Home_Value': strats.integers(100000, 2000000),
+        'Public_Transit_Pct': around(0, 60, [10.0, 20.0]),
+        'Urban_Classification': strats.sampled_from(['Urban Core', 'Urban', 'Suburban']),
+        'Distance_from_Boston': around(0, 150, [40, 50, 60, 70, 100], integer=True)
+    })
+
+    def to_frame(rows):
+        df = pd.DataFrame(rows)
+        df.insert(0, 'City', [f'City_{i}' for i in range(len(df))])
+        return df[CITY_COLUMNS]
+
+    # Distances are from Boston, so at least one city lies some distance away
+    # (an all-zero column leaves the normalized distance undefined)
+    return strats.lists(row, min_size=2, max_size=max_cities).map(to_frame).filter(
+        lambda df: df['Distance_from_Boston'].max() > 0
+    )
+
+
+def run_property_checks(engine, max_examples=PROPERTY_EXAMPLES, shrink=False):
+    """Run the Hypothesis property check for one engine; raises AssertionError on a counterexample"""
+    phases = [Phase.explicit, Phase.reuse, Phase.generate] + ([Phase.shrink] if shrink else [])
+
+    @settings(max_examples=max_examples, deadline=None, derandomize=True, database=None, phases=phases,
+              suppress_health_check=[HealthCheck.too_slow, HealthCheck.data_too_large])
+    @given(city_tables())
+    def engine_matches_reference(cities_df):
+        problems = compare_to_reference(engine(cities_df), reference_outputs(cities_df))
+        assert not problems, "\n".join(problems)
+
+    engine_matches_reference()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Golden-output and property checks for the scoring stages")
+    parser.add_argument('--update-golden', action='store_true',
+                        help="Re-freeze the golden file from the current pipeline (after an intended change)")
+    parser.add_argument('--examples', type=int, default=PROPERTY_EXAMPLES, help="Random tables per engine")
+    parser.add_argument('--shrink', action='store_true', help="Shrink a failing table to a minimal one (slow)")
+    parser.add_argument('--engine', nargs='+', choices=list(ENGINES), default=list(ENGINES))
+    args = parser.parse_args()
+
+    # Stage functions run outside a Streamlit session
+    logging.getLogger('streamlit').setLevel(logging.ERROR)
+
+    if args.update_golden:
+        outputs = write_golden()
+        print(f"golden: wrote {len(outputs)} cities to {GOLDEN_PATH}")
+        return
+
+    failed = False
+    start = time.perf_counter()
+    cities_df = builtin_cities()
+    for name in args.engine:
+        problems = compare_to_golden(ENGINES[name](cities_df), read_golden())
+        problems += compare_to_reference(ENGINES[name](cities_df), reference_outputs(cities_df))
+        failed |= bool(problems)
+        print(f"golden [{name}]: {'FAIL' if problems else 'ok'} ({time.perf_counter() - start:.2f}s)")
+        for problem in problems:
+            print(f"  {problem}")
+
+    if given is None:
+        print("properties: skipped (pip install hypothesis)")
+    else:
+        for name in args.engine:
+            start = time.perf_counter()
+            try:
+                run_property_checks(ENGINES[name], args.examples, args.shrink)
+                print(f"properties [{name}]: ok, {args.examples} tables ({time.perf_counter() - start:.2f}s)")
+            except AssertionError as error:
+                failed = True
+                print(f"properties [{name}]: FAIL\n{error}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,488 @@
+import numpy as np
+import pandas as pd
+
+from allocation import apportion, round_preserving_sum
+from numerics import normalize, weighted_sum
+
+# MA median household income from Census, used to normalize readiness income
+MA_MEDIAN_INCOME = 101341
+
+# Official MA target: 200,000 EVs by 2025 (MA Clean Energy and Climate Plan)
+STATE_TARGET_2025 = 200000
+
+# Statewide EVs today: 66,025 ZEVs (Jan 2024) + 11,000 Nov-Dec 2024 sales (Mass.gov)
+ESTIMATED_CURRENT_EVS = 77025
+
+# Share of the allocation driven by population (rest is readiness-based)
+ALLOCATION_POPULATION_SHARE = 0.7
+
+# Annual growth cap (200%) - keeps one-year allocations within 3x current EVs
+MAX_GROWTH_RATE = 2.0
+
+# Forecast base year and the 1-, 3- and 5-year report years
+FORECAST_BASE_YEAR = 2024
+FORECAST_YEARS = (2025, 2027, 2029)
+
+# Planning milestones (MA Clean Energy and Climate Plan 2030 / 2035 targets)
+PLANNING_YEARS = (2030, 2035)
+
+# Readiness factor weights (research-based, see calculate_authentic_linear_regression_forecasts)
+READINESS_WEIGHTS = {
+    'Income': 0.25,                 # Economic capacity - primary barrier
+    'Education': 0.25,              # Tech adoption propensity
+    'Home_Charging': 0.20,          # Home charging access
+    'Market_Size': 0.15,            # Market size effects
+    'Car_Dependency': 0.10,         # Car dependency
+    'Infrastructure_Access': 0.05   # Infrastructure access
+}
+
+# Priority factor weights (see create_priority_factors_data)
+PRIORITY_WEIGHTS = {
+    'Economic_Score': 0.25,
+    'Education_Score': 0.20,
+    'Infrastructure_Score': 0.20,
+    'Market_Size_Score': 0.20,
+    'Transport_Score': 0.15
+}
+
+# Risk factor weights - equal weighting keeps the overall score on the 4-12 scale
+RISK_WEIGHTS = {
+    'Economic_Risk': 1.0,
+    'Infrastructure_Risk': 1.0,
+    'Demographic_Risk': 1.0,
+    'Market_Risk': 1.0
+}
+
+# Charging infrastructure components (see create_infrastructure_data)
+CHARGING_WEIGHTS = {
+    'Home_Charging': 0.4,
+    'Public_Charging': 0.4,
+    'Infrastructure_Access': 0.2
+}
+
+# Grid capacity components (see create_infrastructure_data)
+GRID_WEIGHTS = {
+    'Economic_Capacity': 0.5,
+    'Transmission_Proximity': 0.3,
+    'Demand_Headroom': 0.2
+}
+
+# Overall infrastructure readiness split
+INFRASTRUCTURE_WEIGHTS = {
+    'Charging_Infrastructure_Score': 0.6,
+    'Grid_Capacity_Score': 0.4
+}
+
+# Public charging potential by Census urban classification
+URBAN_CHARGING_SCORES = {'Urban Core': 0.9, 'Urban': 0.7, 'Suburban': 0.5}
+
+
+# Feature inputs normalized by their maximum across the dataset
+NORMALIZED_INPUTS = ('population', 'income', 'home_value', 'distance')
+
+
+def distance_column(cities_df, column):
+    """
+    Facility distance from the geospatial stage, falling back to Distance_from_Boston
+
+    Cities without a computed distance (no facilities file, or no centroid)
+    keep the Boston-based value so scores stay defined for every row.
+
+    The distance terms keep their 100-mile scale (1 - d/100 with floors),
+    which was set for Distance_from_Boston (0-95 miles). A nearest-charger
+    or nearest-substation distance is usually a few miles, so with a
+    facilities file those terms sit near 1.0 for most cities and only
+    separate the cities far from any facility: they then measure absolute
+    proximity to the network rather than remoteness from Boston.
+    """
+    boston = cities_df['Distance_from_Boston'].to_numpy(dtype=float)
+    if column not in cities_df.columns:
+        return boston
+    distance = cities_df[column].to_numpy(dtype=float)
+    return np.where(np.isnan(distance), boston, distance)
+
+
+def weight_vector(weights, defaults):
+    """
+    Convert a (possibly partial) weights mapping into a vector ordered like defaults
+
+    Weights are rescaled to the defaults' total so scores stay on their usual
+    scale. Falls back to the defaults when every weight is zero.
+    """
+    merged = dict(defaults)
+    if weights:
+        merged.update({k: v for k, v in weights.items() if k in defaults})
+
+    w = np.asarray([merged[k] for k in defaults], dtype=float)
+    total = w.sum()
+    default_total = sum(defaults.values())
+
+    if total <= 0:
+        return np.asarray(list(defaults.values()), dtype=float)
+
+    return w * (default_total / total)
+
+
+def urban_codes(urban_class):
+    """
+    int8 codes of urban classification labels, in URBAN_CHARGING_SCORES order
+
+    Raises ValueError for any other label (or a missing one), which would
+    otherwise get code -1 and index the last class's score.
+    """
+    labels = list(URBAN_CHARGING_SCORES)
+    codes = pd.Categorical(urban_class, categories=labels).codes.astype(np.int8)
+    if (codes < 0).any():
+        unknown = sorted({str(label) for label in np.asarray(urban_class, dtype=object)[codes < 0]})
+        raise ValueError(f"Unknown Urban_Classification {', '.join(unknown)}; expected one of {', '.join(labels)}")
+    return codes
+
+
+def feature_inputs(cities_df):
+    """Raw per-city inputs of the feature matrices as float arrays (urban class as labels)"""
+    return {
+        'population': cities_df['Population_2024'].to_numpy(dtype=float),
+        'income': cities_df['Median_Income'].to_numpy(dtype=float),
+        'home_value': cities_df['Median_Home_Value'].to_numpy(dtype=float),
+        'education': cities_df['Bachelor_Degree_Pct'].to_numpy(dtype=float),
+        'single_family': cities_df['Single_Family_Pct'].to_numpy(dtype=float),
+        'drive_alone': cities_df['Drive_Alone_Pct'].to_numpy(dtype=float),
+        'transit': cities_df['Public_Transit_Pct'].to_numpy(dtype=float),
+        # Nearest charger / substation when facility locations are available (see geospatial.py)
+        'distance': distance_column(cities_df, 'Access_Distance_Miles'),
+        'substation_distance': distance_column(cities_df, 'Substation_Distance_Miles'),
+        'urban_class': cities_df['Urban_Classification'].to_numpy()
+    }
+
+
+def feature_statistics(inputs):
+    """Dataset-wide maxima the features are normalized by - the only cross-city terms"""
+    return {name: float(np.max(inputs[name])) for name in NORMALIZED_INPUTS}
+
+
+def build_feature_matrices(cities_df, dtype=np.float64):
+    """
+    Precompute the normalized feature matrices behind every scoring stage
+
+    Each stage score is a weighted sum of these columns, so once the matrices
+    exist a weight change is a single matrix-vector product instead of a full
+    pipeline rerun. Column order matches the corresponding *_WEIGHTS dict.
+
+    Features are derived in float64 and stored in dtype; float32 halves the
+    memory for large tract tables, and scoring still accumulates in float64
+    (see numerics.py).
+    """
+    inputs = feature_inputs(cities_df)
+    return feature_matrices(inputs, feature_statistics(inputs), dtype)
+
+
+def feature_matrices(inputs, statistics, dtype=np.float64):
+    """
+    Feature matrices from raw inputs and the dataset statistics
+
+    Rows are independent once statistics are fixed, so any subset of rows -
+    or a hypothetical row - can be featurized against a full dataset's
+    statistics (see whatif.py).
+    """
+    population, income, home_value = inputs['population'], inputs['income'], inputs['home_value']
+    education, single_family = inputs['education'], inputs['single_family']
+    drive_alone, transit = inputs['drive_alone'], inputs['transit']
+    distance, substation_distance = inputs['distance'], inputs['substation_distance']
+    urban_class = inputs['urban_class']
+
+    # Readiness: income, education, home charging, market size, car dependency, access
+    readiness = np.column_stack([
+        np.minimum(income / MA_MEDIAN_INCOME, 1.0),
+        education / 100,
+        single_family / 100,
+        population / statistics['population'],
+        drive_alone / 100,
+        np.maximum(0.5, 1.0 - distance / 100)
+    ])
+
+    # Priority: economic, education, infrastructure, market size, transport
+    priority = np.column_stack([
+        (income / statistics['income']) * 0.6 + (home_value / statistics['home_value']) * 0.4,
+        education / 100,
+        (single_family / 100) * 0.6 + (1 - distance / statistics['distance']) * 0.4,
+        population / statistics['population'],
+        drive_alone / 100
+    ])
+
+    # Risk levels (1 = low, 3 = high) from the research thresholds
+    economic_risk = np.select([income < 50000, income < 75000], [3, 2], 1)
+    infrastructure_risk = np.minimum(
+        (single_family < 30).astype(int) + (distance > 40) + (urban_class == 'Urban Core') + 1, 3
+    )
+    demographic_risk = np.select([education < 25, education < 45], [3, 2], 1)
+    market_risk = np.select(
+        [(transit > 20) & (drive_alone < 50), (transit > 10) | (drive_alone < 70)], [3, 2], 1
+    )
+    risk = np.column_stack([economic_risk, infrastructure_risk, demographic_risk, market_risk])
+
+    # Charging: home charging, public charging potential, infrastructure access
+    charging = np.column_stack([
+        single_family / 100,
+        pd.Series(urban_class).map(URBAN_CHARGING_SCORES).to_numpy(dtype=float),
+        np.maximum(0.3, 1.0 - distance / 100)
+    ])
+
+    # Grid: economic capacity, proximity to transmission, demand headroom
+    grid = np.column_stack([
+        np.minimum(income / 100000, 1.0),
+        np.maximum(0.4, 1.0 - substation_distance / 100),
+        1 - np.minimum(population / 100000, 1.0)
+    ])
+
+    matrices = {
+        'population': population,
+        'readiness': readiness,
+        'priority': priority,
+        'risk': risk,
+        'charging': charging,
+        'grid': grid
+    }
+    # Risk levels stay integers
+    return {
+        name: matrix.astype(dtype, copy=False) if np.issubdtype(matrix.dtype, np.floating) else matrix
+        for name, matrix in matrices.items()
+    }
+
+
+def readiness_scores(features, weights=None):
+    """EV adoption readiness (capped at 1.0)"""
+    return np.minimum(weighted_sum(features['readiness'], weight_vector(weights, READINESS_WEIGHTS)), 1.0)
+
+
+def horizon_grid(start_year, end_year, periods_per_year=1):
+    """
+    Forecast time points from start_year to end_year inclusive
+
+    periods_per_year=1 gives annual integer years; 12 gives monthly points as
+    fractional years (2030.5 = July 2030), which the growth model handles
+    directly since the exponent is just elapsed time.
+    """
+    steps = int(round((end_year - start_year) * periods_per_year))
+    points = start_year + np.arange(steps + 1) / periods_per_year
+    return points.astype(int) if periods_per_year == 1 else points
+
+
+def forecast_matrix(current_evs, growth_rate, horizon, base_year=FORECAST_BASE_YEAR):
+    """
+    Dense (cities x time points) EV forecast for any horizon
+
+    One broadcasted power: current x (1 + growth) ^ (t - base_year). Values
+    are rounded to whole vehicles by largest remainder, so every time point's
+    city counts add up to the rounded real total instead of drifting low.
+    """
+    elapsed = np.asarray(horizon, dtype=float) - base_year
+    growth = np.power(1 + np.asarray(growth_rate, dtype=float)[:, None], elapsed[None, :])
+    return round_preserving_sum(np.asarray(current_evs)[:, None] * growth)
+
+
+def forecast_long(cities, horizon, forecast):
+    """Long/columnar form of a forecast matrix: one row per city and time point"""
+    n_cities, n_points = forecast.shape
+    return pd.DataFrame({
+        'City': np.repeat(np.asarray(cities), n_points),
+        'Year': np.tile(np.asarray(horizon), n_cities),
+        'EV_Forecast': forecast.ravel()
+    })
+
+
+def forecast_wide(long_df):
+    """
+    Dense form of a forecast_long table: (cities, horizon, cities x time points forecast)
+
+    The rows are city-major, so this is a reshape of the EV_Forecast column
+    (no copy); the horizon ends where the first city's years stop increasing.
+    """
+    years = long_df['Year'].to_numpy()
+    restarts = np.flatnonzero(np.diff(years) <= 0)
+    n_points = restarts[0] + 1 if len(restarts) else len(years)
+    return (long_df['City'].to_numpy()[::n_points], years[:n_points],
+            long_df['EV_Forecast'].to_numpy().reshape(-1, n_points))
+
+
+def allocation_counts(population, readiness, current_total, state_target,
+                      population_share=ALLOCATION_POPULATION_SHARE):
+    """
+    Allocation weights and whole-vehicle current and target counts per city
+
+    Returns (population weight, readiness weight, allocation weight, current
+    EVs, target share); allocate_forecasts adds the growth and forecasts.
+    """
+    population_weight = normalize(population)
+    readiness_weight = normalize(readiness)
+    allocation_weight = population_weight * population_share + readiness_weight * (1 - population_share)
+
+    # Whole-vehicle counts by largest remainder, so city totals sum exactly to
+    # the statewide figures. The target is capped at the 200% growth limit per
+    # city, with capped excess redistributed to the remaining cities; only an
+    # infeasible target (above 3x current EVs statewide) is left short.
+    current_evs = apportion(allocation_weight, int(current_total))
+    growth_caps = np.floor(current_evs * (1 + MAX_GROWTH_RATE))
+    target_share = apportion(allocation_weight, int(state_target), caps=growth_caps)
+    return population_weight, readiness_weight, allocation_weight, current_evs, target_share
+
+
+def allocate_forecasts(population, readiness, current_total, state_target,
+                       population_share=ALLOCATION_POPULATION_SHARE, forecast_years=FORECAST_YEARS,
+                       base_year=FORECAST_BASE_YEAR):
+    """
+    Allocate statewide EV totals to cities and project compound growth
+
+    Returns a dict of arrays: Population_Weight, Readiness_Weight,
+    Allocation_Weight, Current_EVs_Estimate, Target_Share_2025, Growth_Rate
+    and EV_Forecast_{year} for each report year. Longer or finer horizons
+    come from forecast_matrix with the same current estimate and growth rate.
+    """
+    population_weight, readiness_weight, allocation_weight, current_evs, target_share = allocation_counts(
+        population, readiness, current_total, state_target, population_share
+    )
+    growth_rate = growth_rates(current_evs, target_share)
+
+    result = {
+        'Population_Weight': population_weight,
+        'Readiness_Weight': readiness_weight,
+        'Allocation_Weight': allocation_weight,
+        'Current_EVs_Estimate': current_evs,
+        'Target_Share_2025': target_share,
+        'Growth_Rate': growth_rate
+    }
+    forecast = forecast_matrix(current_evs, growth_rate, forecast_years, base_year)
+    for j, year in enumerate(forecast_years):
+        result[f'EV_Forecast_{year}'] = forecast[:, j]
+
+    return result
+
+
+def growth_rates(current_evs, target_share):
+    """CAGR to reach the target in one year (within the cap), default 50% with no allocation"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(
+            current_evs > 0,
+            np.minimum(target_share / np.where(current_evs > 0, current_evs, 1) - 1, MAX_GROWTH_RATE),
+            0.5
+        )
+
+
+def priority_scores(features, weights=None):
+    """Weighted priority score"""
+    return weighted_sum(features['priority'], weight_vector(weights, PRIORITY_WEIGHTS))
+
+
+def risk_scores(features, weights=None):
+    """Overall risk score, kept on the 4-12 scale for any relative weighting"""
+    return weighted_sum(features['risk'], weight_vector(weights, RISK_WEIGHTS))
+
+
+def infrastructure_scores(features, charging_weights=None, grid_weights=None, infrastructure_weights=None):
+    """Charging score, grid capacity score and overall infrastructure readiness"""
+    charging = weighted_sum(features['charging'], weight_vector(charging_weights, CHARGING_WEIGHTS))
+    grid = np.minimum(weighted_sum(features['grid'], weight_vector(grid_weights, GRID_WEIGHTS)), 1.0)
+
+    split = weight_vector(infrastructure_weights, INFRASTRUCTURE_WEIGHTS)
+    readiness = charging * split[0] + grid * split[1]
+
+    return charging, grid, readiness
+
+
+def categorize_risk(score):
+    """Vectorized risk category (>=10 High, >=7 Medium, else Low)"""
+    return np.select([score >= 10, score >= 7], ['High Risk', 'Medium Risk'], 'Low Risk')
+
+
+def categorize_infrastructure(score):
+    """Vectorized infrastructure readiness category (>=0.75 High, >=0.5 Medium, else Low)"""
+    return np.select([score >= 0.75, score >= 0.5], ['High Readiness', 'Medium Readiness'], 'Low Readiness')
+
+
+def investment_priority(readiness, forecast_2029, max_forecast_2029):
+    """60% readiness gap (1 - readiness) + 40% 2029 demand relative to the largest city"""
+    return (1 - readiness) * 0.6 + (forecast_2029 / max_forecast_2029) * 0.4
+
+
+def categorize_investment(readiness, forecast_2029):
+    """Vectorized investment category (low readiness < 0.5, high demand > 2,000 EVs)"""
+    readiness_gap = readiness < 0.5
+    high_demand = forecast_2029 > 2000
+    return np.select(
+        [readiness_gap & high_demand, readiness_gap, high_demand],
+        ["Critical - High Demand, Low Readiness", "High Priority - Low Readiness", "Medium Priority - High Demand"],
+        "Low Priority - Adequate Readiness"
+    )
+
+
+# ---------------------------------------------------------------------------
+# The stage formulas one city at a time, as written before the stages were
+# vectorized: the audit reference of regression_check.py and the row-wise
+# .apply path timed by kernels.py.
+# ---------------------------------------------------------------------------
+
+def city_readiness(row, max_population):
+    income_factor = min(row['Median_Income'] / 101341, 1.0)
+    education_factor = row['Bachelor_Degree_Pct'] / 100
+    infrastructure_factor = row['Single_Family_Pct'] / 100
+    market_factor = row['Population_2024'] / max_population
+    transport_factor = row['Drive_Alone_Pct'] / 100
+    distance_factor = max(0.5, 1.0 - (row['Distance_from_Boston'] / 100))
+    readiness_score = (
+        income_factor * 0.25 +
+        education_factor * 0.25 +
+        infrastructure_factor * 0.20 +
+        market_factor * 0.15 +
+        transport_factor * 0.10 +
+        distance_factor * 0.05
+    )
+    return min(readiness_score, 1.0)
+
+
+def city_economic_risk(income):
+    if income < 50000:
+        return 3
+    elif income < 75000:
+        return 2
+    return 1
+
+
+def city_infrastructure_risk(single_family_pct, distance, urban_class):
+    risk_score = 0
+    if single_family_pct < 30:
+        risk_score += 1
+    if distance > 40:
+        risk_score += 1
+    if urban_class == 'Urban Core':
+        risk_score += 1
+    return min(risk_score + 1, 3)
+
+
+def city_demographic_risk(education_pct):
+    if education_pct < 25:
+        return 3
+    elif education_pct < 45:
+        return 2
+    return 1
+
+
+def city_market_risk(transit_pct, drive_alone_pct):
+    if transit_pct > 20 and drive_alone_pct < 50:
+        return 3
+    elif transit_pct > 10 or drive_alone_pct < 70:
+        return 2
+    return 1
+
+
+def city_charging_score(row):
+    home_charging_score = row['Single_Family_Pct'] / 100
+    urban_charging_score = {'Urban Core': 0.9, 'Urban': 0.7, 'Suburban': 0.5}[row['Urban_Classification']]
+    distance_score = max(0.3, 1.0 - (row['Distance_from_Boston'] / 100))
+    return home_charging_score * 0.4 + urban_charging_score * 0.4 + distance_score * 0.2
+
+
+def city_grid_capacity(row):
+    pop_demand = row['Population_2024'] / 100000
+    economic_capacity = min(row['Median_Income'] / 100000, 1.0)
+    distance_factor = max(0.4, 1.0 - (row['Distance_from_Boston'] / 100))
+    grid_readiness = economic_capacity * 0.5 + distance_factor * 0.3 + (1 - min(pop_demand, 1.0)) * 0.2
+    return min(grid_readiness, 1.0)
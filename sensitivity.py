@@ -0,0 +1,209 @@
+import numpy as np
+import pandas as pd
+
+from scoring import PRIORITY_WEIGHTS, weight_vector
+
+
+def _weight_vector(weights):
+    """Return factor names and weight vector for a weights mapping"""
+    return list(PRIORITY_WEIGHTS.keys()), weight_vector(weights, PRIORITY_WEIGHTS)
+
+
+def renormalized_directions(w):
+    """
+    Sum-preserving perturbation directions for each weight
+
+    Column k is the direction in which weight k grows by one unit while the
+    remaining weights shrink in proportion to their current share, so the
+    weights keep summing to the same total:
+
+        u_k = e_k - w_(-k) / (total - w_k)
+    """
+    k = len(w)
+    total = w.sum()
+    others = np.tile(w[:, None], (1, k))
+    np.fill_diagonal(others, 0.0)
+    denom = total - w
+    # A weight that already holds the whole total has nothing to trade against
+    denom = np.where(denom > 0, denom, np.inf)
+    return np.eye(k) - others / denom[None, :]
+
+
+def priority_score_gradient(priority_df, weights=None, renormalize=False):
+    """
+    Exact gradient of Priority_Score with respect to each factor weight
+
+    Priority_Score is linear in the weights, so the partial derivative with
+    respect to weight k is simply the factor score k for that city.
+
+    With renormalize=True the derivatives are taken along the sum-preserving
+    directions from renormalized_directions, i.e. the rate of change when one
+    weight rises and the others give way proportionally.
+    """
+    factors, w = _weight_vector(weights)
+    F = priority_df[factors].to_numpy(dtype=float)
+
+    if renormalize:
+        F = F @ renormalized_directions(w)
+
+    return pd.DataFrame(F, index=priority_df.index, columns=[f'dScore_d_{f}' for f in factors])
+
+
+def min_feasible_shift(D, gaps, w):
+    """
+    Smallest sum-preserving weight change that closes each score gap while
+    every weight stays non-negative
+
+    Rows of D are factor differences and gaps their scores at w. The optimum
+    sets some weights to zero and, on the rest, is the minimum-norm change in
+    the span of the ones vector and the factor difference (both equality
+    constraints). Every subset of zeroed weights (2^k of them, k factors) is
+    solved for all pairs at once and the shortest non-negative candidate is
+    kept, so the cost is O(n * 2^k * k). Returns (shift norms, shifts);
+    infinite (and NaN shifts) where no non-negative weights close the gap.
+    """
+    n, k = D.shape
+    best = np.full(n, np.inf)
+    best_delta = np.full((n, k), np.nan)
+    scale = np.maximum(np.abs(D).max(axis=1), np.finfo(float).tiny) * max(w.sum(), np.finfo(float).tiny)
+    for mask in range(2 ** k - 1):
+        zero = np.array([(mask >> j) & 1 for j in range(k)], dtype=bool)
+        free = ~zero
+        D_free = D[:, free]
+        m = free.sum()
+        # Change of the free weights: sums to the zeroed weights and closes the gap
+        s = w[zero].sum()
+        r = -gaps + D[:, zero] @ w[zero]
+        a = D_free.sum(axis=1)
+        b = (D_free * D_free).sum(axis=1)
+        det = m * b - a * a
+        solvable = det > 1e-12 * np.maximum(m * b, np.finfo(float).tiny)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            alpha = np.where(solvable, (s * b - a * r) / det, s / m)
+            beta = np.where(solvable, (m * r - a * s) / det, 0.0)
+        # Without a solvable system the even split must close the gap by itself
+        consistent = solvable | (np.abs(a * s / m - r) <= 1e-12 * scale)
+        delta = np.zeros((n, k))
+        delta[:, zero] = -w[zero]
+        delta[:, free] = alpha[:, None] + beta[:, None] * D_free
+        norms = np.linalg.norm(delta, axis=1)
+        feasible = consistent & (delta[:, free] >= -w[free] - 1e-12).all(axis=1) & (norms < best)
+        best = np.where(feasible, norms, best)
+        best_delta[feasible] = delta[feasible]
+    return best, best_delta
+
+
+def adjacent_swap_perturbations(F, w):
+    """
+    Weight perturbations at which adjacent cities swap rank
+
+    Parameters are the (cities x factors) factor matrix and the weight vector.
+    Cities are ordered by score (highest first) and every adjacent pair is
+    examined at once:
+
+    - Per-weight swap: change in weight k (others renormalized) at which the
+      score gap closes. Infinite when no feasible change (weight staying in
+      [0, total]) closes the gap.
+    - Minimum shift: smallest L2 change of the weight vector, keeping the sum
+      fixed and every weight non-negative, that closes the gap. Without the
+      bound it is |gap| / ||projected factor difference||; when that change
+      would drive a weight negative, min_feasible_shift solves the bounded
+      problem. Infinite when no non-negative weights close the gap.
+
+    Cost is O(n log n) for the sort plus O(n * k^2) for the swap solve and
+    O(n * 2^k * k) for the bounded shifts, so it stays vectorized for
+    thousands of cities.
+    """
+    F = np.asarray(F, dtype=float)
+    w = np.asarray(w, dtype=float)
+
+    scores = F @ w
+    order = np.argsort(-scores, kind='stable')
+    F_sorted = F[order]
+
+    # Factor differences and score gaps between each city and the next one down
+    D = F_sorted[:-1] - F_sorted[1:]
+    gaps = D @ w
+
+    # Directional slope of each gap along every sum-preserving weight direction
+    slopes = D @ renormalized_directions(w)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        swap_delta = -gaps[:, None] / slopes
+
+    # Only perturbations that keep the perturbed weight inside [0, total] count
+    total = w.sum()
+    feasible = (slopes != 0) & (swap_delta >= -w[None, :]) & (swap_delta <= (total - w)[None, :])
+    swap_delta = np.where(feasible, swap_delta, np.inf)
+    swap_delta = np.where(gaps[:, None] == 0, 0.0, swap_delta)
+
+    # Minimum-norm shift within the plane of constant weight total
+    D_projected = D - D.mean(axis=1, keepdims=True)
+    norms = np.linalg.norm(D_projected, axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        min_shift = np.where(norms > 0, np.abs(gaps) / norms, np.inf)
+        unbounded = w[None, :] - D_projected * (gaps / norms ** 2)[:, None]
+    # Where that change drives a weight negative, solve with the bound
+    bounded = np.isfinite(min_shift) & (unbounded < 0).any(axis=1)
+    if bounded.any():
+        min_shift[bounded] = min_feasible_shift(D[bounded], gaps[bounded], w)[0]
+    min_shift = np.where(gaps == 0, 0.0, min_shift)
+
+    return order, scores, gaps, swap_delta, min_shift
+
+
+def rank_stability_table(priority_df, weights=None, top_n=5):
+    """
+    Rank-stability table for adjacent cities in the priority ranking
+
+    One row per adjacent pair (rank r vs rank r + 1) with the score gap, the
+    weight change per factor that would swap the pair, the smallest overall
+    weight shift that swaps it and the weight the pair is most sensitive to.
+    Swap values are absolute weight changes (0.05 = five percentage points).
+    """
+    factors, w = _weight_vector(weights)
+    F = priority_df[factors].to_numpy(dtype=float)
+    cities = priority_df['City'].to_numpy()
+
+    order, scores, gaps, swap_delta, min_shift = adjacent_swap_perturbations(F, w)
+
+    abs_delta = np.abs(swap_delta)
+    most_sensitive = np.argmin(abs_delta, axis=1)
+    has_swap = np.isfinite(abs_delta).any(axis=1)
+
+    table = pd.DataFrame({
+        'Rank': np.arange(1, len(order)),
+        'City': cities[order[:-1]],
+        'Next_City': cities[order[1:]],
+        'Score_Gap': gaps
+    })
+    for j, factor in enumerate(factors):
+        table[f'Swap_Delta_{factor}'] = swap_delta[:, j]
+    table['Min_Weight_Shift'] = min_shift
+    table['Most_Sensitive_Weight'] = np.where(has_swap, np.asarray(factors)[most_sensitive], 'None')
+    table['Top_N_Boundary'] = table['Rank'] == top_n
+
+    return table
+
+
+def city_rank_stability(priority_df, weights=None):
+    """
+    Per-city stability margin: smallest weight shift that moves the city
+    past either neighbour in the ranking
+    """
+    factors, w = _weight_vector(weights)
+    F = priority_df[factors].to_numpy(dtype=float)
+
+    order, scores, gaps, swap_delta, min_shift = adjacent_swap_perturbations(F, w)
+
+    # Each city is bounded by the pair above it and the pair below it
+    margin_above = np.concatenate([[np.inf], min_shift])
+    margin_below = np.concatenate([min_shift, [np.inf]])
+    margin = np.minimum(margin_above, margin_below)
+
+    result = pd.DataFrame({
+        'City': priority_df['City'].to_numpy()[order],
+        'Priority_Score': scores[order],
+        'Position': np.arange(1, len(order) + 1),
+        'Stability_Margin': margin
+    })
+    return result
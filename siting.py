@@ -0,0 +1,130 @@
+import heapq
+import math
+
+import numpy as np
+import pandas as pd
+
+# Public charger planning assumptions (per port)
+# - EVs served: ratio of EVs to public ports in NREL "The 2030 National Charging
+#   Network" (2023) - about 33M EVs supported by ~1.07M public Level 2 ports and
+#   ~182k DC fast ports
+# - Power: typical Level 2 (7.2 kW) and NEVI-compliant DC fast (150 kW) ratings
+CHARGER_TYPES = {
+    'Level_2': {'kw': 7.2, 'evs_served': 30},
+    'DC_Fast': {'kw': 150.0, 'evs_served': 180}
+}
+
+# Default budget (ports) and grid headroom a city with Grid_Capacity_Score 1.0 can host
+LEVEL2_BUDGET = 2000
+DC_FAST_BUDGET = 200
+GRID_KW_PER_SCORE = 10000
+
+
+def coverage(demand, installed):
+    """EVs covered by installed service capacity: D * (1 - exp(-S / D))"""
+    demand = np.asarray(demand, dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        covered = demand * -np.expm1(-np.asarray(installed, dtype=float) / demand)
+    return np.where(demand > 0, covered, 0.0)
+
+
+def lazy_greedy_allocation(demand, capacity_kw, budgets, charger_types=CHARGER_TYPES):
+    """
+    Allocate a fixed number of chargers of each type across candidate sites
+
+    Objective: maximize EVs covered. A site with demand D and installed
+    service capacity S (sum of evs_served over its chargers) covers
+    D * (1 - exp(-S / D)) EVs - close to S while chargers are scarce, and
+    saturating at D as ports start to overlap. Every charger type has its own
+    port budget, and each site can host chargers only up to its grid capacity
+    (kW). Coverage is concave per site, so the greedy rule - always place the
+    charger with the largest marginal coverage - is the classic choice.
+
+    Lazy evaluation: marginal gains only ever shrink (installed capacity only
+    grows, grid headroom only goes down), so stale heap entries are upper
+    bounds. The top entry is re-evaluated on pop and pushed back if its gain
+    dropped; only the chosen site ever changes, so each placement costs
+    O(log sites) and the optimizer scales to thousands of candidate sites.
+
+    Returns (allocation, covered): an int (sites x types) array of chargers
+    per site and type, and EVs covered per site.
+    """
+    demand = np.asarray(demand, dtype=float)
+    capacity_kw = np.asarray(capacity_kw, dtype=float)
+    types = list(charger_types)
+    kw = np.array([charger_types[t]['kw'] for t in types], dtype=float)
+    served = np.array([charger_types[t]['evs_served'] for t in types], dtype=float)
+    remaining_budget = np.array([int(budgets.get(t, 0)) for t in types])
+
+    n = len(demand)
+    demand = np.maximum(demand, 0.0)
+    allocation = np.zeros((n, len(types)), dtype=np.int64)
+    installed = np.zeros(n)
+    remaining_kw = np.maximum(capacity_kw, 0.0).copy()
+
+    def gain(site, j):
+        d = demand[site]
+        if d <= 0:
+            return 0.0
+        return d * (math.exp(-installed[site] / d) - math.exp(-(installed[site] + served[j]) / d))
+
+    # Max-heap via negated gains; ties go to the earlier type, then the earlier site
+    heap = [
+        (-gain(site, j), j, site)
+        for j in range(len(types)) if remaining_budget[j] > 0
+        for site in range(n) if demand[site] > 0 and kw[j] <= remaining_kw[site]
+    ]
+    heapq.heapify(heap)
+
+    while heap and remaining_budget.any():
+        negative_gain, j, site = heapq.heappop(heap)
+        if remaining_budget[j] == 0 or kw[j] > remaining_kw[site]:
+            continue  # Type exhausted or site out of headroom - never feasible again
+
+        current = gain(site, j)
+        if current <= 0:
+            continue
+        if current < -negative_gain:
+            heapq.heappush(heap, (-current, j, site))
+            continue
+
+        # Still the best option: place it and queue the next charger at this site
+        allocation[site, j] += 1
+        remaining_budget[j] -= 1
+        installed[site] += served[j]
+        remaining_kw[site] -= kw[j]
+        heapq.heappush(heap, (-gain(site, j), j, site))
+
+    return allocation, coverage(demand, installed)
+
+
+def charger_allocation_table(infra_df, level2_budget=LEVEL2_BUDGET, dc_fast_budget=DC_FAST_BUDGET,
+                             grid_kw_per_score=GRID_KW_PER_SCORE, demand_column='EV_Forecast_2025'):
+    """
+    Per-city charger siting plan from the infrastructure assessment
+
+    Demand is the city's forecast EV count and grid capacity is
+    Grid_Capacity_Score x grid_kw_per_score. Works for any frame with City,
+    Grid_Capacity_Score and the demand column, e.g. tract-level candidates.
+    """
+    demand = infra_df[demand_column].to_numpy(dtype=float)
+    capacity_kw = infra_df['Grid_Capacity_Score'].to_numpy(dtype=float) * grid_kw_per_score
+
+    allocation, covered = lazy_greedy_allocation(
+        demand, capacity_kw, {'Level_2': level2_budget, 'DC_Fast': dc_fast_budget}
+    )
+    kw = np.array([spec['kw'] for spec in CHARGER_TYPES.values()])
+    charger_kw = allocation @ kw
+
+    table = pd.DataFrame({'City': infra_df['City'].to_numpy()})
+    for j, charger_type in enumerate(CHARGER_TYPES):
+        table[f'{charger_type}_Chargers'] = allocation[:, j]
+    table['Charger_kW'] = charger_kw
+    table['Grid_Capacity_kW'] = capacity_kw
+    table['Grid_Utilization'] = np.divide(charger_kw, capacity_kw, out=np.zeros_like(charger_kw),
+                                          where=capacity_kw > 0)
+    table['EV_Demand'] = demand
+    table['EVs_Covered'] = covered
+    table['Coverage_Pct'] = np.divide(covered, demand, out=np.zeros_like(covered), where=demand > 0) * 100
+
+    return table.sort_values(['EVs_Covered', 'City'], ascending=[False, True]).reset_index(drop=True)
@@ -0,0 +1,223 @@
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from datasets import CITY_COLUMNS
+
+# Rows generated (and written as one Parquet row group) at a time
+CHUNK_ROWS = 250000
+
+# Ordered urban classes: the latent variable behind Urban_Classification
+URBAN_CLASSES = ['Suburban', 'Urban', 'Urban Core']
+
+# Numeric columns and the transform under which each is modelled as normal
+# - log: skewed positive amounts (population, income, home value)
+# - logit: shares bounded by 0 and 100 percent
+# - sqrt: distances, which start at 0 (Boston itself) and are right-skewed
+TRANSFORMS = {
+    'Population_2024': 'log',
+    'Median_Income': 'log',
+    'Bachelor_Degree_Pct': 'logit',
+    'Drive_Alone_Pct': 'logit',
+    'Single_Family_Pct': 'logit',
+    'Median_Home_Value': 'log',
+    'Public_Transit_Pct': 'logit',
+    'Distance_from_Boston': 'sqrt'
+}
+
+# Percent columns keep one decimal, like the Census tables
+PERCENT_PLACES = 1
+
+# Keeps logit finite for 0% / 100% shares
+PERCENT_EPSILON = 0.05
+
+# Latent draws are truncated at this many standard deviations, so a 10M-row
+# table does not produce implausible extremes (e.g. 3,000-mile distances)
+TRUNCATE_SD = 3.0
+
+
+def _forward(values, transform):
+    values = np.asarray(values, dtype=float)
+    if transform == 'log':
+        return np.log(values)
+    if transform == 'sqrt':
+        return np.sqrt(values)
+    share = np.clip(values, PERCENT_EPSILON, 100 - PERCENT_EPSILON) / 100
+    return np.log(share / (1 - share))
+
+
+def _inverse(values, transform):
+    if transform == 'log':
+        return np.exp(values)
+    if transform == 'sqrt':
+        return np.square(np.maximum(values, 0))
+    return 100 / (1 + np.exp(-values))
+
+
+def _normal_scores(codes):
+    """Normal scores of ordinal codes (midpoint of each class's probability band)"""
+    from statistics import NormalDist
+
+    counts = np.bincount(codes, minlength=len(URBAN_CLASSES))
+    upper = np.cumsum(counts) / len(codes)
+    lower = upper - counts / len(codes)
+    midpoints = [NormalDist().inv_cdf(min(max((lo + hi) / 2, 1e-6), 1 - 1e-6)) for lo, hi in zip(lower, upper)]
+    return np.asarray(midpoints)[codes]
+
+
+class CityModel:
+    """
+    Gaussian model of the city table, fitted to real rows
+
+    Each numeric column is mapped to an unbounded scale (TRANSFORMS) and
+    the mapped columns are modelled as jointly normal: per-column mean and
+    standard deviation carry the marginals, and one correlation matrix
+    carries the dependencies (income vs home value, transit vs drive-alone,
+    urban class vs single-family share, ...). Urban_Classification enters
+    as a latent normal cut at the observed class shares, so it correlates
+    with the numeric columns like an ordinal variable.
+
+    Sampling is one Cholesky product per chunk, so any number of rows is
+    generated without loops over rows.
+    """
+
+    def __init__(self, cities_df):
+        columns = list(TRANSFORMS)
+        latent = [_forward(cities_df[column], TRANSFORMS[column]) for column in columns]
+
+        codes = cities_df['Urban_Classification'].map({name: i for i, name in enumerate(URBAN_CLASSES)})
+        codes = codes.to_numpy(dtype=np.int64)
+        latent.append(_normal_scores(codes))
+
+        latent = np.column_stack(latent)
+        self.columns = columns
+        self.mean = latent.mean(axis=0)
+        self.std = latent.std(axis=0, ddof=1)
+        self.correlation = np.corrcoef(latent, rowvar=False)
+
+        # Class cut points on the standard normal latent scale
+        from statistics import NormalDist
+        shares = np.cumsum(np.bincount(codes, minlength=len(URBAN_CLASSES)))[:-1] / len(codes)
+        self.urban_cuts = np.asarray([NormalDist().inv_cdf(min(max(share, 1e-6), 1 - 1e-6)) for share in shares])
+
+        # Small ridge keeps the factorization defined for near-collinear columns
+        ridge = 1e-9 * np.eye(len(self.correlation))
+        self.cholesky = np.linalg.cholesky(self.correlation + ridge)
+        self.dtypes = cities_df[CITY_COLUMNS].dtypes
+
+    def sample(self, n, rng, first_id=0, population_scale=1.0):
+        """n synthetic rows with the CITY_COLUMNS schema"""
+        z = rng.standard_normal((n, len(self.mean))) @ self.cholesky.T
+        latent = self.mean + np.clip(z, -TRUNCATE_SD, TRUNCATE_SD) * self.std
+
+        df = pd.DataFrame({'City': np.char.add('Synthetic_', np.arange(first_id, first_id + n).astype(str))})
+        for j, column in enumerate(self.columns):
+            values = _inverse(latent[:, j], TRANSFORMS[column])
+            if column == 'Population_2024':
+                values = np.maximum(values * population_scale, 1)
+            if TRANSFORMS[column] == 'logit':
+                values = np.round(values, PERCENT_PLACES)
+            df[column] = np.rint(values) if np.issubdtype(self.dtypes[column], np.integer) else values
+
+        urban = np.searchsorted(self.urban_cuts, z[:, -1])
+        df['Urban_Classification'] = np.asarray(URBAN_CLASSES, dtype=object)[urban]
+        return df[CITY_COLUMNS].astype(self.dtypes.to_dict())
+
+
+def generate_chunks(model, rows, seed=0, chunk_rows=CHUNK_ROWS, population_scale=1.0):
+    """
+    Yield synthetic rows chunk by chunk
+
+    Chunk i draws from its own generator seeded with (seed, i), so a given
+    seed and chunk size always produce the same table, and any chunk can be
+    regenerated on its own.
+    """
+    for index, start in enumerate(range(0, rows, chunk_rows)):
+        rng = np.random.default_rng([seed, index])
+        yield model.sample(min(chunk_rows, rows - start), rng, first_id=start, population_scale=population_scale)
+
+
+def write_parquet(model, path, rows, seed=0, chunk_rows=CHUNK_ROWS, population_scale=1.0):
+    """Stream a synthetic table to Parquet, one row group per chunk; returns the row count"""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    writer = None
+    written = 0
+    try:
+        for chunk in generate_chunks(model, rows, seed, chunk_rows, population_scale):
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(tmp_path, table.schema, compression='zstd')
+            writer.write_table(table)
+            written += len(chunk)
+    finally:
+        if writer is not None:
+            writer.close()
+    os.replace(tmp_path, path)
+    return written
+
+
+def correlation_report(real_df, synthetic_df):
+    """Real vs synthetic rank correlation for the key column pairs, and marginal medians"""
+    pairs = [
+        ('Median_Income', 'Median_Home_Value'),
+        ('Public_Transit_Pct', 'Drive_Alone_Pct'),
+        ('Urban_Classification', 'Single_Family_Pct'),
+        ('Median_Income', 'Bachelor_Degree_Pct')
+    ]
+
+    def ranked(df, column):
+        values = df[column]
+        if column == 'Urban_Classification':
+            values = values.map({name: i for i, name in enumerate(URBAN_CLASSES)})
+        return values.rank()  # Spearman = Pearson on ranks
+
+    rows = []
+    for left, right in pairs:
+        rows.append({
+            'Pair': f'{left} ~ {right}',
+            'Real': ranked(real_df, left).corr(ranked(real_df, right)),
+            'Synthetic': ranked(synthetic_df, left).corr(ranked(synthetic_df, right))
+        })
+    medians = pd.DataFrame({
+        'Column': list(TRANSFORMS),
+        'Real_Median': [real_df[column].median() for column in TRANSFORMS],
+        'Synthetic_Median': [synthetic_df[column].median() for column in TRANSFORMS]
+    })
+    return pd.DataFrame(rows), medians
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic city table matching the built-in schema")
+    parser.add_argument('out_path', help="Parquet file to write")
+    parser.add_argument('--rows', type=int, default=1000000, help="Rows to generate (1k to 10M+)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS, help="Rows per chunk / row group")
+    parser.add_argument('--population-scale', type=float, default=1.0,
+                        help="Population multiplier (e.g. 0.04 for tract-sized units)")
+    args = parser.parse_args()
+
+    # Fitted to the built-in 20-city table
+    import app
+    real_df = app.load_authentic_massachusetts_cities_complete()
+    model = CityModel(real_df)
+
+    start = time.perf_counter()
+    rows = write_parquet(model, args.out_path, args.rows, args.seed, args.chunk_rows, args.population_scale)
+    elapsed = time.perf_counter() - start
+    print(f"wrote {rows:,} rows to {args.out_path} in {elapsed:.2f}s "
+          f"({os.path.getsize(args.out_path) / 2 ** 20:.1f} MB)")
+
+    sample = next(generate_chunks(model, min(args.rows, args.chunk_rows), args.seed, args.chunk_rows))
+    correlations, medians = correlation_report(real_df, sample)
+    print(correlations.round(3).to_string(index=False))
+    print(medians.round(1).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+
+
+class TableIndex:
+    """
+    Server-side view over a result table: filter, sort and page without
+    re-sorting or shipping the full frame
+
+    Built once per table. Sort permutations are computed the first time a
+    column/direction is requested and kept, filter columns are stored as
+    categorical codes and the search column is lower-cased up front, so a
+    page request is an O(n) mask over a cached permutation plus a slice of
+    page_size rows.
+    """
+
+    def __init__(self, df, search_column='City', filter_columns=()):
+        self.df = df.reset_index(drop=True)
+        self.search_column = search_column
+        self._search = None
+        if search_column in self.df.columns:
+            self._search = self.df[search_column].astype(str).str.lower()
+        self._categories = {
+            column: pd.Categorical(self.df[column]) for column in filter_columns if column in self.df.columns
+        }
+        self._permutations = {}
+
+    def __len__(self):
+        return len(self.df)
+
+    @property
+    def filter_columns(self):
+        return list(self._categories)
+
+    def options(self, column):
+        """Distinct values available for a filter column"""
+        return list(self._categories[column].categories)
+
+    def permutation(self, column, ascending=True):
+        """Row order for a column (stable, missing values last), cached per direction"""
+        key = (column, bool(ascending))
+        if key not in self._permutations:
+            order = self.df[column].sort_values(ascending=ascending, kind='stable', na_position='last')
+            self._permutations[key] = order.index.to_numpy()
+        return self._permutations[key]
+
+    def mask(self, filters=None, search=''):
+        """Rows matching every filter ({column: allowed values}) and the search text"""
+        mask = np.ones(len(self.df), dtype=bool)
+        for column, values in (filters or {}).items():
+            if column in self._categories and values:
+                categorical = self._categories[column]
+                allowed = categorical.categories.get_indexer(list(values))
+                mask &= np.isin(categorical.codes, allowed[allowed >= 0])
+        if search and self._search is not None:
+            mask &= self._search.str.contains(search.strip().lower(), regex=False).to_numpy()
+        return mask
+
+    def select(self, sort_column=None, ascending=True, filters=None, search=''):
+        """Row positions matching the filters, in sort order"""
+        order = self.permutation(sort_column, ascending) if sort_column else np.arange(len(self.df))
+        if filters or search:
+            order = order[self.mask(filters, search)[order]]
+        return order
+
+    def page(self, order, page=1, page_size=25):
+        """Rows of one 1-based page of a select() result (page clamped to the last page)"""
+        pages = max(1, -(-len(order) // page_size))
+        start = (min(max(int(page), 1), pages) - 1) * page_size
+        return self.df.iloc[order[start:start + page_size]]
+
+    def query(self, sort_column=None, ascending=True, filters=None, search='', page=1, page_size=25):
+        """One page of the filtered, sorted table, plus the number of matching rows"""
+        order = self.select(sort_column, ascending, filters, search)
+        return self.page(order, page, page_size), len(order)
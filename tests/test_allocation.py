@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+
+from allocation import apportion, hierarchical_apportion, round_preserving_sum
+
+
+def test_apportion_splits_proportionally_with_exact_total():
+    assert apportion([1, 2, 3, 4], 100).tolist() == [10, 20, 30, 40]
+    counts = apportion([1, 1, 1], 10)
+    assert counts.sum() == 10
+    assert counts.tolist() == [4, 3, 3]
+
+
+def test_apportion_ties_go_to_the_lower_index():
+    assert apportion([1, 1, 1, 1], 2).tolist() == [1, 1, 0, 0]
+    # Equal weights whose shares differ only by rounding noise still tie
+    weights = np.array([0.1 + 0.2, 0.3, 0.3])
+    assert apportion(weights, 1).tolist() == [1, 0, 0]
+
+
+def test_apportion_redistributes_over_the_caps():
+    counts = apportion([10, 1, 1], 30, caps=[5, 100, 100])
+    assert counts.tolist() == [5, 13, 12]
+
+
+def test_apportion_spreads_the_rest_over_zero_weight_items():
+    assert apportion([1, 0, 0], 10, caps=[2, 100, 100]).tolist() == [2, 4, 4]
+    assert apportion([1, 0, 0], 10, caps=[2, 3, 100]).tolist() == [2, 3, 5]
+
+
+def test_apportion_stops_at_the_sum_of_the_caps():
+    assert apportion([1, 0, 2], 300, caps=[2, 3, 100]).tolist() == [2, 3, 100]
+
+
+def test_apportion_zero_weight_group_splits_evenly():
+    counts = apportion([0, 0, 0, 2, 1], [7, 3], groups=[0, 0, 0, 1, 1])
+    assert counts.tolist() == [3, 2, 2, 2, 1]
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_apportion_random_groups_with_caps(seed):
+    rng = np.random.default_rng(seed)
+    n, n_groups = 200, 7
+    groups = rng.integers(0, n_groups, n)
+    weights = rng.lognormal(0, 2, n) * (rng.random(n) > 0.3)
+    caps = rng.integers(0, 30, n)
+    totals = rng.integers(0, 600, n_groups)
+
+    counts = apportion(weights, totals, groups=groups, caps=caps)
+
+    assert counts.dtype == np.int64
+    assert (counts >= 0).all()
+    assert (counts <= caps).all()
+    group_caps = np.bincount(groups, weights=caps, minlength=n_groups)
+    np.testing.assert_array_equal(np.bincount(groups, weights=counts, minlength=n_groups),
+                                  np.minimum(totals, group_caps))
+
+
+def test_hierarchical_apportion_sums_down_every_level():
+    rng = np.random.default_rng(0)
+    n_towns, n_tracts = 30, 400
+    tract_town = np.sort(rng.integers(0, n_towns, n_tracts))
+    towns, tracts = hierarchical_apportion(
+        5000, [(rng.lognormal(5, 1, n_towns), None), (rng.lognormal(3, 1, n_tracts), tract_town)]
+    )
+    assert towns.sum() == 5000
+    np.testing.assert_array_equal(np.bincount(tract_town, weights=tracts, minlength=n_towns), towns)
+
+
+def test_hierarchical_apportion_respects_caps():
+    towns, tracts = hierarchical_apportion(100, [([1, 1], None), ([5, 1, 1, 1], [0, 0, 1, 1], [10, 100, 100, 100])])
+    assert towns.tolist() == [50, 50]
+    assert tracts.tolist() == [10, 40, 25, 25]
+
+
+def test_round_preserving_sum_keeps_column_totals():
+    values = np.random.default_rng(2).random((50, 4)) * 10
+    rounded = round_preserving_sum(values)
+    np.testing.assert_array_equal(rounded.sum(axis=0), np.rint(values.sum(axis=0)))
+    assert (np.abs(rounded - values) < 1).all()
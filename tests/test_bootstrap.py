@@ -0,0 +1,31 @@
+import numpy as np
+
+from bootstrap import MAX_RANK_CELLS, REPLICATES, rank_distribution, replicates_for
+
+
+def random_ranks(replicates, n, seed=0):
+    rng = np.random.default_rng(seed)
+    return np.argsort(rng.random((replicates, n)), axis=1).argsort(axis=1) + 1
+
+
+def test_rank_distribution_counts_leading_ranks_of_chosen_cities():
+    ranks = random_ranks(400, 12)
+    cities = np.array([3, 0, 7])
+    distribution = rank_distribution(ranks, cities, max_rank=5)
+    assert distribution.shape == (3, 5)
+    for row, city in enumerate(cities):
+        for rank in range(1, 6):
+            assert distribution[row, rank - 1] == np.mean(ranks[:, city] == rank)
+
+
+def test_full_rank_distribution_rows_sum_to_one():
+    distribution = rank_distribution(random_ranks(50, 8), max_rank=8)
+    assert distribution.shape == (8, 8)
+    np.testing.assert_allclose(distribution.sum(axis=1), 1.0)
+    np.testing.assert_allclose(distribution.sum(axis=0), 1.0)
+
+
+def test_replicates_shrink_with_table_size():
+    assert replicates_for(20) == REPLICATES
+    assert replicates_for(5000) * 5000 <= MAX_RANK_CELLS
+    assert replicates_for(10 ** 7) == 100
@@ -0,0 +1,30 @@
+import os
+
+import numpy as np
+
+from load_simulation import open_hourly_load, prune_hourly_loads, simulate_hourly_load
+
+
+def write_load(directory, name):
+    path = os.path.join(directory, f'hourly-{name}.npy')
+    simulate_hourly_load(np.ones((2, 1)), np.full(2, 0.5), [2025], np.full(2, 100.0), path)
+    return path
+
+
+def test_prune_keeps_the_most_recently_used_files(tmp_path):
+    paths = [write_load(tmp_path, name) for name in 'abcd']
+    for age, path in enumerate(reversed(paths)):
+        os.utime(path, (1000 - age, 1000 - age))
+    # Reading the oldest file makes it the most recently used
+    open_hourly_load(paths[0])
+
+    deleted = prune_hourly_loads(tmp_path, keep=2)
+
+    assert sorted(deleted) == sorted([paths[1], paths[2]])
+    assert sorted(os.listdir(tmp_path)) == sorted(
+        name for path in (paths[0], paths[3]) for name in (os.path.basename(path), os.path.basename(path) + '.json')
+    )
+
+
+def test_prune_without_a_directory_is_a_no_op(tmp_path):
+    assert prune_hourly_loads(tmp_path / 'missing', keep=1) == []
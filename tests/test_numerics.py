@@ -0,0 +1,65 @@
+import numpy as np
+
+from numerics import (
+    KahanSum, _synthetic_cities, compare_precision, dense_rank, rank_inversions, stable_sum, tie_tolerance,
+    weighted_sum
+)
+
+
+def test_float32_scoring_matches_float64_up_to_ties():
+    reports = compare_precision(_synthetic_cities(50000))
+    for stage in ('Readiness_Weight', 'Allocation_Weight', 'Priority_Score', 'Infrastructure_Readiness'):
+        assert reports[stage]['rank_inversions'] == 0, stage
+        assert reports[stage]['max_rel_error'] < 1e-5, stage
+    assert reports['Infrastructure_Readiness']['category_flips'] == 0
+    assert reports['naive_float32_total']['stable_rel_error'] < 1e-7
+    assert reports['feature_bytes']['float32'] < reports['feature_bytes']['float64']
+
+
+def test_dense_rank_ties_rounding_noise():
+    scores = np.array([0.5, 0.7, 0.5 + 1e-17, 0.7 - 2e-16, 0.1])
+    assert dense_rank(scores).tolist() == [2, 1, 2, 1, 3]
+    assert dense_rank(scores, ascending=True).tolist() == [2, 3, 2, 3, 1]
+
+
+def test_dense_rank_separates_gaps_above_tolerance():
+    scores = np.array([1.0, 1.0 - 1e-6, 1.0 - 2e-6])
+    assert tie_tolerance(scores) < 1e-6
+    assert dense_rank(scores).tolist() == [1, 2, 3]
+    assert dense_rank(scores, tolerance=1e-5).tolist() == [1, 1, 1]
+
+
+def test_dense_rank_puts_nan_last():
+    assert dense_rank(np.array([np.nan, 0.2, 0.9])).tolist() == [3, 2, 1]
+
+
+def test_float32_ties_are_judged_at_float32_precision():
+    reference = np.linspace(0, 1, 1001)
+    candidate = reference.astype(np.float32)
+    tolerance = tie_tolerance(candidate)
+    assert tolerance > tie_tolerance(reference)
+    assert (dense_rank(candidate, tolerance=tolerance) == dense_rank(reference)).all()
+    assert rank_inversions(reference, candidate, tolerance) == 0
+
+
+def test_rank_inversions_counts_swapped_pairs():
+    reference = np.array([3.0, 2.0, 1.0])
+    assert rank_inversions(reference, np.array([3.0, 1.0, 2.0]), 1e-12) == 1
+    assert rank_inversions(reference, np.array([3.0, 2.0, 2.0 + 1e-13]), 1e-12) == 0
+
+
+def test_chunked_kahan_sum_matches_one_pass():
+    values = np.random.default_rng(0).lognormal(8, 2, 100000).astype(np.float32)
+    total = KahanSum()
+    for chunk in np.array_split(values, 37):
+        total.add(chunk)
+    assert abs(total.value - stable_sum(values)) <= 1e-12 * stable_sum(values)
+
+
+def test_weighted_sum_accumulates_float32_blocks_in_float64():
+    rng = np.random.default_rng(1)
+    matrix = rng.random((1000, 5))
+    weights = rng.random(5)
+    result = weighted_sum(matrix.astype(np.float32), weights, block_rows=64)
+    assert result.dtype == np.float32
+    np.testing.assert_allclose(result, matrix.astype(np.float32).astype(np.float64) @ weights, rtol=1e-6)
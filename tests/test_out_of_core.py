@@ -0,0 +1,24 @@
+import pandas as pd
+import pytest
+
+from out_of_core import run_out_of_core
+from regression_check import builtin_cities, pipeline_outputs
+from synthetic import CityModel, generate_chunks
+
+
+@pytest.fixture(scope='module')
+def tracts():
+    return pd.concat(generate_chunks(CityModel(builtin_cities()), 30000, 0), ignore_index=True)
+
+
+@pytest.mark.parametrize('chunk_rows', [7000, 30000])
+def test_chunked_stages_match_the_in_memory_pipeline(tracts, tmp_path, chunk_rows):
+    tracts.to_parquet(tmp_path / 'tracts.parquet')
+    paths = run_out_of_core(tmp_path / 'tracts.parquet', tmp_path / 'out', chunk_rows=chunk_rows)
+    expected = pipeline_outputs(tracts)
+
+    for stage in ('forecast', 'priority', 'risk', 'infrastructure'):
+        result = pd.read_parquet(paths[stage])
+        columns = [column for column in expected.columns if column in result.columns]
+        # Exact: the vehicle counts and forecasts are apportioned over every row, not per chunk
+        pd.testing.assert_frame_equal(result[columns], expected[columns], check_dtype=False, rtol=0, atol=0)
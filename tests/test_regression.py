@@ -0,0 +1,38 @@
+import pytest
+
+from regression_check import (
+    ENGINES, builtin_cities, compare_to_golden, compare_to_reference, read_golden, reference_outputs,
+    run_property_checks
+)
+
+
+@pytest.fixture(scope='module')
+def cities_df():
+    return builtin_cities()
+
+
+@pytest.mark.parametrize('engine', list(ENGINES))
+def test_engine_matches_golden(engine, cities_df):
+    problems = compare_to_golden(ENGINES[engine](cities_df), read_golden())
+    assert not problems, "\n".join(problems)
+
+
+@pytest.mark.parametrize('engine', list(ENGINES))
+def test_engine_matches_reference_on_builtin_cities(engine, cities_df):
+    problems = compare_to_reference(ENGINES[engine](cities_df), reference_outputs(cities_df))
+    assert not problems, "\n".join(problems)
+
+
+@pytest.mark.parametrize('engine', list(ENGINES))
+def test_engine_matches_reference_on_random_tables(engine):
+    run_property_checks(ENGINES[engine])
+
+
+def test_parallel_counts_match_pipeline_on_duplicate_cities(cities_df):
+    # Identical rows tie in the largest-remainder step; chunked scoring must
+    # break those ties the same way as the whole-table pipeline
+    duplicated = cities_df.iloc[[0, 1, 2, 1, 3, 2] * 4].reset_index(drop=True)
+    duplicated['City'] = [f'City_{i}' for i in range(len(duplicated))]
+    pipeline, parallel = ENGINES['pipeline'](duplicated), ENGINES['parallel'](duplicated)
+    for column in ('Current_EVs_Estimate', 'Target_Share_2025', 'EV_Forecast_2025', 'EV_Forecast_2029'):
+        assert parallel[column].tolist() == pipeline[column].tolist(), column
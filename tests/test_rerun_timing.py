@@ -0,0 +1,109 @@
+import os
+import time
+
+import pandas as pd
+import pytest
+import streamlit.testing.v1.local_script_runner as local_script_runner
+import toml
+from streamlit import config
+from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+from streamlit.testing.v1 import AppTest
+
+from regression_check import builtin_cities
+from synthetic import CityModel, generate_chunks
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_PATH = os.path.join(REPO_DIR, 'app.py')
+
+# Rerun budgets of the landing view, with no sidebar change and with one
+# priority, risk or readiness weight changed and applied. Before the load
+# simulation, rank bootstrap and exports left the rerun path and only the
+# selected view ran, a weight change took 9-10 s at 5,000 rows
+RERUN_SECONDS = {'builtin': 0.1, 'synthetic-tracts5k': 1.0}
+
+# Best of this many reruns is compared with the budget (the others absorb
+# scheduler noise on a shared machine)
+ATTEMPTS = 5
+
+WEIGHT_GROUPS = ('priority', 'risk', 'readiness')
+
+
+@pytest.fixture(scope='module')
+def server_like():
+    """
+    AppTest set up like `streamlit run` in the repo: the options from
+    .streamlit/config.toml, and one script cache shared by every rerun (the
+    server compiles the script once; AppTest compiles it on every run)
+    """
+    options = {
+        f'{section}.{name}': value
+        for section, values in toml.load(os.path.join(REPO_DIR, '.streamlit', 'config.toml')).items()
+        for name, value in values.items()
+    }
+    previous = {key: config.get_option(key) for key in options}
+    script_cache = ScriptCache()
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setattr(local_script_runner, 'ScriptCache', lambda: script_cache)
+        for key, value in options.items():
+            config.set_option(key, value)
+        yield
+        for key, value in previous.items():
+            config.set_option(key, value)
+
+
+def apply_scenario(at):
+    next(button for button in at.button if button.label == 'Apply').click().run()
+    assert not at.exception, [exception.value for exception in at.exception]
+
+
+@pytest.fixture(scope='module', params=list(RERUN_SECONDS))
+def dashboard(request, tmp_path_factory, server_like):
+    """
+    The dashboard on the built-in 20 cities or on a 5,000-row synthetic table
+    (enabled via app.SYNTHETIC_DATASETS_ENV), run once, in a scratch working
+    directory; yields (AppTest, dataset)
+    """
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.chdir(tmp_path_factory.mktemp(request.param))
+        if request.param.startswith('synthetic-'):
+            monkeypatch.setenv('REVOLT_SYNTHETIC_DATASETS', '1')
+            os.makedirs('data/synthetic')
+            pd.concat(generate_chunks(CityModel(builtin_cities()), 5000, 0), ignore_index=True) \
+                .to_parquet('data/synthetic/tracts5k.parquet')
+
+        at = AppTest.from_file(APP_PATH, default_timeout=600).run()
+        at.selectbox(key='scenario_dataset').set_value(request.param)
+        apply_scenario(at)
+        yield at, request.param
+
+
+def best_of(attempts, rerun):
+    timings = []
+    for _ in range(attempts):
+        start = time.perf_counter()
+        rerun()
+        timings.append(time.perf_counter() - start)
+    return min(timings), timings
+
+
+def test_rerun_without_change(dashboard):
+    at, dataset = dashboard
+    best, timings = best_of(ATTEMPTS, at.run)
+    assert not at.exception
+    assert best < RERUN_SECONDS[dataset], timings
+
+
+@pytest.mark.parametrize('group', WEIGHT_GROUPS)
+def test_rerun_after_weight_change(dashboard, group):
+    at, dataset = dashboard
+    key = next(slider.key for slider in at.slider if slider.key and slider.key.startswith(f'scenario_{group}_'))
+
+    def change_weight():
+        # One step up, or down at the maximum, so every rerun computes a new scenario
+        slider = at.slider(key=key)
+        step = slider.step if slider.value + slider.step <= slider.max else -slider.step
+        slider.set_value(round(slider.value + step, 2))
+        apply_scenario(at)
+
+    best, timings = best_of(ATTEMPTS, change_weight)
+    assert best < RERUN_SECONDS[dataset], timings
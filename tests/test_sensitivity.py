@@ -0,0 +1,114 @@
+import numpy as np
+import pytest
+
+from scoring import PRIORITY_WEIGHTS
+from sensitivity import adjacent_swap_perturbations, min_feasible_shift, renormalized_directions
+
+WEIGHTS = np.asarray(list(PRIORITY_WEIGHTS.values()))
+
+
+def random_factors(seed, n=7):
+    return np.random.default_rng(seed).random((n, len(WEIGHTS)))
+
+
+def brute_force_order(F, w):
+    scores = F @ w
+    return np.argsort(-scores, kind='stable')
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_per_weight_swap_matches_brute_force_reranking(seed):
+    F = random_factors(seed)
+    order, scores, gaps, swap_delta, _ = adjacent_swap_perturbations(F, WEIGHTS)
+    assert order.tolist() == brute_force_order(F, WEIGHTS).tolist()
+
+    directions = renormalized_directions(WEIGHTS)
+    total = WEIGHTS.sum()
+    for k in range(len(WEIGHTS)):
+        # Every feasible change of weight k, finely spaced, re-ranked from scratch
+        deltas = np.linspace(-WEIGHTS[k], total - WEIGHTS[k], 2001)
+        for r in range(len(order) - 1):
+            upper, lower = order[r], order[r + 1]
+            perturbed = (F[upper] - F[lower]) @ (WEIGHTS[:, None] + directions[:, [k]] * deltas)
+            flips = deltas[perturbed < 0]
+            if np.isfinite(swap_delta[r, k]):
+                # The closed-form delta closes the gap and the scan flips the pair just past it
+                w = WEIGHTS + directions[:, k] * swap_delta[r, k]
+                assert (F[upper] - F[lower]) @ w == pytest.approx(0, abs=1e-12)
+                step = deltas[1] - deltas[0]
+                assert np.abs(flips - swap_delta[r, k]).min() <= step
+            else:
+                assert len(flips) == 0
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_min_shift_is_the_smallest_sum_preserving_swap(seed):
+    F = random_factors(seed)
+    order, scores, gaps, _, min_shift = adjacent_swap_perturbations(F, WEIGHTS)
+    rng = np.random.default_rng(seed)
+
+    for r in range(len(order) - 1):
+        D = F[order[r]] - F[order[r + 1]]
+        projected = D - D.mean()
+        w = WEIGHTS - projected / np.linalg.norm(projected) * min_shift[r]
+        if (w >= 0).all():
+            # Moving min_shift against the projected difference closes the gap...
+            assert w.sum() == pytest.approx(WEIGHTS.sum())
+            assert D @ w == pytest.approx(0, abs=1e-12)
+        # ...and no random sum-preserving shift shorter than it swaps the pair
+        shifts = rng.normal(size=(500, len(WEIGHTS)))
+        shifts -= shifts.mean(axis=1, keepdims=True)
+        shifts *= 0.999 * min_shift[r] / np.linalg.norm(shifts, axis=1, keepdims=True)
+        assert ((WEIGHTS + shifts) @ D > 0).all()
+
+
+def bound_binding_pair():
+    """Two cities whose unbounded swap would drive the smallest weight negative"""
+    D = np.ones(len(WEIGHTS))
+    D[np.argmin(WEIGHTS)] = 1.5
+    D[np.argmax(WEIGHTS)] = -0.2
+    return D
+
+
+def test_min_shift_keeps_every_weight_non_negative():
+    D = bound_binding_pair()
+    gap = D @ WEIGHTS
+    assert gap > 0
+    projected = D - D.mean()
+    unbounded = WEIGHTS - projected * gap / (projected @ projected)
+    assert (unbounded < 0).any()
+
+    F = np.vstack([D, np.zeros(len(WEIGHTS))])
+    _, _, gaps, _, min_shift = adjacent_swap_perturbations(F, WEIGHTS)
+    norms, deltas = min_feasible_shift(D[None, :], gaps, WEIGHTS)
+    assert min_shift[0] == pytest.approx(norms[0])
+    assert min_shift[0] > np.linalg.norm(unbounded - WEIGHTS)
+
+    w = WEIGHTS + deltas[0]
+    assert (w >= -1e-12).all()
+    assert w.sum() == pytest.approx(WEIGHTS.sum())
+    assert D @ w == pytest.approx(0, abs=1e-12)
+
+    # Brute force: no non-negative weights on the same total closer than it swap the pair
+    samples = np.random.default_rng(0).dirichlet(np.full(len(WEIGHTS), 0.3), 200000) * WEIGHTS.sum()
+    closer = np.linalg.norm(samples - WEIGHTS, axis=1) < 0.999 * min_shift[0]
+    assert (samples[closer] @ D > 0).all()
+    swapping = samples @ D <= 0
+    assert np.linalg.norm(samples[swapping] - WEIGHTS, axis=1).min() < 1.1 * min_shift[0]
+
+
+def test_min_shift_is_infinite_when_no_weights_swap():
+    # A city ahead on every factor stays ahead under any non-negative weights
+    F = np.vstack([np.full(len(WEIGHTS), 0.9), np.full(len(WEIGHTS), 0.1)])
+    F[0, 0] = 0.8
+    _, _, _, _, min_shift = adjacent_swap_perturbations(F, WEIGHTS)
+    assert np.isinf(min_shift[0])
+
+
+def test_tied_cities_swap_at_zero():
+    F = random_factors(0, n=4)
+    F[2] = F[1]
+    order, scores, gaps, swap_delta, min_shift = adjacent_swap_perturbations(F, WEIGHTS)
+    tied = np.flatnonzero(gaps == 0)
+    assert len(tied) == 1
+    assert (swap_delta[tied] == 0).all() and min_shift[tied[0]] == 0
@@ -0,0 +1,36 @@
+import pytest
+
+from regression_check import builtin_cities, pipeline_outputs
+from scoring import ALLOCATION_POPULATION_SHARE, ESTIMATED_CURRENT_EVS, STATE_TARGET_2025
+from whatif import WhatIfBaseline
+
+
+@pytest.fixture(scope='module')
+def cities_df():
+    return builtin_cities()
+
+
+@pytest.fixture(scope='module')
+def baseline(cities_df):
+    return WhatIfBaseline(cities_df, STATE_TARGET_2025, ESTIMATED_CURRENT_EVS, ALLOCATION_POPULATION_SHARE)
+
+
+def test_unedited_city_reproduces_the_pipeline(cities_df, baseline):
+    outputs = pipeline_outputs(cities_df).set_index('City')
+    for city in cities_df['City']:
+        result = baseline.evaluate(city, {})
+        for metric, value in result.items():
+            assert value == pytest.approx(outputs.loc[city, metric], rel=1e-12), (city, metric)
+
+
+def test_variant_matches_a_pipeline_rerun_on_the_edited_table(cities_df, baseline):
+    city = cities_df['City'].iloc[3]
+    overrides = {'Median_Income': 150000, 'Population_2024': 900000, 'Urban_Classification': 'Urban Core'}
+    edited = cities_df.copy()
+    for column, value in overrides.items():
+        edited.loc[edited['City'] == city, column] = value
+
+    result = baseline.evaluate(city, overrides)
+    rerun = pipeline_outputs(edited).set_index('City').loc[city]
+    for metric, value in result.items():
+        assert value == pytest.approx(rerun[metric], rel=1e-9), metric
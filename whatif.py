@@ -0,0 +1,161 @@
+import numpy as np
+import pandas as pd
+
+from numerics import tie_tolerance, weighted_sum
+from scoring import (
+    FORECAST_YEARS, NORMALIZED_INPUTS, PRIORITY_WEIGHTS, READINESS_WEIGHTS, RISK_WEIGHTS, allocate_forecasts,
+    categorize_infrastructure, categorize_risk, feature_inputs, feature_matrices, feature_statistics,
+    infrastructure_scores, weight_vector
+)
+
+# City columns a what-if can change -> feature input they feed
+WHATIF_FIELDS = {
+    'Population_2024': 'population',
+    'Median_Income': 'income',
+    'Median_Home_Value': 'home_value',
+    'Bachelor_Degree_Pct': 'education',
+    'Single_Family_Pct': 'single_family',
+    'Drive_Alone_Pct': 'drive_alone',
+    'Public_Transit_Pct': 'transit',
+    'Urban_Classification': 'urban_class'
+}
+
+
+class WhatIfBaseline:
+    """
+    Cached baseline for scoring hypothetical variants of a single city
+
+    Scores only couple cities through a few dataset statistics (maxima of
+    population, income, home value and distance). The baseline keeps the
+    top two values of each maximum, so replacing one city's inputs updates
+    every statistic in O(1) and only that row is featurized and scored.
+    Priority rank is counted against the other cities' cached scores.
+    Only when the variant becomes (or stops being) the maximum of a
+    normalized input do the other cities' features move; then the affected
+    stage scores are recomputed from the cached inputs, still without
+    re-running the pipeline.
+
+    Vehicle counts run scoring.allocate_forecasts over every city with the
+    variant's population and readiness swapped in: the same apportionment,
+    growth caps and largest-remainder forecasts as the pipeline, O(n log n)
+    per variant. An unchanged city therefore reproduces the pipeline's
+    counts exactly; a changed one shifts the other cities' counts as a
+    pipeline rerun would (only the edited city is reported).
+    """
+
+    def __init__(self, cities_df, state_target, current_total, population_share, readiness_weights=None,
+                 priority_weights=None, risk_weights=None, charging_weights=None, grid_weights=None,
+                 infrastructure_weights=None, forecast_years=FORECAST_YEARS):
+        self.cities = cities_df['City'].tolist()
+        self.index = {city: i for i, city in enumerate(self.cities)}
+        self.inputs = feature_inputs(cities_df)
+        self.statistics = feature_statistics(self.inputs)
+
+        # Top two values per normalized input, for O(1) max updates
+        self.top_two = {}
+        for name in NORMALIZED_INPUTS:
+            values = self.inputs[name]
+            order = np.argsort(values)[::-1][:2]
+            second = values[order[1]] if len(order) > 1 else -np.inf
+            self.top_two[name] = (int(order[0]), float(values[order[0]]), float(second))
+
+        self.weights = {
+            'readiness': weight_vector(readiness_weights, READINESS_WEIGHTS),
+            'priority': weight_vector(priority_weights, PRIORITY_WEIGHTS),
+            'risk': weight_vector(risk_weights, RISK_WEIGHTS)
+        }
+        self.infrastructure_weights = (charging_weights, grid_weights, infrastructure_weights)
+        self.state_target = state_target
+        self.current_total = current_total
+        self.population_share = population_share
+        self.forecast_years = tuple(forecast_years)
+
+        features = feature_matrices(self.inputs, self.statistics)
+        self.readiness = self._readiness(features)
+        self.priority = weighted_sum(features['priority'], self.weights['priority'])
+
+    def _readiness(self, features):
+        return np.minimum(weighted_sum(features['readiness'], self.weights['readiness']), 1.0)
+
+    def _variant_statistics(self, i, row):
+        statistics = dict(self.statistics)
+        for name in NORMALIZED_INPUTS:
+            argmax, first, second = self.top_two[name]
+            others_max = second if argmax == i else first
+            statistics[name] = max(float(row[name][0]), others_max)
+        return statistics
+
+    def evaluate(self, city, overrides):
+        """
+        Counterfactual scores for city with some inputs overridden
+
+        overrides maps WHATIF_FIELDS columns to new values. Returns a dict
+        with Adoption_Readiness, Priority_Score, Priority_Rank,
+        Overall_Risk_Score, Risk_Category, Infrastructure_Readiness,
+        Infrastructure_Category, Current_EVs_Estimate, Target_Share_2025,
+        Growth_Rate and EV_Forecast_{year}.
+        """
+        i = self.index[city]
+        row = {name: values[i:i + 1].copy() for name, values in self.inputs.items()}
+        for column, value in overrides.items():
+            row[WHATIF_FIELDS[column]] = np.asarray([value], dtype=row[WHATIF_FIELDS[column]].dtype)
+
+        statistics = self._variant_statistics(i, row)
+        features = feature_matrices(row, statistics)
+        readiness = float(self._readiness(features)[0])
+        priority = float(weighted_sum(features['priority'], self.weights['priority'])[0])
+
+        other_readiness, other_priority = self.readiness, self.priority
+        if statistics != self.statistics:
+            # The variant moved a dataset maximum: rescore everyone from cached inputs
+            all_features = feature_matrices(self.inputs, statistics)
+            other_readiness = self._readiness(all_features)
+            other_priority = weighted_sum(all_features['priority'], self.weights['priority'])
+
+        # Dense rank among the other cities, ties judged as in numerics.dense_rank
+        others = np.delete(other_priority, i)
+        tolerance = tie_tolerance(np.append(others, priority))
+        distinct = np.unique(others[others > priority + tolerance])
+        gaps = np.diff(distinct) > tolerance
+        priority_rank = 1 + (int(np.sum(gaps)) + 1 if len(distinct) else 0)
+
+        risk_score = float(weighted_sum(features['risk'], self.weights['risk'])[0])
+        _, _, infrastructure = infrastructure_scores(features, *self.infrastructure_weights)
+
+        # The pipeline's allocation (apportionment with growth caps and
+        # largest-remainder forecasts) over every city, with this city's
+        # population and readiness replaced
+        population = self.inputs['population'].copy()
+        population[i] = row['population'][0]
+        all_readiness = other_readiness.copy()
+        all_readiness[i] = readiness
+        allocation = allocate_forecasts(population, all_readiness, self.current_total, self.state_target,
+                                        self.population_share, self.forecast_years)
+
+        result = {
+            'Adoption_Readiness': readiness,
+            'Priority_Score': priority,
+            'Priority_Rank': priority_rank,
+            'Overall_Risk_Score': risk_score,
+            'Risk_Category': str(categorize_risk(np.asarray([risk_score]))[0]),
+            'Infrastructure_Readiness': float(infrastructure[0]),
+            'Infrastructure_Category': str(categorize_infrastructure(infrastructure)[0]),
+            'Current_EVs_Estimate': int(allocation['Current_EVs_Estimate'][i]),
+            'Target_Share_2025': int(allocation['Target_Share_2025'][i]),
+            'Growth_Rate': float(allocation['Growth_Rate'][i])
+        }
+        for year in self.forecast_years:
+            result[f'EV_Forecast_{year}'] = int(allocation[f'EV_Forecast_{year}'][i])
+        return result
+
+
+def comparison_table(baseline_row, variant):
+    """Side-by-side Baseline / What_If / Change rows for the metrics of a variant"""
+    rows = []
+    for metric, value in variant.items():
+        base = baseline_row[metric]
+        change = value - base if isinstance(value, (int, float)) and not isinstance(value, bool) else (
+            'unchanged' if value == base else f'{base} -> {value}'
+        )
+        rows.append({'Metric': metric, 'Baseline': base, 'What_If': value, 'Change': change})
+    return pd.DataFrame(rows)